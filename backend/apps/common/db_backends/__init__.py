@@ -0,0 +1,3 @@
+"""
+Custom database backends for the North Sea Watch project.
+"""
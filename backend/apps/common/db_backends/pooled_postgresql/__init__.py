@@ -0,0 +1,3 @@
+"""
+PostgreSQL backend checking connections out of a bounded psycopg pool.
+"""
@@ -0,0 +1,132 @@
+"""
+Pooled PostgreSQL database backend.
+Extends Django's PostgreSQL backend so each worker process checks connections
+out of a bounded psycopg ConnectionPool per database, configured through
+OPTIONS['pool'], instead of opening one connection per thread. Bursts of
+requests then queue for a free connection rather than opening new ones.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel, is_psycopg3
+
+try:
+    from psycopg_pool import ConnectionPool
+except ImportError:  # Optional dependency
+    ConnectionPool = None
+
+logger = logging.getLogger(__name__)
+
+# Pools are shared by the connection wrappers of all threads, keyed by alias
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Milliseconds connections were held between checkout and return, keyed by alias
+_usage_ms = {}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL connection wrapper returning its connection to the pool on close.
+    """
+
+    @property
+    def pool(self):
+        """
+        Return the connection pool of this database, creating it on first use.
+
+        Returns:
+            The psycopg ConnectionPool, or None if OPTIONS has no 'pool' entry
+        """
+        pool_options = self.settings_dict['OPTIONS'].get('pool')
+        if not pool_options:
+            return None
+
+        pool = _pools.get(self.alias)
+        if pool is not None:
+            return pool
+
+        if ConnectionPool is None or not is_psycopg3:
+            raise ImproperlyConfigured("Connection pooling requires the psycopg and psycopg-pool packages.")
+        if self.settings_dict['CONN_MAX_AGE'] != 0:
+            raise ImproperlyConfigured("Connection pooling requires CONN_MAX_AGE = 0.")
+        if 'isolation_level' in self.settings_dict['OPTIONS']:
+            raise ImproperlyConfigured("Connection pooling does not support the isolation_level option.")
+
+        with _pools_lock:
+            if self.alias not in _pools:
+                connect_kwargs = self.get_connection_params()
+                # Django sets the autocommit mode of every connection it checks out
+                connect_kwargs['autocommit'] = True
+                _pools[self.alias] = ConnectionPool(
+                    kwargs=connect_kwargs,
+                    name=self.alias,
+                    check=ConnectionPool.check_connection if self.settings_dict['CONN_HEALTH_CHECKS'] else None,
+                    open=False,
+                    **(pool_options if isinstance(pool_options, dict) else {})
+                )
+                logger.info(f"Created connection pool for database {self.alias}")
+            return _pools[self.alias]
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop('pool', None)
+        return conn_params
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+
+        # Pooled connections keep the server default isolation level
+        self.isolation_level = IsolationLevel.READ_COMMITTED
+        # Opening an open pool returns immediately
+        pool.open()
+        # Waits up to the pool timeout for a free connection, then raises PoolTimeout
+        connection = pool.getconn()
+        self._checked_out_at = time.monotonic()
+        return connection
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+
+        with self.wrap_database_errors:
+            # The pool rolls back an open transaction and discards broken connections
+            pool.putconn(self.connection)
+            self.connection = None
+
+        usage_ms = int(1000 * (time.monotonic() - self._checked_out_at))
+        with _pools_lock:
+            _usage_ms[self.alias] = _usage_ms.get(self.alias, 0) + usage_ms
+
+
+def get_pool_stats() -> Dict[str, Dict]:
+    """
+    Return the statistics of the connection pools created by this process.
+
+    Returns:
+        Dictionary of pool statistics by database alias, with the pool size,
+        the number of checkouts, the time spent waiting for a connection and
+        holding it, and the average wait per checkout in milliseconds
+    """
+    stats = {}
+    for alias in connections:
+        pool = _pools.get(alias)
+        if pool is None:
+            continue
+        pool_stats = dict(pool.get_stats(), usage_ms=_usage_ms.get(alias, 0))
+        requests = pool_stats.get('requests_num', 0)
+        stats[alias] = dict(
+            pool_stats,
+            requests_wait_ms_avg=round(pool_stats.get('requests_wait_ms', 0) / requests, 2) if requests else 0,
+            usage_ms_avg=round(pool_stats.get('usage_ms', 0) / requests, 2) if requests else 0,
+        )
+    return stats
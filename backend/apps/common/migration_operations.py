@@ -0,0 +1,65 @@
+"""
+Migration operations for the North Sea Watch project.
+PostgreSQL operations that leave other databases alone, or fall back to their
+plain equivalent, so the migrations still apply and unapply on the SQLite
+databases used by local test settings.
+"""
+from django.contrib.postgres import operations
+from django.contrib.postgres.indexes import PostgresIndex
+from django.db import migrations
+
+
+def _supports_index(schema_editor, index) -> bool:
+    # GIN and the other PostgreSQL index types cannot be created elsewhere
+    return schema_editor.connection.vendor == 'postgresql' or not isinstance(index, PostgresIndex)
+
+
+class AddIndexConcurrently(operations.AddIndexConcurrently):
+    """
+    Create an index concurrently on PostgreSQL. Other databases get a plain
+    CREATE INDEX, or nothing for PostgreSQL-only index types.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        elif _supports_index(schema_editor, self.index):
+            migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        elif _supports_index(schema_editor, self.index):
+            migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class RemoveIndexConcurrently(operations.RemoveIndexConcurrently):
+    """
+    Drop an index concurrently on PostgreSQL. Other databases get a plain
+    DROP INDEX, or nothing for PostgreSQL-only index types.
+    """
+
+    def _index(self, state, app_label):
+        return state.models[app_label, self.model_name_lower].get_index_by_name(self.name)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        elif _supports_index(schema_editor, self._index(from_state, app_label)):
+            migrations.RemoveIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        elif _supports_index(schema_editor, self._index(to_state, app_label)):
+            migrations.RemoveIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class TrigramExtension(operations.TrigramExtension):
+    """
+    Install the pg_trgm extension on PostgreSQL only, in both directions.
+    """
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
@@ -0,0 +1,107 @@
+"""
+Keyset pagination for the North Sea Watch project.
+Pages through querysets newest first by a timestamp field and the primary key,
+continuing after the last row of the previous page instead of skipping rows
+with OFFSET, so every page is an index range scan and no COUNT(*) is needed.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import List, Optional, Tuple
+
+from django.db.models import F, Q, QuerySet
+from django.utils import timezone
+
+# Separates the timestamp, in microseconds since the epoch, from the primary key
+CURSOR_SEPARATOR = '_'
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_cursor(timestamp: Optional[datetime], pk: int) -> str:
+    """
+    Encode the position of a row as a URL safe cursor.
+
+    Args:
+        timestamp: Timestamp of the row, may be None
+        pk: Primary key of the row
+
+    Returns:
+        Cursor string
+    """
+    if timestamp is None:
+        return f"{CURSOR_SEPARATOR}{pk}"
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    micros = (timestamp - EPOCH) // timedelta(microseconds=1)
+    return f"{micros}{CURSOR_SEPARATOR}{pk}"
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """
+    Decode a cursor made by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    micros, separator, pk = cursor.partition(CURSOR_SEPARATOR)
+    if not separator:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    timestamp = EPOCH + timedelta(microseconds=int(micros)) if micros else None
+    return timestamp, int(pk)
+
+
+def order_newest_first(queryset: QuerySet, field: str = 'timestamp') -> QuerySet:
+    """
+    Order a queryset newest first by a timestamp field and the primary key.
+
+    Rows without a timestamp come first, as PostgreSQL sorts NULL first in
+    descending order; this matches a backward scan of an index on (field, id).
+    """
+    return queryset.order_by(F(field).desc(nulls_first=True), '-pk')
+
+
+def filter_after(queryset: QuerySet, cursor: str, field: str = 'timestamp') -> QuerySet:
+    """
+    Filter a queryset ordered by order_newest_first to the rows after a cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    timestamp, pk = decode_cursor(cursor)
+    if timestamp is None:
+        return queryset.filter(Q(**{f'{field}__isnull': True, 'pk__lt': pk}) | Q(**{f'{field}__isnull': False}))
+    # The redundant upper bound lets the index scan start at the cursor
+    return queryset.filter(
+        Q(**{f'{field}__lte': timestamp}),
+        Q(**{f'{field}__lt': timestamp}) | Q(**{field: timestamp, 'pk__lt': pk}),
+    )
+
+
+def paginate(queryset: QuerySet, cursor: Optional[str] = None, limit: int = 50,
+             field: str = 'timestamp') -> Tuple[List, Optional[str]]:
+    """
+    Fetch one page of a queryset, newest first.
+
+    Args:
+        queryset: Queryset to page through
+        cursor: Cursor returned with the previous page, or None for the first page
+        limit: Rows per page
+        field: Timestamp field ordering the rows
+
+    Returns:
+        Tuple of the rows of the page and the cursor of the next page, which
+        is None on the last page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    queryset = order_newest_first(queryset, field)
+    if cursor:
+        queryset = filter_after(queryset, cursor, field)
+
+    # One extra row tells whether there is a next page, without counting
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, field), last.pk)
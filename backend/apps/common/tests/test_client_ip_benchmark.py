@@ -0,0 +1,109 @@
+"""
+Benchmark of client IP resolution against the former regex-based trusted proxy matching.
+The timings only run with RUN_BENCHMARKS=True, the default run checks the resolved IPs.
+"""
+import ipaddress
+import logging
+import os
+import re
+import time
+from unittest import skipUnless
+from django.test import SimpleTestCase, RequestFactory
+from apps.common import utils
+from apps.common.utils import get_real_client_ip
+
+# Trusted proxy patterns matched before the CIDR ranges
+LEGACY_TRUSTED_PROXIES = [
+    r'^35\.[\d]{1,3}\.[\d]{1,3}\.[\d]{1,3}$',
+    r'^10\.[\d]{1,3}\.[\d]{1,3}\.[\d]{1,3}$',
+    r'^172\.(1[6-9]|2[0-9]|3[0-1])\.[\d]{1,3}\.[\d]{1,3}$',
+    r'^192\.168\.[\d]{1,3}\.[\d]{1,3}$',
+    r'^127\.[\d]{1,3}\.[\d]{1,3}\.[\d]{1,3}$',
+    r'^::1$'
+]
+
+# X-Forwarded-For values as set by the GCP load balancer and internal proxies
+FORWARDED_FOR_VALUES = [
+    '31.151.20.23, 35.191.10.4',
+    '145.53.212.9, 35.191.0.17',
+    '2a02:a46b:12f0:1:8d2c:7b1e:4a3f:9e01, 35.191.3.90',
+    '81.204.3.77, 10.8.0.5, 35.191.8.1',
+    '172.20.1.4, 192.168.0.10, 35.191.0.2',
+    '62.45.118.200',
+    '84.241.195.6, 172.32.0.1, 35.191.2.2',
+    'unknown, 94.212.44.1',
+]
+
+RUN_BENCHMARKS = os.environ.get('RUN_BENCHMARKS', 'False').lower() == 'true'
+
+logger = logging.getLogger(__name__)
+
+def legacy_client_ip(request):
+    """Resolve the client IP the way get_real_client_ip did before the CIDR ranges."""
+    def is_trusted_proxy(ip):
+        return any(re.match(pattern, ip) for pattern in LEGACY_TRUSTED_PROXIES)
+
+    def is_valid_ip(ip):
+        try:
+            ipaddress.ip_address(ip)
+            return True
+        except ValueError:
+            return False
+
+    def is_internal_ip(ip):
+        try:
+            ip_obj = ipaddress.ip_address(ip)
+            return ip_obj.is_private or ip_obj.is_loopback or ip_obj.is_link_local or ip_obj.is_reserved
+        except ValueError:
+            return False
+
+    ip_address = "Unknown"
+    forwarded_for = re.sub(r'[^0-9a-fA-F:.,]', '', request.META['HTTP_X_FORWARDED_FOR'])
+    ip_list = [ip.strip() for ip in forwarded_for.split(',') if ip.strip()]
+    for ip in ip_list:
+        if not is_trusted_proxy(ip) and is_valid_ip(ip):
+            ip_address = ip
+            break
+    if ip_address == "Unknown" and ip_list:
+        ip_address = ip_list[0]
+    is_internal_ip(ip_address)
+    return ip_address
+
+class ClientIPBenchmarkTestCase(SimpleTestCase):
+    """Per-call cost of resolving the client IP of proxied requests."""
+    
+    iterations = 2000
+    
+    def setUp(self):
+        factory = RequestFactory()
+        self.requests = [
+            factory.get('/', HTTP_X_FORWARDED_FOR=value) for value in FORWARDED_FOR_VALUES
+        ] * (self.iterations // len(FORWARDED_FOR_VALUES))
+    
+    def time_per_call(self, resolve):
+        started = time.perf_counter()
+        for request in self.requests:
+            resolve(request)
+        return (time.perf_counter() - started) / len(self.requests) * 1e6
+    
+    def test_same_client_ips(self):
+        """Test that the CIDR matcher resolves the same IPs as the regex patterns."""
+        for request in self.requests[:len(FORWARDED_FOR_VALUES)]:
+            self.assertEqual(get_real_client_ip(request), legacy_client_ip(request))
+    
+    @skipUnless(RUN_BENCHMARKS, "set RUN_BENCHMARKS=True to time the client IP resolution")
+    def test_per_call_cost(self):
+        """Report the per-call cost of the CIDR matcher against the regex patterns."""
+        legacy_us = self.time_per_call(legacy_client_ip)
+        utils._get_forwarded_for_client_ip.cache_clear()
+        utils._parse_ip.cache_clear()
+        cached_us = self.time_per_call(get_real_client_ip)
+        
+        uncached_us = self.time_per_call(
+            lambda request: [utils._get_forwarded_for_client_ip.cache_clear(), get_real_client_ip(request)]
+        )
+        
+        logger.info(
+            f"get_real_client_ip per call: regex patterns {legacy_us:.2f} us, "
+            f"CIDR ranges {uncached_us:.2f} us, cached header value {cached_us:.2f} us"
+        )
@@ -0,0 +1,40 @@
+"""
+Tests for the pooled PostgreSQL database backend.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+from apps.common.db_backends.pooled_postgresql.base import DatabaseWrapper
+
+def make_wrapper(**overrides):
+    settings_dict = {
+        'ENGINE': 'apps.common.db_backends.pooled_postgresql',
+        'NAME': 'ais_data_collection',
+        'USER': 'user',
+        'PASSWORD': 'password',
+        'HOST': 'localhost',
+        'PORT': '5432',
+        'OPTIONS': {'pool': {'min_size': 1, 'max_size': 4}},
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': False,
+        'AUTOCOMMIT': True,
+        'ATOMIC_REQUESTS': False,
+        'TIME_ZONE': None,
+    }
+    settings_dict.update(overrides)
+    return DatabaseWrapper(settings_dict, alias='pool-test')
+
+class PooledDatabaseWrapperTestCase(SimpleTestCase):
+    """Test cases for the pool configuration checks."""
+    
+    def test_pool_option_not_passed_to_psycopg(self):
+        """Test that the pool options are not sent as connection parameters."""
+        self.assertNotIn('pool', make_wrapper().get_connection_params())
+    
+    def test_without_pool_option(self):
+        """Test that the backend behaves like the stock backend without a pool option."""
+        self.assertIsNone(make_wrapper(OPTIONS={}).pool)
+    
+    def test_requires_non_persistent_connections(self):
+        """Test that persistent connections are rejected, they would never return to the pool."""
+        with self.assertRaises(ImproperlyConfigured):
+            make_wrapper(CONN_MAX_AGE=300).pool
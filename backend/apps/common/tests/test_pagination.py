@@ -0,0 +1,42 @@
+"""
+Tests for the keyset pagination.
+"""
+from datetime import datetime, timezone as dt_timezone
+from django.test import SimpleTestCase
+from apps.common import pagination
+from apps.north_sea_watch.models import UserTracking
+
+class CursorTestCase(SimpleTestCase):
+    """Test cases for encoding and decoding cursors."""
+    
+    def test_round_trip(self):
+        """Test that a cursor decodes to the timestamp, to the microsecond, and primary key it was made of."""
+        timestamp = datetime(2025, 3, 1, 9, 30, 15, 123456, tzinfo=dt_timezone.utc)
+        cursor = pagination.encode_cursor(timestamp, 42)
+        
+        self.assertEqual(cursor, '1740821415123456_42')
+        self.assertEqual(pagination.decode_cursor(cursor), (timestamp, 42))
+    
+    def test_null_timestamp(self):
+        """Test that rows without a timestamp get a cursor too."""
+        self.assertEqual(pagination.encode_cursor(None, 7), '_7')
+        self.assertEqual(pagination.decode_cursor('_7'), (None, 7))
+    
+    def test_invalid_cursor(self):
+        """Test that malformed cursors raise ValueError."""
+        for cursor in ['', '42', 'abc_1', '1740821415123456_x']:
+            with self.assertRaises(ValueError):
+                pagination.decode_cursor(cursor)
+
+class FilterAfterTestCase(SimpleTestCase):
+    """Test cases for continuing after a cursor."""
+    
+    def test_upper_bound_on_timestamp(self):
+        """Test that the rows after a cursor are bounded by its timestamp, so the index scan starts there."""
+        queryset = pagination.order_newest_first(UserTracking.objects.all())
+        cursor = pagination.encode_cursor(datetime(2025, 3, 1, tzinfo=dt_timezone.utc), 42)
+        sql = str(pagination.filter_after(queryset, cursor).query)
+        
+        self.assertIn('"timestamp" <= 2025-03-01', sql)
+        self.assertIn('"id" < 42', sql)
+        self.assertIn('ORDER BY "user_tracking"."timestamp" DESC NULLS FIRST, "user_tracking"."id" DESC', sql)
@@ -86,6 +86,18 @@ class IPUtilsTestCase(TestCase):
         # Non-trusted IP
         self.assertFalse(_is_trusted_proxy('203.0.113.1'))
     
+    def test_is_trusted_proxy_network_boundaries(self):
+        """Test that trusted proxy networks match up to their first and last address."""
+        self.assertTrue(_is_trusted_proxy('172.16.0.0'))
+        self.assertTrue(_is_trusted_proxy('172.31.255.255'))
+        self.assertFalse(_is_trusted_proxy('172.32.0.0'))
+        self.assertFalse(_is_trusted_proxy('172.15.255.255'))
+        
+        # IPv6 and invalid input
+        self.assertTrue(_is_trusted_proxy('::1'))
+        self.assertFalse(_is_trusted_proxy('::2'))
+        self.assertFalse(_is_trusted_proxy('35.999.0.1'))
+    
     def test_is_valid_ip(self):
         """Test IP validation."""
         # Valid IPv4
@@ -0,0 +1,98 @@
+"""
+Tests for the bulk write buffer.
+"""
+import threading
+from unittest.mock import patch
+from django.test import SimpleTestCase
+from apps.common.write_buffer import BulkWriteBuffer
+
+class FakeManager:
+    """Manager recording the batches passed to bulk_create."""
+    
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+        self.written = threading.Event()
+    
+    def bulk_create(self, batch, batch_size=None):
+        if self.fail:
+            raise ValueError("bulk insert failed")
+        self.batches.append(list(batch))
+        self.written.set()
+
+class FakeRecord:
+    """Unsaved record, failing to save when marked bad."""
+    
+    def __init__(self, value, bad=False):
+        self.value = value
+        self.bad = bad
+        self.saved = False
+    
+    def save(self):
+        if self.bad:
+            raise ValueError("bad record")
+        self.saved = True
+
+def make_buffer(manager, **options):
+    model = type('FakeModel', (), {'_default_manager': manager})
+    options = dict({'batch_size': 3, 'flush_interval': 60, 'max_size': 5, 'name': 'fake'}, **options)
+    return BulkWriteBuffer(model, **options)
+
+class BulkWriteBufferTestCase(SimpleTestCase):
+    """Test cases for buffering and flushing records."""
+    
+    def test_flush_on_batch_size(self):
+        """Test that a full batch is written in one insert without waiting for the interval."""
+        manager = FakeManager()
+        buffer = make_buffer(manager)
+        for value in range(4):
+            buffer.add(FakeRecord(value))
+        
+        self.assertTrue(manager.written.wait(5))
+        self.assertEqual([[record.value for record in batch] for batch in manager.batches], [[0, 1, 2]])
+        self.assertEqual(buffer.get_stats()['depth'], 1)
+        buffer.close()
+    
+    def test_flush_on_interval(self):
+        """Test that records are written once the oldest has waited the flush interval."""
+        manager = FakeManager()
+        buffer = make_buffer(manager, flush_interval=0.05)
+        buffer.add(FakeRecord(1))
+        
+        self.assertTrue(manager.written.wait(5))
+        self.assertEqual(len(manager.batches[0]), 1)
+        buffer.close()
+    
+    def test_close_drains_buffer(self):
+        """Test that closing saves the buffered records and drops later ones."""
+        manager = FakeManager()
+        buffer = make_buffer(manager, max_size=2)
+        buffer.add(FakeRecord(1))
+        buffer.add(FakeRecord(2))
+        self.assertFalse(buffer.add(FakeRecord(3)))
+        
+        self.assertEqual(buffer.close(), 2)
+        self.assertFalse(buffer.add(FakeRecord(4)))
+        
+        stats = buffer.get_stats()
+        self.assertEqual((stats['depth'], stats['records_written'], stats['records_dropped']), (0, 2, 2))
+    
+    def test_failed_insert_saves_records_one_by_one(self):
+        """Test that one bad record does not lose the rest of its batch."""
+        buffer = make_buffer(FakeManager(fail=True))
+        records = [FakeRecord(1), FakeRecord(2, bad=True), FakeRecord(3)]
+        
+        self.assertEqual(buffer.write(records), 2)
+        self.assertEqual([record.saved for record in records], [True, False, True])
+        self.assertEqual(buffer.get_stats()['records_failed'], 1)
+        buffer.close()
+    
+    def test_after_write_gets_saved_records(self):
+        """Test that the after write callback gets every batch, without the records that failed."""
+        written = []
+        records = [FakeRecord(1), FakeRecord(2, bad=True)]
+        with patch('apps.common.write_buffer.router'), patch('apps.common.write_buffer.transaction'):
+            make_buffer(FakeManager(), after_write=written.append).write(records)
+            make_buffer(FakeManager(fail=True), after_write=written.append).write(records)
+        
+        self.assertEqual([[record.value for record in batch] for batch in written], [[1, 2], [1]])
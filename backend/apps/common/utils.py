@@ -4,22 +4,52 @@ Utility functions for the North Sea Watch project.
 import ipaddress
 import logging
 import re
+from bisect import bisect_right
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
-# List of trusted proxy IP patterns (can be expanded as needed)
+# Trusted proxy networks in CIDR notation (can be expanded as needed)
 TRUSTED_PROXIES = [
     # GCP load balancers
-    r'^35\.[\d]{1,3}\.[\d]{1,3}\.[\d]{1,3}$',  # GCP load balancer IPs
+    '35.0.0.0/8',  # GCP load balancer IPs
     # Internal proxy server IPs
-    r'^10\.[\d]{1,3}\.[\d]{1,3}\.[\d]{1,3}$',
-    r'^172\.(1[6-9]|2[0-9]|3[0-1])\.[\d]{1,3}\.[\d]{1,3}$',
-    r'^192\.168\.[\d]{1,3}\.[\d]{1,3}$',
+    '10.0.0.0/8',
+    '172.16.0.0/12',
+    '192.168.0.0/16',
     # Localhost
-    r'^127\.[\d]{1,3}\.[\d]{1,3}\.[\d]{1,3}$',
-    r'^::1$'
+    '127.0.0.0/8',
+    '::1/128'
 ]
 
+# Distinct X-Forwarded-For values and IP strings remembered per process
+CLIENT_IP_CACHE_SIZE = 4096
+
+# Characters that cannot be part of an IP address list
+_FORWARDED_FOR_INVALID_CHARS = re.compile(r'[^0-9a-fA-F:.,]')
+
+def _build_trusted_ranges(networks):
+    """
+    Merge CIDR networks into sorted, non-overlapping address ranges per IP version.
+    
+    Args:
+        networks (list): CIDR network strings
+        
+    Returns:
+        dict: IP version to a tuple of the sorted range starts and their ends, as integers
+    """
+    parsed = [ipaddress.ip_network(network) for network in networks]
+    ranges = {}
+    for version in (4, 6):
+        collapsed = list(ipaddress.collapse_addresses(n for n in parsed if n.version == version))
+        ranges[version] = (
+            [int(network.network_address) for network in collapsed],
+            [int(network.broadcast_address) for network in collapsed],
+        )
+    return ranges
+
+_TRUSTED_RANGES = _build_trusted_ranges(TRUSTED_PROXIES)
+
 def get_real_client_ip(request):
     """
     Extract the real client IP address from the request.
@@ -51,21 +81,7 @@ def get_real_client_ip(request):
                 logger.warning("Suspiciously long X-Forwarded-For header received")
                 forwarded_for = None
             else:
-                # Clean the forwarded_for string and split into IPs
-                forwarded_for = re.sub(r'[^0-9a-fA-F:.,]', '', forwarded_for)
-                ip_list = [ip.strip() for ip in forwarded_for.split(',') if ip.strip()]
-                
-                # If we have IPs in the list, process them
-                if ip_list:
-                    # Strategy 1: Get the first non-trusted proxy IP (from left to right)
-                    for ip in ip_list:
-                        if not _is_trusted_proxy(ip) and _is_valid_ip(ip):
-                            ip_address = ip
-                            break
-                    
-                    # Strategy 2: If all IPs are trusted or invalid, take the leftmost one
-                    if ip_address == "Unknown" and ip_list:
-                        ip_address = ip_list[0]
+                ip_address = _get_forwarded_for_client_ip(forwarded_for)
         
         # If X-Forwarded-For doesn't yield a result, try alternative headers
         if ip_address == "Unknown":
@@ -101,6 +117,47 @@ def get_real_client_ip(request):
     
     return ip_address
 
+@lru_cache(maxsize=CLIENT_IP_CACHE_SIZE)
+def _get_forwarded_for_client_ip(forwarded_for):
+    """
+    Pick the client IP from an X-Forwarded-For header value.
+    
+    The result only depends on the header value, so it is cached per value.
+    
+    Args:
+        forwarded_for (str): The X-Forwarded-For header value
+        
+    Returns:
+        str: The first non-trusted valid IP, else the leftmost entry, or "Unknown"
+    """
+    # Clean the forwarded_for string and split into IPs
+    forwarded_for = _FORWARDED_FOR_INVALID_CHARS.sub('', forwarded_for)
+    ip_list = [ip.strip() for ip in forwarded_for.split(',') if ip.strip()]
+    
+    # Strategy 1: Get the first non-trusted proxy IP (from left to right)
+    for ip in ip_list:
+        if _is_valid_ip(ip) and not _is_trusted_proxy(ip):
+            return ip
+    
+    # Strategy 2: If all IPs are trusted or invalid, take the leftmost one
+    return ip_list[0] if ip_list else "Unknown"
+
+@lru_cache(maxsize=CLIENT_IP_CACHE_SIZE)
+def _parse_ip(ip):
+    """
+    Parse an IP string once per distinct string.
+    
+    Args:
+        ip (str): The IP string to parse
+        
+    Returns:
+        IPv4Address or IPv6Address, or None if the string is not a valid IP
+    """
+    try:
+        return ipaddress.ip_address(ip)
+    except ValueError:
+        return None
+
 def _is_trusted_proxy(ip):
     """
     Check if an IP belongs to a trusted proxy.
@@ -111,13 +168,15 @@ def _is_trusted_proxy(ip):
     Returns:
         bool: True if the IP is from a trusted proxy, False otherwise
     """
-    try:
-        for pattern in TRUSTED_PROXIES:
-            if re.match(pattern, ip):
-                return True
-        return False
-    except Exception:
+    ip_obj = _parse_ip(ip)
+    if ip_obj is None:
         return False
+    
+    # The last range starting at or below the address is the only candidate
+    starts, ends = _TRUSTED_RANGES[ip_obj.version]
+    ip_int = int(ip_obj)
+    index = bisect_right(starts, ip_int) - 1
+    return index >= 0 and ip_int <= ends[index]
 
 def _is_valid_ip(ip):
     """
@@ -129,12 +188,9 @@ def _is_valid_ip(ip):
     Returns:
         bool: True if the IP is valid, False otherwise
     """
-    try:
-        ipaddress.ip_address(ip)
-        return True
-    except ValueError:
-        return False
+    return _parse_ip(ip) is not None
 
+@lru_cache(maxsize=CLIENT_IP_CACHE_SIZE)
 def _is_internal_ip(ip):
     """
     Check if an IP is an internal/private network address.
@@ -145,13 +201,12 @@ def _is_internal_ip(ip):
     Returns:
         bool: True if the IP is internal, False otherwise
     """
-    try:
-        ip_obj = ipaddress.ip_address(ip)
-        return (
-            ip_obj.is_private or
-            ip_obj.is_loopback or
-            ip_obj.is_link_local or
-            ip_obj.is_reserved
-        )
-    except ValueError:
-        return False 
\ No newline at end of file
+    ip_obj = _parse_ip(ip)
+    if ip_obj is None:
+        return False
+    return (
+        ip_obj.is_private or
+        ip_obj.is_loopback or
+        ip_obj.is_link_local or
+        ip_obj.is_reserved
+    )
@@ -0,0 +1,237 @@
+"""
+Bulk write buffer for the North Sea Watch project.
+Collects model instances in memory and saves them with bulk_create from a
+background thread, every batch_size records or flush_interval seconds, so
+bursts of small writes become a few multi-row inserts. The buffer is
+drained when the process exits.
+"""
+import atexit
+import logging
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional
+
+from django.db import close_old_connections, router, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class BulkWriteBuffer:
+    """
+    In-process buffer of unsaved model instances.
+
+    Args:
+        model: Model class of the buffered instances
+        batch_size: Records that trigger a flush, and the most saved per insert
+        flush_interval: Seconds the oldest buffered record waits at most
+        max_size: Records held at most; further records are dropped
+        name: Name used in logs and the flusher thread name
+        after_write: Called with every batch of saved records, in the transaction
+            of the bulk insert, to maintain data derived from the records
+    """
+
+    def __init__(self, model, batch_size: int, flush_interval: float, max_size: int, name: str = None,
+                 after_write: Optional[Callable[[List], None]] = None):
+        self.model = model
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self.name = name or model._meta.model_name
+        self.after_write = after_write
+
+        self._records = []
+        # Monotonic time the oldest buffered record was added
+        self._oldest_at = None
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+        self._stats = {
+            'flushes': 0,
+            'records_written': 0,
+            'records_failed': 0,
+            'records_dropped': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+        }
+        atexit.register(self.close)
+
+    def add(self, record) -> bool:
+        """
+        Buffer an unsaved model instance.
+
+        Returns:
+            False if the buffer is full or closed and the record was dropped
+        """
+        with self._condition:
+            if self._closed or len(self._records) >= self.max_size:
+                self._stats['records_dropped'] += 1
+                logger.warning(f"{self.name} write buffer is {'closed' if self._closed else 'full'}, record dropped")
+                return False
+
+            if not self._records:
+                self._oldest_at = time.monotonic()
+            self._records.append(record)
+            if len(self._records) >= self.batch_size:
+                self._condition.notify()
+
+        self._ensure_flusher_running()
+        return True
+
+    def _take_batch(self) -> List:
+        batch = self._records[:self.batch_size]
+        del self._records[:self.batch_size]
+        if not self._records:
+            # Otherwise the remaining, newer records keep the earlier deadline
+            self._oldest_at = None
+        return batch
+
+    def write(self, batch: List) -> int:
+        """
+        Save records right away, bypassing the buffer.
+
+        Inserts batch_size records per query, falling back to one insert per
+        record so a single bad record does not lose the rest of the batch.
+
+        Returns:
+            Number of records saved
+        """
+        started = time.monotonic()
+        atomic = transaction.atomic(using=router.db_for_write(self.model)) if self.after_write else nullcontext()
+        try:
+            with atomic:
+                self.model._default_manager.bulk_create(batch, batch_size=self.batch_size)
+                if self.after_write:
+                    self.after_write(batch)
+            written = len(batch)
+        except Exception as e:
+            logger.error(f"Bulk insert of {len(batch)} {self.name} records failed: {str(e)}", exc_info=True)
+            saved = []
+            for record in batch:
+                try:
+                    record.save()
+                    saved.append(record)
+                except Exception as e:
+                    logger.error(f"Error saving {self.name} record: {str(e)}")
+            written = len(saved)
+            if self.after_write and saved:
+                try:
+                    self.after_write(saved)
+                except Exception as e:
+                    logger.error(f"Error processing {written} saved {self.name} records: {str(e)}", exc_info=True)
+
+        flush_ms = (time.monotonic() - started) * 1000
+        with self._condition:
+            self._stats['flushes'] += 1
+            self._stats['records_written'] += written
+            self._stats['records_failed'] += len(batch) - written
+            self._stats['last_flush_ms'] = round(flush_ms, 2)
+            self._stats['max_flush_ms'] = round(max(self._stats['max_flush_ms'], flush_ms), 2)
+            self._stats['total_flush_ms'] += flush_ms
+        logger.debug(f"Flushed {written} of {len(batch)} {self.name} records in {flush_ms:.1f} ms")
+        return written
+
+    def _flush_loop(self):
+        """
+        Background loop flushing full batches and batches whose oldest record is due.
+        """
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if len(self._records) >= self.batch_size:
+                        break
+                    if self._records:
+                        remaining = self._oldest_at + self.flush_interval - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+                if self._closed:
+                    # close() writes whatever is left
+                    return
+                batch = self._take_batch()
+
+            try:
+                close_old_connections()
+                self.write(batch)
+            except Exception as e:
+                logger.error(f"Error flushing {self.name} write buffer: {str(e)}", exc_info=True)
+            finally:
+                close_old_connections()
+
+    def _ensure_flusher_running(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._condition:
+            if not self._closed and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(
+                    target=self._flush_loop,
+                    name=f'{self.name}-write-buffer',
+                    daemon=True
+                )
+                self._thread.start()
+                logger.info(f"Started {self.name} write buffer flusher thread")
+
+    def flush(self) -> int:
+        """
+        Save all buffered records now, in the calling thread.
+
+        Returns:
+            Number of records saved
+        """
+        written = 0
+        while True:
+            with self._condition:
+                batch = self._take_batch()
+            if not batch:
+                return written
+            written += self.write(batch)
+
+    def close(self, timeout: float = 10) -> int:
+        """
+        Stop the flusher thread and save the remaining records.
+
+        Called when the process exits; records added afterwards are dropped.
+
+        Args:
+            timeout: Seconds to wait for a flush in progress to finish
+
+        Returns:
+            Number of records saved
+        """
+        with self._condition:
+            if self._closed:
+                return 0
+            self._closed = True
+            self._condition.notify_all()
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+        written = self.flush()
+        if written:
+            logger.info(f"Saved {written} buffered {self.name} records on shutdown")
+        return written
+
+    def get_stats(self) -> Dict:
+        """
+        Return the buffer depth and flush statistics.
+
+        Returns:
+            Dictionary with the buffered records, the age of the oldest one,
+            the records written, failed and dropped, and the flush count and
+            last, maximum and average flush time in milliseconds
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            stats['depth'] = len(self._records)
+            stats['oldest_age_seconds'] = (
+                round(time.monotonic() - self._oldest_at, 2) if self._oldest_at is not None else 0
+            )
+        total_flush_ms = stats.pop('total_flush_ms')
+        stats['avg_flush_ms'] = round(total_flush_ms / stats['flushes'], 2) if stats['flushes'] else 0
+        return stats
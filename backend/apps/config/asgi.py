@@ -13,3 +13,12 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'apps.config.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.ASYNC_AIS_VIEWS_ENABLED:
+    # Only the async views run on the event loop, the sync views keep their thread pool
+    from django.core.wsgi import get_wsgi_application  # noqa: E402
+    from apps.north_sea_watch.utils.asgi_routing import AsyncViewRouter  # noqa: E402
+
+    application = AsyncViewRouter(application, get_wsgi_application(), settings.ASYNC_AIS_SYNC_THREADS)
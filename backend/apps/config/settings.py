@@ -174,9 +174,85 @@ print(f"AIS DB: {DATABASES['ais_data']['NAME']}")
 print(f"Default DB Host: {DATABASES['default']['HOST']}")
 print(f"AIS DB Host: {DATABASES['ais_data']['HOST']}")
 
+# Read replicas of the AIS database
+# Comma-separated replica hosts (host, host:port or a /cloudsql socket directory), each added as
+# an ais_data_replica_<n> database with the ais_data name and credentials. Reads of the AIS
+# reference and position data are spread over the replicas whose replication lag is within
+# AIS_DATA_REPLICA_MAX_LAG_SECONDS, and fall back to the primary otherwise
+AIS_DATA_REPLICA_HOSTS = [host.strip() for host in os.environ.get('AIS_DATA_REPLICA_HOSTS', '').split(',') if host.strip()]
+AIS_DATA_REPLICA_MAX_LAG_SECONDS = float(os.environ.get('AIS_DATA_REPLICA_MAX_LAG_SECONDS', '30'))
+# Seconds between replication lag checks of each replica, per worker process
+AIS_DATA_REPLICA_LAG_CHECK_SECONDS = float(os.environ.get('AIS_DATA_REPLICA_LAG_CHECK_SECONDS', '10'))
+# Seconds to wait for a connection to a replica, so a replica host that stops answering is
+# taken out of the rotation quickly instead of blocking reads for the OS TCP connect timeout
+AIS_DATA_REPLICA_CONNECT_TIMEOUT = int(os.environ.get('AIS_DATA_REPLICA_CONNECT_TIMEOUT', '3'))
+
+AIS_DATA_REPLICAS = []
+for index, replica_host in enumerate(AIS_DATA_REPLICA_HOSTS, start=1):
+    if replica_host.startswith('/'):
+        replica_port = ''
+    else:
+        replica_host, _, replica_port = replica_host.partition(':')
+    alias = f'ais_data_replica_{index}'
+    DATABASES[alias] = dict(
+        DATABASES['ais_data'],
+        HOST=replica_host,
+        PORT=replica_port or DATABASES['ais_data']['PORT'],
+        OPTIONS=dict(DATABASES['ais_data'].get('OPTIONS', {}), connect_timeout=AIS_DATA_REPLICA_CONNECT_TIMEOUT),
+        TEST={'MIRROR': 'ais_data'},
+    )
+    AIS_DATA_REPLICAS.append(alias)
+
+print(f"AIS DB replicas: {[DATABASES[alias]['HOST'] for alias in AIS_DATA_REPLICAS]}")
+
+# Connection pooling
+# With DB_POOL_ENABLED each worker process checks connections out of a bounded psycopg pool per
+# database instead of keeping a persistent connection per thread; when all DB_POOL_MAX_SIZE
+# connections are in use, requests wait up to DB_POOL_TIMEOUT seconds for one to be returned
+# Needs the requirements/psycopg3.txt packages, which switch every connection to psycopg 3
+DB_POOL_ENABLED = os.environ.get('DB_POOL_ENABLED', 'False').lower() == 'true'
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', '2'))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '8'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10'))
+
+if DB_POOL_ENABLED:
+    for database in DATABASES.values():
+        database['ENGINE'] = 'apps.common.db_backends.pooled_postgresql'
+        # Connections go back to the pool at the end of every request
+        database['CONN_MAX_AGE'] = 0
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+        }
+
+print(f"DB pool enabled: {DB_POOL_ENABLED}")
+
 # Database routers
 DATABASE_ROUTERS = ['apps.north_sea_watch.db_routers.AisDataRouter']
 
+# Cache configuration
+# A shared Redis cache lets every worker process reuse the same snapshots,
+# otherwise each process keeps its own in-memory copy
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'north-sea-watch',
+        }
+    }
+
+print(f"Cache backend: {CACHES['default']['BACKEND']}")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -336,13 +412,97 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': False,
         },
+        # Logs every connection checkout at INFO
+        'psycopg.pool': {
+            'level': 'WARNING',
+        },
     },
 }
 
 # Tracking configuration
 TRACKING_ALLOWED_DOMAINS = ['northseawatch.org', 'www.northseawatch.org']
+# Queue tracked visits for a background worker that does the IP lookup and saves them in batches,
+# answering the request with 202; disable to record each visit inside its request
+TRACKING_ASYNC_ENABLED = os.environ.get('TRACKING_ASYNC_ENABLED', 'True').lower() == 'true'
+# Visits waiting per worker process before new ones are rejected with 503
+TRACKING_QUEUE_MAX_SIZE = int(os.environ.get('TRACKING_QUEUE_MAX_SIZE', '10000'))
+# Enriched visits are inserted together every TRACKING_BATCH_SIZE visits or TRACKING_FLUSH_SECONDS
+TRACKING_BATCH_SIZE = int(os.environ.get('TRACKING_BATCH_SIZE', '100'))
+TRACKING_FLUSH_SECONDS = float(os.environ.get('TRACKING_FLUSH_SECONDS', '5'))
+# Classified user agent strings memoized per worker process
+USER_AGENT_CACHE_SIZE = int(os.environ.get('USER_AGENT_CACHE_SIZE', '4096'))
+# Seconds a stopping worker process spends geolocating and saving the visits it still holds
+TRACKING_SHUTDOWN_TIMEOUT = float(os.environ.get('TRACKING_SHUTDOWN_TIMEOUT', '10'))
+# Days of raw visits kept by the prune_user_tracking command; older days remain in the daily rollups
+TRACKING_RAW_RETENTION_DAYS = int(os.environ.get('TRACKING_RAW_RETENTION_DAYS', '90'))
+# Longest date range of the tracking summary endpoint
+TRACKING_SUMMARY_MAX_DAYS = int(os.environ.get('TRACKING_SUMMARY_MAX_DAYS', '366'))
 
 # IP-API configuration
 IP_API_URL = 'http://ip-api.com/json/{ip}'
 # Fields ordered as they appear in the original IP-API response
 IP_API_FIELDS = ['status', 'country', 'countryCode', 'region', 'regionName', 'city', 'zip', 'lat', 'lon', 'timezone', 'isp', 'org', 'as']
+# IP geolocation providers asked in order until one locates the address: 'mmdb' reads a local
+# MaxMind GeoLite2/GeoIP2 or DB-IP City database (and optionally the matching ASN database for the
+# ISP and AS fields) without network I/O, 'ip-api' queries IP_API_URL
+IP_GEO_MMDB_CITY_PATH = os.environ.get('IP_GEO_MMDB_CITY_PATH', '')
+IP_GEO_MMDB_ASN_PATH = os.environ.get('IP_GEO_MMDB_ASN_PATH', '')
+IP_GEO_PROVIDERS = [
+    provider.strip()
+    for provider in (os.environ.get('IP_GEO_PROVIDERS') or ('mmdb,ip-api' if IP_GEO_MMDB_CITY_PATH else 'ip-api')).split(',')
+    if provider.strip()
+]
+# Seconds IP-API responses are kept in the shared cache, and failed or rate limited lookups
+IP_GEO_CACHE_SECONDS = int(os.environ.get('IP_GEO_CACHE_SECONDS', str(7 * 24 * 3600)))
+IP_GEO_NEGATIVE_CACHE_SECONDS = int(os.environ.get('IP_GEO_NEGATIVE_CACHE_SECONDS', '600'))
+# Most recently used lookups also kept in memory per worker process
+IP_GEO_CACHE_MAX_ENTRIES = int(os.environ.get('IP_GEO_CACHE_MAX_ENTRIES', '10000'))
+# Share one cache entry per IPv4 /24 or IPv6 /48 network instead of per address
+IP_GEO_CACHE_GROUP_BY_PREFIX = os.environ.get('IP_GEO_CACHE_GROUP_BY_PREFIX', 'False').lower() == 'true'
+
+# Active ships snapshot configuration
+# Ships reporting within the window are included in the snapshot
+FLEET_SNAPSHOT_WINDOW_HOURS = 3
+# How often the background thread rebuilds the snapshot
+FLEET_SNAPSHOT_REFRESH_SECONDS = int(os.environ.get('FLEET_SNAPSHOT_REFRESH_SECONDS', '60'))
+# Disable to rely only on the refresh_fleet_snapshot management command
+FLEET_SNAPSHOT_BACKGROUND_REFRESH = os.environ.get('FLEET_SNAPSHOT_BACKGROUND_REFRESH', 'True').lower() == 'true'
+# Serve the snapshot from the incrementally maintained ship_latest_position table,
+# once the refresh_latest_positions command (cron) has backfilled it
+FLEET_SNAPSHOT_USE_LATEST_POSITIONS = os.environ.get('FLEET_SNAPSHOT_USE_LATEST_POSITIONS', 'True').lower() == 'true'
+
+# Past scrubber distribution configuration
+# Serve the endpoint from the rollups maintained by update_scrubber_rollups when they cover the requested range
+SCRUBBER_ROLLUPS_ENABLED = os.environ.get('SCRUBBER_ROLLUPS_ENABLED', 'True').lower() == 'true'
+# Default grid cell size in degrees for mode=grid requests
+SCRUBBER_GRID_DEFAULT_RESOLUTION = float(os.environ.get('SCRUBBER_GRID_DEFAULT_RESOLUTION', '0.1'))
+# Seconds between checks of icct_scrubber_march_2025 for changes to the cached scrubber IMO numbers
+SCRUBBER_IMO_CACHE_CHECK_SECONDS = int(os.environ.get('SCRUBBER_IMO_CACHE_CHECK_SECONDS', '60'))
+
+# Dataset metadata configuration
+# Seconds the ship_data bounds and daily counts are cached before the stats table is read again
+DATASET_METADATA_CACHE_SECONDS = int(os.environ.get('DATASET_METADATA_CACHE_SECONDS', '300'))
+
+# Response cache configuration
+# Serve the ports, port contents and ICCT endpoints from rendered responses in the cache
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'True').lower() == 'true'
+# Seconds rendered responses are kept; saving port contents or reloading a table invalidates them earlier
+RESPONSE_CACHE_SECONDS = int(os.environ.get('RESPONSE_CACHE_SECONDS', '3600'))
+# Seconds browsers and the nginx front reuse a response before revalidating it with its ETag
+RESPONSE_CACHE_MAX_AGE = int(os.environ.get('RESPONSE_CACHE_MAX_AGE', '60'))
+# Seconds between checks of the ports and ICCT tables for reloads
+RESPONSE_CACHE_CHECK_SECONDS = int(os.environ.get('RESPONSE_CACHE_CHECK_SECONDS', '60'))
+
+# Async views configuration
+# Serve the active ships, ship path and past scrubber distribution endpoints with their async
+# variants; entrypoint.prod.sh then runs the ASGI application on a uvicorn worker. Needs the
+# requirements/async.txt packages, which switch every connection to psycopg 3
+ASYNC_AIS_VIEWS_ENABLED = os.environ.get('ASYNC_AIS_VIEWS_ENABLED', 'False').lower() == 'true'
+# Threads of each ASGI worker process serving the sync views through the WSGI application,
+# like the --threads of the WSGI server
+ASYNC_AIS_SYNC_THREADS = int(os.environ.get('ASYNC_AIS_SYNC_THREADS', '8'))
+# Size of the async ais_data connection pool of each worker process
+ASYNC_AIS_POOL_MIN_SIZE = int(os.environ.get('ASYNC_AIS_POOL_MIN_SIZE', '1'))
+ASYNC_AIS_POOL_MAX_SIZE = int(os.environ.get('ASYNC_AIS_POOL_MAX_SIZE', '10'))
+# Seconds a request waits for a free pooled connection before failing
+ASYNC_AIS_POOL_TIMEOUT = float(os.environ.get('ASYNC_AIS_POOL_TIMEOUT', '10'))
@@ -0,0 +1,3 @@
+"""
+North Sea Watch app: AIS ship data, ports and scrubber vessel endpoints.
+"""
@@ -1,8 +1,13 @@
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
 from django.db import connections
 from django.core.exceptions import ValidationError
 from django.forms import ModelForm
-from .models import PortContent, Port, UserTracking
+from django.db.models import Q
+from apps.common.pagination import paginate
+from .models import PortContent, Port, UserTracking, UserTrackingDailyRollup
+from .utils.tracking_rollups import UNKNOWN
 
 class PortContentForm(ModelForm):
     """
@@ -129,15 +134,84 @@ class PortContentAdmin(admin.ModelAdmin):
 
 admin.site.register(PortContent, PortContentAdmin)
 
+class RollupValueListFilter(admin.SimpleListFilter):
+    """
+    List filter offering the values recorded in the daily visit rollups, instead
+    of the distinct values of the whole user_tracking table.
+    """
+    def lookups(self, request, model_admin):
+        values = (
+            UserTrackingDailyRollup.objects.order_by(self.parameter_name)
+            .values_list(self.parameter_name, flat=True).distinct()
+        )
+        return [(value, value) for value in values]
+    
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value is None:
+            return queryset
+        if value == UNKNOWN:
+            # Visits counted as Unknown in the rollups
+            return queryset.filter(
+                Q(**{f'{self.parameter_name}__isnull': True}) |
+                Q(**{self.parameter_name: ''}) |
+                Q(**{self.parameter_name: UNKNOWN})
+            )
+        return queryset.filter(**{self.parameter_name: value})
+
+class CountryListFilter(RollupValueListFilter):
+    title = 'country'
+    parameter_name = 'country'
+
+class DeviceTypeListFilter(RollupValueListFilter):
+    title = 'device type'
+    parameter_name = 'device_type'
+
+# Query string parameter holding the position of the last visit of the previous page
+CURSOR_VAR = 'after'
+
+class KeysetChangeList(ChangeList):
+    """
+    Change list paging newest first by (timestamp, id) from a cursor, instead of
+    by page number, so deep pages stay cheap and nothing is counted.
+    """
+    def get_queryset(self, request):
+        # The cursor only selects the page; filters, searches and their links start from the newest visit
+        self.cursor = self.params.pop(CURSOR_VAR, None)
+        return super().get_queryset(request)
+    
+    def get_results(self, request):
+        try:
+            result_list, next_cursor = paginate(self.queryset, self.cursor, self.list_per_page)
+        except ValueError as e:
+            raise IncorrectLookupParameters(e) from e
+        
+        self.result_count = len(result_list)
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.result_list = result_list
+        self.can_show_all = False
+        self.multi_page = bool(self.cursor or next_cursor)
+        self.paginator = None
+        self.first_page_url = self.get_query_string() if self.cursor else None
+        self.next_page_url = self.get_query_string({CURSOR_VAR: next_cursor}) if next_cursor else None
+
 class UserTrackingAdmin(admin.ModelAdmin):
     """
     Admin interface for UserTracking model.
+    Pages by keyset, without counting the visits; every searched column has a
+    trigram index matching the search. Countries and device types are picked
+    from the rollup backed list filters instead of searched.
     """
     list_display = ('ip_address', 'country', 'country_code', 'city', 'device_type', 'timestamp', 'page_url', 'is_bot')
-    list_filter = ('country', 'country_code', 'region_name', 'city', 'timezone', 'device_type', 'timestamp', 'is_bot')
-    search_fields = ('ip_address', 'country', 'country_code', 'region', 'region_name', 'city', 'user_agent', 
-                    'page_url', 'referer', 'session_id', 'bot_agent', 'isp', 'org')
+    list_filter = (CountryListFilter, DeviceTypeListFilter, 'timestamp', 'is_bot')
+    search_fields = ('ip_address', 'page_url', 'user_agent', 'session_id')
     readonly_fields = ('timestamp',)
+    ordering = ('-timestamp', '-id')
+    # Other orderings cannot be paged by keyset
+    sortable_by = ()
+    show_full_result_count = False
     
     fieldsets = (
         (None, {
@@ -159,5 +233,28 @@ class UserTrackingAdmin(admin.ModelAdmin):
             'fields': ('is_bot', 'bot_agent')
         }),
     )
+    
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
 
 admin.site.register(UserTracking, UserTrackingAdmin)
+
+class UserTrackingDailyRollupAdmin(admin.ModelAdmin):
+    """
+    Read-only admin interface for the daily visit rollups.
+    """
+    list_display = ('day', 'country', 'device_type', 'is_bot', 'visits', 'visits_with_ip_data')
+    list_filter = ('is_bot', 'device_type')
+    search_fields = ('country',)
+    date_hierarchy = 'day'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+admin.site.register(UserTrackingDailyRollup, UserTrackingDailyRollupAdmin)
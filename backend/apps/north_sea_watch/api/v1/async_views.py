@@ -0,0 +1,309 @@
+"""
+Async variants of the read-only AIS endpoints for the ASGI server.
+They run their ship_data queries on the async connection pool, so slow
+history queries no longer tie up a worker thread each, and stream=true
+responses are written from an async server-side cursor. Requests they do not
+handle natively (MessagePack, other databases) are passed on to the sync views.
+"""
+import logging
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from apps.north_sea_watch.utils import (
+    async_db, fleet_snapshot, replicas, scrubber_distribution, scrubber_rollups, scrubber_vessels, streaming
+)
+from apps.north_sea_watch.utils.columnar import columnar_ship_path, columnar_time_groups
+from apps.north_sea_watch.utils.ship_paths import SHIP_PATH_QUERY
+from . import views
+from .renderers import MessagePackRenderer
+
+logger = logging.getLogger(__name__)
+
+
+def _json_response(data, status=status.HTTP_200_OK):
+    """
+    Render data exactly as the REST framework JSON renderer of the sync views does.
+    """
+    return HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status)
+
+
+def needs_sync_view(requested_format, accept: str) -> bool:
+    """
+    Check whether a request asks for a format only the REST framework
+    content negotiation of the sync views provides.
+
+    Args:
+        requested_format: Value of the format query parameter, or None
+        accept: Accept header of the request
+    """
+    if requested_format is not None:
+        return requested_format != 'json'
+    return MessagePackRenderer.media_type in accept
+
+
+def _needs_sync_view(request) -> bool:
+    return needs_sync_view(request.GET.get('format'), request.headers.get('Accept', ''))
+
+
+def _wants_stream(request) -> bool:
+    """
+    Check whether the request asks for a streamed response. Streams are only
+    written from the async pool; without it the sync view streams them.
+    """
+    return request.GET.get('stream', 'false').lower() == 'true'
+
+
+async def get_active_ships(request):
+    """
+    Async variant of views.get_active_ships.
+
+    The snapshot is read from the cache; only a cold cache builds it, in a
+    thread. Supports the same ETag revalidation and columnar layout.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    if _needs_sync_view(request):
+        return await sync_to_async(views.get_active_ships)(request)
+
+    try:
+        fleet_snapshot.ensure_refresher_running()
+        snapshot = await cache.aget(fleet_snapshot.SNAPSHOT_CACHE_KEY)
+        if snapshot is None:
+            snapshot = await sync_to_async(fleet_snapshot.get_snapshot)()
+        etag = snapshot['etag']
+
+        if request.GET.get('layout') == 'columnar':
+            response = _json_response(fleet_snapshot.get_columnar_ships(snapshot, False))
+            etag = etag[:-1] + '-columnar"'
+        else:
+            response = _json_response(snapshot['ships'])
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(snapshot['last_modified'].timestamp())
+        # Let browsers keep the payload but always revalidate it
+        response['Cache-Control'] = 'no-cache'
+        response['Vary'] = 'Accept'
+
+        return get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(snapshot['last_modified'].timestamp()),
+            response=response
+        )
+    except Exception as e:
+        return _json_response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+async def get_ship_path(request, imo_number):
+    """
+    Async variant of views.get_ship_path, with the same tolerance, encoding,
+    layout and stream options.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    if _needs_sync_view(request) or (_wants_stream(request) and not async_db.pool_available()):
+        return await sync_to_async(views.get_ship_path)(request, imo_number)
+
+    try:
+        tolerance, encoding = views._parse_path_options(request.GET)
+    except ValueError as e:
+        return _json_response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        twenty_four_hours_ago = timezone.now() - timedelta(hours=24)
+        read_alias = await sync_to_async(replicas.get_read_alias)()
+
+        # Simplification needs the whole track, so only plain requests are streamed
+        if (_wants_stream(request) and tolerance is None and encoding is None
+                and request.GET.get('layout') != 'columnar'):
+            return streaming.async_streaming_json_response(streaming.async_json_array(
+                views._row_to_path_position(row) async for row in async_db.iter_server_side_rows(
+                    SHIP_PATH_QUERY, [imo_number, twenty_four_hours_ago], using=read_alias
+                )
+            ))
+
+        rows = await async_db.fetch_all(
+            SHIP_PATH_QUERY, [imo_number, twenty_four_hours_ago], using=read_alias
+        )
+
+        if tolerance is not None:
+            original_count = len(rows)
+            rows = views._simplify_path_rows(rows, tolerance)
+            logger.info(f"Simplified path of IMO {imo_number} from {original_count} to {len(rows)} points")
+
+        if encoding == 'polyline':
+            track = views._encode_path_rows(rows)
+            return _json_response(dict(track, imo_number=imo_number, encoding=encoding, tolerance=tolerance))
+
+        if request.GET.get('layout') == 'columnar':
+            return _json_response(columnar_ship_path(rows, imo_number, False))
+
+        return _json_response([views._row_to_path_position(row) for row in rows])
+    except Exception as e:
+        logger.error(f"Error in async get_ship_path for IMO {imo_number}: {str(e)}", exc_info=True)
+        return _json_response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _time_groups_response(request, result_groups, query_params):
+    """
+    Build the past scrubber distribution response in the JSON layout the client asked for.
+    """
+    if request.GET.get('layout') == 'columnar':
+        data = columnar_time_groups(result_groups, False)
+        data['query_params'] = query_params
+        return _json_response(data)
+
+    return _json_response({
+        "time_groups": result_groups,
+        "query_params": query_params
+    })
+
+
+def _count_vessels(result_groups):
+    for group in result_groups:
+        group['vessel_count'] = len(set(position['imo_number'] for position in group['positions']))
+
+
+async def get_past_scrubber_distribution(request):
+    """
+    Async variant of views.get_past_scrubber_distribution on PostgreSQL.
+
+    Takes the same query parameters. Raw ship_data queries, and the rollup
+    queries of streamed responses, run on the async pool; the rollup lookups
+    and the cached scrubber IMO numbers, which are cheap, run in a thread.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    if (_needs_sync_view(request) or (_wants_stream(request) and not async_db.pool_available())
+            or connections['ais_data'].vendor != 'postgresql'):
+        return await sync_to_async(views.get_past_scrubber_distribution)(request)
+
+    try:
+        try:
+            # Reads the earliest record from the cached dataset metadata
+            window = await sync_to_async(views._resolve_distribution_window)(request.GET)
+        except ValueError as e:
+            return _json_response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        interval_unit = window['interval_unit']
+        grouping_format = window['grouping_format']
+        start_time = window['start_time']
+        end_time = window['end_time']
+        query_params = window['query_params']
+        # Only the row layout is streamed, columnar responses are built in memory
+        stream = window['stream'] and request.GET.get('layout') != 'columnar'
+        use_rollups = settings.SCRUBBER_ROLLUPS_ENABLED and request.GET.get('source') != 'raw'
+        # The lag check may query the replicas, so it runs in a thread
+        read_alias = await sync_to_async(replicas.get_read_alias)()
+
+        # Grid mode: position counts per grid cell instead of individual positions
+        if window['mode'] == 'grid':
+            resolution = window['resolution']
+            grid_rows = None
+            data_source = 'raw'
+            if use_rollups:
+                grid_rows = await sync_to_async(scrubber_rollups.fetch_rollup_grid)(
+                    interval_unit, start_time, end_time, resolution
+                )
+                data_source = 'rollup'
+
+            if grid_rows is None:
+                data_source = 'raw'
+                imo_numbers = await sync_to_async(scrubber_vessels.get_scrubber_imo_numbers)()
+                grid_rows = await async_db.fetch_all(*scrubber_distribution.build_grid_query(
+                    interval_unit, start_time, end_time, imo_numbers, resolution
+                ), using=read_alias)
+
+            result_groups = scrubber_distribution.group_grid_rows(grid_rows, grouping_format)
+            logger.info(f"Returning {len(result_groups)} grid time groups from {data_source} data")
+
+            return _json_response({
+                "grid": {
+                    "resolution": resolution,
+                },
+                "time_groups": result_groups,
+                "query_params": dict(query_params, mode=window['mode'], source=data_source)
+            })
+
+        if use_rollups and stream:
+            # Checks the rollup coverage, so it runs in a thread
+            rollup_query = await sync_to_async(scrubber_rollups.build_rollup_positions_query)(
+                interval_unit, start_time, end_time
+            )
+            if rollup_query is not None:
+                logger.info(f"Streaming time groups from the scrubber {interval_unit} rollup")
+                return streaming.async_streaming_json_response(streaming.async_json_time_groups(
+                    async_db.iter_server_side_rows(*rollup_query),
+                    grouping_format,
+                    {"query_params": dict(query_params, source="rollup")}
+                ))
+        elif use_rollups:
+            rollup_rows = await sync_to_async(scrubber_rollups.fetch_rollup_positions)(
+                interval_unit, start_time, end_time
+            )
+            if rollup_rows:
+                result_groups = views._group_positions_by_interval(rollup_rows, grouping_format)
+                _count_vessels(result_groups)
+                logger.info(f"Returning {len(result_groups)} time groups from the scrubber {interval_unit} rollup")
+                return _time_groups_response(request, result_groups, dict(query_params, source="rollup"))
+
+        try:
+            imo_numbers = await sync_to_async(scrubber_vessels.get_scrubber_imo_numbers)()
+        except Exception as e:
+            logger.error(f"Error querying scrubber table: {str(e)}")
+            imo_numbers = []
+
+        if not imo_numbers:
+            # Fallback to all vessels reporting positions in the time period
+            logger.warning("No scrubber vessels available, using all active vessels")
+            rows = await async_db.fetch_all(views.ACTIVE_IMO_NUMBERS_QUERY, [start_time, end_time], using=read_alias)
+            imo_numbers = [int(row[0]) for row in rows if str(row[0]).isdigit()]
+
+        if not imo_numbers:
+            logger.warning("No vessels found matching the criteria for the specified time period")
+            return _json_response({
+                "status": "no_data",
+                "message": "No vessels found matching the criteria for the specified time period",
+                "time_groups": [],
+                "query_params": query_params
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        bucketed_query = scrubber_distribution.build_bucketed_query(
+            interval_unit, start_time, end_time, imo_numbers
+        )
+        if stream:
+            logger.info("Streaming time groups from ship_data")
+            return streaming.async_streaming_json_response(streaming.async_json_time_groups(
+                async_db.iter_server_side_rows(*bucketed_query, using=read_alias),
+                grouping_format,
+                {"query_params": query_params}
+            ))
+
+        rows = await async_db.fetch_all(*bucketed_query, using=read_alias)
+        result_groups = views._group_positions_by_interval(rows, grouping_format)
+        _count_vessels(result_groups)
+        logger.info(
+            f"Returning {len(result_groups)} time groups with "
+            f"{sum(len(g['positions']) for g in result_groups)} total positions"
+        )
+
+        return _time_groups_response(request, result_groups, query_params)
+
+    except Exception as e:
+        logger.error(f"Error in async get_past_scrubber_distribution: {str(e)}", exc_info=True)
+
+        error_response = {"error": "Failed to fetch past scrubber distribution data"}
+        if settings.DEBUG:
+            error_response["details"] = str(e)
+        else:
+            error_response["message"] = "An internal server error occurred. Please try again later."
+        return _json_response(error_response, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
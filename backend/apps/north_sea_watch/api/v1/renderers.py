@@ -0,0 +1,63 @@
+"""
+Renderers for the North Sea Watch API.
+MessagePack is offered on the position endpoints when the optional msgpack
+package is installed; clients select it with Accept: application/x-msgpack
+or ?format=msgpack.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import msgpack
+except ImportError:  # Optional dependency
+    msgpack = None
+
+
+def _encode_default(value):
+    """
+    Encode values msgpack does not support natively, as the JSON renderer would.
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not MessagePack serializable")
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders responses as MessagePack. Typed array columns are sent as bin values.
+    """
+    media_type = 'application/x-msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_encode_default, use_bin_type=True)
+
+
+def is_binary_request(request) -> bool:
+    """
+    Check whether the negotiated renderer produces a binary format.
+    """
+    renderer = getattr(request, 'accepted_renderer', None)
+    return getattr(renderer, 'format', None) == MessagePackRenderer.format
+
+
+def wants_columnar(request) -> bool:
+    """
+    Check whether the client asked for the columnar layout, which binary
+    formats always use.
+    """
+    return request.GET.get('layout') == 'columnar' or is_binary_request(request)
+
+
+# Renderers of the position endpoints: the defaults plus MessagePack when available
+POSITION_RENDERER_CLASSES = list(api_settings.DEFAULT_RENDERER_CLASSES)
+if msgpack is not None:
+    POSITION_RENDERER_CLASSES.append(MessagePackRenderer)
@@ -1,6 +1,7 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
 
 app_name = 'api_v1'
 
@@ -9,6 +10,9 @@ router = DefaultRouter()
 router.register(r'ports', views.PortViewSet)
 router.register(r'ships', views.ShipViewSet)
 
+# Under the ASGI server the read-only AIS endpoints are served by their async variants
+ais_views = async_views if settings.ASYNC_AIS_VIEWS_ENABLED else views
+
 urlpatterns = [
     # API root
     path('', views.api_root, name='api-root'),
@@ -18,9 +22,13 @@ urlpatterns = [
     
     # Additional endpoints
     path('all-ports/', views.get_all_ports, name='all-ports'),
-    path('active-ships/', views.get_active_ships, name='active-ships'),
-    path('ship-path/<str:imo_number>/', views.get_ship_path, name='ship-path'),
+    path('active-ships/', ais_views.get_active_ships, name='active-ships'),
+    path('ship-path/<str:imo_number>/', ais_views.get_ship_path, name='ship-path'),
+    path('ship-paths/', views.get_ship_paths, name='ship-paths'),
+    path('dataset-metadata/', views.get_dataset_metadata, name='dataset-metadata'),
     path('test-db-connection/', views.test_db_connection, name='test-db-connection'),
+    path('db-pool-stats/', views.get_db_pool_stats, name='db-pool-stats'),
+    path('db-replica-status/', views.get_db_replica_status, name='db-replica-status'),
     path('table-structure/', views.get_table_structure, name='table-structure'),
     
     # Port content endpoints
@@ -29,6 +37,7 @@ urlpatterns = [
     
     # User tracking endpoint
     path('tracking/', views.track_user_visit, name='tracking'),
+    path('tracking-summary/', views.get_tracking_summary, name='tracking-summary'),
     
     # Debug/test endpoints
     path('test-ip-api/', views.test_ip_api, name='test-ip-api'),
@@ -43,5 +52,5 @@ urlpatterns = [
     path('ais_data/icct_wfr_combined/', views.get_engine_data, name='engine-data'),
     
     # New endpoint for past scrubber distribution
-    path('past-scrubber-distribution/', views.get_past_scrubber_distribution, name='past-scrubber-distribution'),
+    path('past-scrubber-distribution/', ais_views.get_past_scrubber_distribution, name='past-scrubber-distribution'),
 ]
\ No newline at end of file
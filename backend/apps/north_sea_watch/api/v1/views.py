@@ -1,6 +1,6 @@
 from django.http import JsonResponse
 from rest_framework import viewsets
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, renderer_classes
 from rest_framework.response import Response
 from rest_framework import status
 from django.urls import reverse
@@ -14,20 +14,32 @@ from .serializers import (
     UserTrackingSerializer, ICCTScrubberMarch2025Serializer,
     ICCTWFRCombinedSerializer
 )
-from django.db import connections, connection
+from django.db import connections, connection, transaction
 from django.utils import timezone
-from django.utils.dateparse import parse_datetime
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date
 from datetime import timedelta, datetime
+from itertools import groupby
+from operator import itemgetter
 import pytz
 import os
 import re
 import logging
 import traceback
-import requests
-import user_agents
 from django.conf import settings
 from django.db.models import Max
 from apps.common.utils import get_real_client_ip
+from apps.common.db_backends.pooled_postgresql.base import get_pool_stats
+from apps.common import pagination
+from apps.north_sea_watch.utils import (
+    dataset_metadata, fleet_snapshot, ip_geolocation, replicas, response_cache, scrubber_distribution,
+    scrubber_rollups, scrubber_vessels, streaming, tracking_rollups, user_agent_classifier, visit_tracking
+)
+from apps.north_sea_watch.utils.columnar import columnar_ship_path, columnar_time_groups
+from apps.north_sea_watch.utils.ship_paths import SHIP_PATH_QUERY, SHIP_PATHS_QUERY
+from apps.north_sea_watch.utils.track_simplification import encode_track, simplify_indices
+from .renderers import POSITION_RENDERER_CLASSES, is_binary_request, wants_columnar
 from django.forms.models import model_to_dict
 from django.apps import apps
 
@@ -41,8 +53,11 @@ def api_root(request):
         "endpoints": {
             "ports": reverse('api_v1:all-ports', request=request),
             "active_ships": reverse('api_v1:active-ships', request=request),
+            "ship_paths": reverse('api_v1:ship-paths', request=request),
+            "dataset_metadata": reverse('api_v1:dataset-metadata', request=request),
             "port_contents": reverse('api_v1:all-port-contents', request=request),
             "tracking": reverse('api_v1:tracking', request=request),
+            "tracking_summary": reverse('api_v1:tracking-summary', request=request),
             "test_ip_api": reverse('api_v1:test-ip-api', request=request),
             "check_tracking_records": reverse('api_v1:check-tracking-records', request=request),
             "debug_ip_tracking": reverse('api_v1:debug-ip-tracking', request=request),
@@ -55,153 +70,324 @@ def api_root(request):
 class PortViewSet(viewsets.ReadOnlyModelViewSet):
     """
     API endpoint that allows ports to be viewed.
+    Served from the response cache until the ports table changes.
     """
-    queryset = Port.objects.using('ais_data').all()
+    queryset = Port.objects.all()
     serializer_class = PortSerializer
 
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        return response_cache.cached_response(response_cache.PORTS)(super().as_view(actions, **initkwargs))
+
 class ShipViewSet(viewsets.ReadOnlyModelViewSet):
     """
     API endpoint that allows ships to be viewed.
     """
-    queryset = Ship.objects.using('ais_data').all()
+    queryset = Ship.objects.all()
     serializer_class = ShipSerializer
 
+@response_cache.cached_response(response_cache.PORTS)
 @api_view(['GET'])
 def get_all_ports(request):
     """
     Get all ports with their coordinates for map display.
+    Served from the response cache until the ports table changes.
     """
     try:
-        ports = Port.objects.using('ais_data').all()
+        ports = Port.objects.all()
         serializer = PortSerializer(ports, many=True)
         return Response(serializer.data)
     except Exception as e:
         return Response({"error": str(e)}, status=500)
 
 @api_view(['GET'])
+@renderer_classes(POSITION_RENDERER_CLASSES)
 def get_active_ships(request):
     """
     Get all ships that have been active in the last 3 hours with their latest positions.
+
+    The response is served from the fleet snapshot, which a background thread
+    refreshes every FLEET_SNAPSHOT_REFRESH_SECONDS. Clients sending If-None-Match
+    or If-Modified-Since receive a 304 while the fleet is unchanged.
+
+    With layout=columnar, or when MessagePack is negotiated, the ships are
+    returned as parallel arrays instead of one object per ship.
     """
     try:
-        # Get the current time in UTC
-        now = timezone.now()
-        # Calculate the time 3 hours ago
-        three_hours_ago = now - timedelta(hours=3)
-        
-        # Get the latest position for each ship within the last 3 hours
-        with connections['ais_data'].cursor() as cursor:
-            cursor.execute("""
-                WITH latest_positions AS (
-                    SELECT DISTINCT ON (imo_number) 
-                        imo_number, 
-                        timestamp_ais, 
-                        latitude, 
-                        longitude, 
-                        destination,
-                        navigational_status_code,
-                        navigational_status,
-                        true_heading,
-                        rate_of_turn,
-                        cog,
-                        sog
-                    FROM ship_data
-                    WHERE timestamp_ais >= %s
-                    ORDER BY imo_number, timestamp_ais DESC
-                )
-                SELECT s.imo_number, s.mmsi, s.name, s.ship_type, s.length, s.width, 
-                       s.max_draught, s.type_name, s.type_remark,
-                       s.emission_berth, s.emission_anchor, s.emission_maneuver, s.emission_cruise,
-                       lp.timestamp_ais, lp.latitude, lp.longitude, lp.destination,
-                       lp.navigational_status_code, lp.navigational_status, lp.true_heading,
-                       lp.rate_of_turn, lp.cog, lp.sog
-                FROM ships s
-                JOIN latest_positions lp ON s.imo_number = lp.imo_number
-                ORDER BY s.name
-            """, [three_hours_ago])
-            
-            results = []
-            for row in cursor.fetchall():
-                ship_data = {
-                    'imo_number': row[0],
-                    'mmsi': row[1],
-                    'name': row[2],
-                    'ship_type': row[3],
-                    'length': row[4],
-                    'width': row[5],
-                    'max_draught': row[6],
-                    'type_name': row[7],
-                    'type_remark': row[8],
-                    'emission_berth': float(row[9]) if row[9] is not None else None,
-                    'emission_anchor': float(row[10]) if row[10] is not None else None,
-                    'emission_maneuver': float(row[11]) if row[11] is not None else None,
-                    'emission_cruise': float(row[12]) if row[12] is not None else None,
-                    'latest_position': {
-                        'imo_number': row[0],
-                        'timestamp_ais': row[13],
-                        'latitude': row[14],
-                        'longitude': row[15],
-                        'destination': row[16],
-                        'navigational_status_code': row[17],
-                        'navigational_status': row[18],
-                        'true_heading': row[19],
-                        'rate_of_turn': row[20],
-                        'cog': row[21],
-                        'sog': row[22]
-                    }
-                }
-                results.append(ship_data)
-        
-        return Response(results)
+        fleet_snapshot.ensure_refresher_running()
+        snapshot = fleet_snapshot.get_snapshot()
+        etag = snapshot['etag']
+
+        if wants_columnar(request):
+            binary = is_binary_request(request)
+            response = Response(fleet_snapshot.get_columnar_ships(snapshot, binary))
+            # Each representation needs its own validator
+            etag = etag[:-1] + ('-msgpack"' if binary else '-columnar"')
+        else:
+            response = Response(snapshot['ships'])
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(snapshot['last_modified'].timestamp())
+        # Let browsers keep the payload but always revalidate it
+        response['Cache-Control'] = 'no-cache'
+        response['Vary'] = 'Accept'
+
+        return get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(snapshot['last_modified'].timestamp()),
+            response=response
+        )
     except Exception as e:
         return Response({"error": str(e)}, status=500)
 
+def _row_to_path_position(row):
+    """
+    Convert a row of SHIP_PATH_QUERY into the ship path response format.
+    """
+    return {
+        'imo_number': row[0],
+        'timestamp_ais': row[1].isoformat() if row[1] else None,
+        'latitude': row[2],
+        'longitude': row[3],
+        'destination': row[4],
+        'navigational_status_code': row[5],
+        'navigational_status': row[6],
+        'true_heading': row[7],
+        'rate_of_turn': row[8],
+        'cog': row[9],
+        'sog': row[10]
+    }
+
+# Largest accepted ship path simplification tolerance, in metres
+MAX_PATH_TOLERANCE_M = 10000
+
+def _parse_path_options(params):
+    """
+    Read the tolerance and encoding options of the ship path endpoints.
+
+    Returns:
+        Tuple of the tolerance in metres (or None) and the encoding (or None)
+
+    Raises:
+        ValueError: If an option is invalid
+    """
+    tolerance = params.get('tolerance')
+    if tolerance is not None:
+        try:
+            tolerance = float(tolerance)
+        except (TypeError, ValueError):
+            raise ValueError("tolerance must be a number of metres")
+        if not 0 <= tolerance <= MAX_PATH_TOLERANCE_M:
+            raise ValueError(f"tolerance must be between 0 and {MAX_PATH_TOLERANCE_M} metres")
+    
+    encoding = params.get('encoding')
+    if encoding not in (None, 'polyline'):
+        raise ValueError("encoding must be 'polyline'")
+    
+    return tolerance, encoding
+
+def _simplify_path_rows(rows, tolerance):
+    """
+    Simplify SHIP_PATH_QUERY rows with the Douglas-Peucker algorithm.
+
+    Rows without coordinates cannot be drawn and are dropped.
+    """
+    rows = [row for row in rows if row[2] is not None and row[3] is not None]
+    kept = simplify_indices([(row[2], row[3]) for row in rows], tolerance)
+    return [rows[index] for index in kept]
+
+def _encode_path_rows(rows):
+    """
+    Encode SHIP_PATH_QUERY rows as a polyline with delta encoded timestamps.
+    """
+    rows = [row for row in rows if row[2] is not None and row[3] is not None]
+    return encode_track([(row[2], row[3]) for row in rows], [row[1] for row in rows])
+
 @api_view(['GET'])
+@renderer_classes(POSITION_RENDERER_CLASSES)
 def get_ship_path(request, imo_number):
     """
     Get the path of a specific ship over the last 24 hours.
+
+    With tolerance=<metres> the track is simplified with the Douglas-Peucker
+    algorithm. With encoding=polyline it is returned as a Google encoded
+    polyline with delta encoded epoch second timestamps.
+    With stream=true the positions are streamed through a server-side cursor.
+    With layout=columnar, or when MessagePack is negotiated, they are returned
+    as parallel arrays with epoch second timestamps.
     """
+    try:
+        tolerance, encoding = _parse_path_options(request.GET)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
     try:
         # Get the current time in UTC
         now = timezone.now()
         # Calculate the time 24 hours ago
         twenty_four_hours_ago = now - timedelta(hours=24)
         
+        # Read from a replica within the lag limit, like the AIS models
+        read_alias = replicas.get_read_alias()
+        
+        # Simplification needs the whole track, so only plain requests are streamed
+        if (request.GET.get('stream', 'false').lower() == 'true' and tolerance is None
+                and encoding is None and not wants_columnar(request)):
+            return streaming.streaming_json_response(streaming.json_array(
+                map(_row_to_path_position, streaming.iter_server_side_rows(
+                    SHIP_PATH_QUERY, [imo_number, twenty_four_hours_ago], using=read_alias
+                ))
+            ))
+        
         # Use raw SQL query instead of ORM to avoid potential issues
-        with connections['ais_data'].cursor() as cursor:
-            cursor.execute("""
-                SELECT imo_number, timestamp_ais, latitude, longitude, destination,
-                       navigational_status_code, navigational_status, true_heading,
-                       rate_of_turn, cog, sog
-                FROM ship_data
-                WHERE imo_number = %s AND timestamp_ais >= %s
-                ORDER BY timestamp_ais
-            """, [imo_number, twenty_four_hours_ago])
-            
-            results = []
-            for row in cursor.fetchall():
-                position_data = {
-                    'imo_number': row[0],
-                    'timestamp_ais': row[1].isoformat() if row[1] else None,
-                    'latitude': row[2],
-                    'longitude': row[3],
-                    'destination': row[4],
-                    'navigational_status_code': row[5],
-                    'navigational_status': row[6],
-                    'true_heading': row[7],
-                    'rate_of_turn': row[8],
-                    'cog': row[9],
-                    'sog': row[10]
-                }
-                results.append(position_data)
+        with connections[read_alias].cursor() as cursor:
+            cursor.execute(SHIP_PATH_QUERY, [imo_number, twenty_four_hours_ago])
+            rows = cursor.fetchall()
         
-        return Response(results)
+        if tolerance is not None:
+            original_count = len(rows)
+            rows = _simplify_path_rows(rows, tolerance)
+            logging.info(f"Simplified path of IMO {imo_number} from {original_count} to {len(rows)} points")
+        
+        if encoding == 'polyline':
+            track = _encode_path_rows(rows)
+            return Response(dict(track, imo_number=imo_number, encoding=encoding, tolerance=tolerance))
+        
+        if wants_columnar(request):
+            return Response(columnar_ship_path(rows, imo_number, is_binary_request(request)))
+        
+        return Response([_row_to_path_position(row) for row in rows])
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
         print(f"Error in get_ship_path for IMO {imo_number}: {str(e)}\n{error_details}")
         return Response({"error": str(e), "details": error_details}, status=500)
 
+# Limits of the batch ship path endpoint
+MAX_BATCH_PATH_VESSELS = 1000
+MAX_BATCH_PATH_WINDOW = timedelta(days=7)
+
+def _parse_path_time(value, name):
+    """
+    Parse an ISO format datetime parameter, assuming the server timezone (UTC) when none is given.
+    """
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if not parsed:
+        raise ValueError(f"{name} must be a valid ISO format datetime string")
+    if not parsed.tzinfo:
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+@api_view(['GET', 'POST'])
+def get_ship_paths(request):
+    """
+    Get the paths of many ships in one request.
+
+    Parameters, as query parameters or as a JSON body for POST:
+    - imo_numbers: list of IMO numbers, comma separated in query parameters
+    - scope: set to 'scrubber' to select all scrubber vessels instead of imo_numbers
+    - start, end: ISO format datetime strings of the time window
+      (default: the 24 hours before end, which defaults to now)
+    - tolerance, encoding: simplify and encode every track as in /ship-path/
+
+    All tracks are read with one query ordered by IMO number and timestamp and
+    streamed as {"tracks": [{"imo_number", "positions", "count"}, ...]}, or with
+    the polyline fields of /ship-path/ in place of positions.
+    """
+    params = request.data if request.method == 'POST' else request.GET
+    
+    try:
+        tolerance, encoding = _parse_path_options(params)
+        
+        end_time = _parse_path_time(params['end'], 'end') if params.get('end') else timezone.now()
+        start_time = (
+            _parse_path_time(params['start'], 'start') if params.get('start')
+            else end_time - timedelta(hours=24)
+        )
+        if start_time >= end_time:
+            raise ValueError("start must be before end")
+        if end_time - start_time > MAX_BATCH_PATH_WINDOW:
+            raise ValueError(f"The time window must not exceed {MAX_BATCH_PATH_WINDOW.days} days")
+        
+        scope = params.get('scope')
+        if scope not in (None, 'scrubber'):
+            raise ValueError("scope must be 'scrubber'")
+        
+        if scope is None:
+            imo_numbers = params.get('imo_numbers') or []
+            if isinstance(imo_numbers, str):
+                imo_numbers = [value for value in imo_numbers.split(',') if value.strip()]
+            if not isinstance(imo_numbers, list) or not imo_numbers:
+                raise ValueError("imo_numbers or scope=scrubber is required")
+            if len(imo_numbers) > MAX_BATCH_PATH_VESSELS:
+                raise ValueError(f"At most {MAX_BATCH_PATH_VESSELS} imo_numbers are accepted")
+            try:
+                imo_numbers = sorted({int(value) for value in imo_numbers})
+            except (TypeError, ValueError):
+                raise ValueError("imo_numbers must be integers")
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        if scope == 'scrubber':
+            imo_numbers = scrubber_vessels.get_scrubber_imo_numbers()
+        
+        logging.info(
+            f"Streaming ship paths of {len(imo_numbers)} vessels between {start_time} and {end_time}"
+        )
+        
+        rows = streaming.iter_server_side_rows(
+            SHIP_PATHS_QUERY, [imo_numbers, start_time, end_time], using=replicas.get_read_alias()
+        )
+        tracks = groupby(rows, key=itemgetter(0))
+        if tolerance is not None:
+            tracks = (
+                (imo_number, _simplify_path_rows(track_rows, tolerance))
+                for imo_number, track_rows in tracks
+            )
+        
+        if encoding == 'polyline':
+            pieces = streaming.json_array(
+                dict(_encode_path_rows(list(track_rows)), imo_number=imo_number)
+                for imo_number, track_rows in tracks
+            )
+        else:
+            pieces = streaming.json_tracks(
+                (imo_number, map(_row_to_path_position, track_rows))
+                for imo_number, track_rows in tracks
+            )
+        
+        return streaming.streaming_json_response(streaming.json_document('tracks', pieces, {
+            'query_params': {
+                'scope': scope,
+                'vessel_count': len(imo_numbers),
+                'start_time': start_time.isoformat(),
+                'end_time': end_time.isoformat(),
+                'tolerance': tolerance,
+                'encoding': encoding,
+            }
+        }))
+    except Exception as e:
+        logger.error(f"Error in get_ship_paths: {str(e)}", exc_info=True)
+        return Response({"error": str(e)}, status=500)
+
+@api_view(['GET'])
+def get_dataset_metadata(request):
+    """
+    Get the data availability of ship_data: earliest and latest record, row
+    count and per-day row and vessel counts, served from the cache.
+    """
+    try:
+        metadata = dataset_metadata.get_dataset_metadata()
+        if metadata is None:
+            return Response({
+                "error": "Dataset metadata has not been computed yet",
+            }, status=status.HTTP_404_NOT_FOUND)
+        return Response(metadata)
+    except Exception as e:
+        logger.error(f"Error in get_dataset_metadata: {str(e)}", exc_info=True)
+        return Response({"error": str(e)}, status=500)
+
 @api_view(['GET'])
 def test_db_connection(request):
     """
@@ -250,6 +436,35 @@ def test_db_connection(request):
             }
         }, status=500)
 
+@api_view(['GET'])
+def get_db_pool_stats(request):
+    """
+    Get the connection pool statistics of this worker process.
+
+    Lists, per pooled database, the pool size and free connections, the
+    requests waiting, the number of checkouts and the milliseconds spent
+    waiting for and holding connections. Empty when pooling is disabled.
+    """
+    return Response({
+        "pooling_enabled": settings.DB_POOL_ENABLED,
+        "pid": os.getpid(),
+        "pools": get_pool_stats()
+    })
+
+@api_view(['GET'])
+def get_db_replica_status(request):
+    """
+    Get the replication lag of the ais_data read replicas as seen by this worker process.
+
+    Replicas whose lag exceeds the limit, or that cannot be reached, are
+    left out of the read rotation until they catch up.
+    """
+    return Response({
+        "max_lag_seconds": settings.AIS_DATA_REPLICA_MAX_LAG_SECONDS,
+        "pid": os.getpid(),
+        "replicas": replicas.get_replica_status()
+    })
+
 @api_view(['GET'])
 def get_table_structure(request):
     """
@@ -302,7 +517,7 @@ def get_port_content(request, port_name, country):
     try:
         # First check if the port exists in the ais_data database
         try:
-            port = Port.objects.using('ais_data').get(port_name=port_name, country=country)
+            port = Port.objects.get(port_name=port_name, country=country)
         except Port.DoesNotExist:
             return Response({"error": f"Port {port_name} ({country}) not found"}, status=404)
         
@@ -323,10 +538,12 @@ def get_port_content(request, port_name, country):
     except Exception as e:
         return Response({"error": str(e)}, status=500)
 
+@response_cache.cached_response(response_cache.PORT_CONTENTS)
 @api_view(['GET'])
 def get_all_port_contents(request):
     """
     Get all port contents.
+    Served from the response cache until a port content is saved or deleted.
     """
     try:
         port_contents = PortContent.objects.all()
@@ -348,7 +565,9 @@ def track_user_visit(request):
     4. Detects whether the request is from a bot
     5. Records device type information
     
-    Only requests from the official domain are recorded.
+    Only requests from the official domain are recorded. Steps 1 and 2 run in
+    the request, which returns 202 once the visit is queued; the background
+    worker in visit_tracking does the rest and saves the visits in batches.
     """
     # Create a copy of the data to avoid modifying the request directly
     data = request.data.copy()
@@ -374,176 +593,41 @@ def track_user_visit(request):
             )
         
         # Start building the tracking record
-        tracking_data = serializer.validated_data.copy()
+        visit = serializer.validated_data.copy()
         
         # Get the real client IP
-        tracking_data['ip_address'] = ip_address
+        visit['ip_address'] = ip_address
         
         # Get current timestamp
-        tracking_data['timestamp'] = datetime.now()
-        
-        # Process User-Agent string
-        user_agent_string = tracking_data.get('user_agent', '')
-        
-        # Determine if the request is from a bot
-        is_bot = False
-        bot_agent = ""
-        
-        # List of common bot identifiers in user agent strings
-        bot_identifiers = [
-            'bot', 'crawl', 'spider', 'slurp', 'search', 'fetch', 'monitor', 
-            'scrape', 'archive', 'indexer', 'validator', 'facebook', 'whatsapp',
-            'telegram', 'slack', 'discord', 'googlebot', 'bingbot', 'yandexbot'
-        ]
-        
-        # Check if user agent contains any bot identifiers
-        if user_agent_string:
-            ua_lower = user_agent_string.lower()
-            for bot_id in bot_identifiers:
-                if bot_id in ua_lower:
-                    is_bot = True
-                    bot_agent = user_agent_string
-                    break
-        
-        tracking_data['is_bot'] = is_bot
-        tracking_data['bot_agent'] = bot_agent
-        
-        # Determine device type if not provided
-        if not tracking_data.get('device_type'):
-            device_type = "Unknown"
-            if user_agent_string:
-                try:
-                    # Parse the user agent string
-                    ua = user_agents.parse(user_agent_string)
-                    if ua.is_mobile:
-                        device_type = "mobile"
-                    elif ua.is_pc:
-                        device_type = "desktop"
-                    elif ua.is_tablet:
-                        device_type = "mobile"  # Consider tablets as mobile devices
-                except Exception as e:
-                    logging.warning(f"Error parsing user agent: {e}")
-            
-            tracking_data['device_type'] = device_type
-        
-        # Get location and network information from IP-API directly - similar to test_ip_api
-        if ip_address and ip_address != "Unknown":
-            try:
-                logging.info(f"Attempting IP lookup for tracking: {ip_address}")
-                
-                # Build the IP-API URL with the IP address - same as in test_ip_api
-                api_url = settings.IP_API_URL.format(ip=ip_address)
-                
-                # Add fields parameter if specified in settings
-                if hasattr(settings, 'IP_API_FIELDS') and settings.IP_API_FIELDS:
-                    fields_param = ','.join(settings.IP_API_FIELDS)
-                    api_url = f"{api_url}?fields={fields_param}"
-                
-                logging.info(f"IP-API URL for tracking: {api_url}")
-                
-                # Make the API request with increased timeout for reliability
-                response = requests.get(api_url, timeout=5)
-                
-                # Log the raw response for debugging
-                if response.status_code == 200:
-                    ip_data = response.json()
-                    logging.info(f"IP lookup successful. Raw response: {ip_data}")
-                    
-                    # Direct mapping of IP-API fields to tracking data fields
-                    # Explicitly map each field to avoid any confusion
-                    if ip_data.get('status') == 'success':
-                        tracking_data['country'] = ip_data.get('country')
-                        tracking_data['country_code'] = ip_data.get('countryCode')
-                        tracking_data['region'] = ip_data.get('region')
-                        tracking_data['region_name'] = ip_data.get('regionName')
-                        tracking_data['city'] = ip_data.get('city')
-                        tracking_data['zip_code'] = ip_data.get('zip')
-                        tracking_data['latitude'] = ip_data.get('lat')
-                        tracking_data['longitude'] = ip_data.get('lon')
-                        tracking_data['timezone'] = ip_data.get('timezone')
-                        tracking_data['isp'] = ip_data.get('isp')
-                        tracking_data['org'] = ip_data.get('org')
-                        tracking_data['as_number'] = ip_data.get('as')
-                        
-                        logging.info(f"Successfully mapped IP data fields for {ip_address}: Country={tracking_data.get('country', 'N/A')}, City={tracking_data.get('city', 'N/A')}")
-                    else:
-                        logging.warning(f"IP-API returned non-success status for {ip_address}: {ip_data}")
-                else:
-                    logging.warning(f"IP-API request failed with status {response.status_code}")
-                    
-            except requests.RequestException as e:
-                logging.warning(f"IP-API request failed: {str(e)}")
-            except Exception as e:
-                logging.error(f"Unexpected error in IP lookup: {str(e)}", exc_info=True)
-        else:
-            logging.warning(f"IP address is missing or unknown, skipping geolocation: {ip_address}")
+        visit['timestamp'] = datetime.now()
         
         # If in debug mode, return the data that would be saved instead of saving it
         if debug_mode:
             return Response({
                 "status": "debug_mode",
                 "message": "Data that would be saved (debug mode)",
-                "tracking_data": tracking_data,
+                "tracking_data": visit_tracking.enrich_visit(visit),
                 "ip_address": ip_address,
                 "note": "Record not saved because debug mode is enabled"
             })
         
-        # Create and save the tracking record
-        try:
-            logging.info(f"Preparing to save tracking data with fields: {', '.join(tracking_data.keys())}")
-            
-            has_ip_data = any(field in tracking_data for field in 
-                             ['country', 'city', 'isp', 'latitude', 'longitude'])
-            logging.info(f"Has IP geolocation data: {has_ip_data}")
-            
-            # Verify all fields are in the model
-            model_fields = [f.name for f in UserTracking._meta.get_fields()]
-            unknown_fields = [k for k in tracking_data.keys() if k not in model_fields]
-            if unknown_fields:
-                logging.warning(f"Unknown fields being removed from tracking data: {unknown_fields}")
-                for field in unknown_fields:
-                    tracking_data.pop(field, None)
-            
-            # Create the record with error handling
-            try:
-                tracking_record = UserTracking.objects.create(**tracking_data)
-                logging.info(f"Successfully saved tracking record ID: {tracking_record.id}")
-                
-                # Verify if geolocation fields were actually saved
-                if has_ip_data:
-                    saved_record = UserTracking.objects.get(id=tracking_record.id)
-                    geo_data_saved = bool(saved_record.country or saved_record.city or saved_record.latitude)
-                    logging.info(f"Geolocation data was {'successfully saved' if geo_data_saved else 'NOT saved'} to database")
-                
-                return Response({"status": "success", "record_id": tracking_record.id}, status=status.HTTP_201_CREATED)
-            except Exception as e:
-                logging.error(f"Initial save attempt failed: {str(e)}", exc_info=True)
-                
-                # Try again with minimal required fields, but include geolocation data
-                logging.info("Retrying with minimal required fields plus geolocation")
-                minimal_data = {
-                    'ip_address': ip_address,
-                    'timestamp': datetime.now(),
-                    'device_type': tracking_data.get('device_type', 'Unknown'),
-                    'is_bot': is_bot
-                }
-                
-                for field in ['country', 'country_code', 'city', 'latitude', 'longitude']:
-                    if field in tracking_data and tracking_data[field] is not None:
-                        minimal_data[field] = tracking_data[field]
-                
-                tracking_record = UserTracking.objects.create(**minimal_data)
-                logging.info(f"Successfully saved minimal tracking record ID: {tracking_record.id}")
+        # Record the visit inside the request when the background worker is disabled
+        if not settings.TRACKING_ASYNC_ENABLED:
+            tracking_data = visit_tracking.enrich_visit(visit)
+            if not visit_tracking.save_visits([tracking_data]):
                 return Response(
-                    {"status": "success", "message": "Saved with minimal data due to previous error", "record_id": tracking_record.id},
-                    status=status.HTTP_201_CREATED
+                    {"status": "error", "message": "Server error while recording tracking data"},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
-        except Exception as e:
-            logging.error(f"Error saving tracking data: {str(e)}", exc_info=True)
+            return Response({"status": "success"}, status=status.HTTP_201_CREATED)
+        
+        # IP lookup, user agent parsing and the insert happen in the background worker
+        if not visit_tracking.enqueue_visit(visit):
             return Response(
-                {"status": "error", "message": f"Server error while recording tracking data: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {"status": "error", "message": "Tracking queue is full, please try again later"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
             )
+        return Response({"status": "accepted"}, status=status.HTTP_202_ACCEPTED)
     except Exception as e:
         # Catch-all for unexpected errors
         logging.error(f"Unexpected error in track_user_visit: {str(e)}", exc_info=True)
@@ -565,6 +649,9 @@ def test_ip_api(request, ip=None):
     1. As part of the URL path: /api/v1/test-ip-api/8.8.8.8/
     2. As a query parameter: /api/v1/test-ip-api/?ip=8.8.8.8
     3. If none provided, the requester's IP is used
+    
+    The response comes from the IP geolocation cache when the IP was looked up
+    recently; add ?refresh=true to query IP-API directly.
     """
     try:
         # Get the IP to test in this order:
@@ -576,23 +663,23 @@ def test_ip_api(request, ip=None):
         logging.info(f"Testing IP-API with IP: {test_ip}")
         
         # Build the IP-API URL
-        api_url = settings.IP_API_URL.format(ip=test_ip)
-        
-        # Add fields parameter if specified in settings
-        if hasattr(settings, 'IP_API_FIELDS') and settings.IP_API_FIELDS:
-            fields_param = ','.join(settings.IP_API_FIELDS)
-            api_url = f"{api_url}?fields={fields_param}"
+        api_url = ip_geolocation.build_api_url(test_ip)
         
-        # Make the API request
-        response = requests.get(api_url, timeout=5)
+        # Make the API request, unless the response is cached
+        if request.GET.get('refresh', 'false').lower() == 'true':
+            from_cache = False
+            ip_data = ip_geolocation.fetch_ip_data(test_ip)
+        else:
+            from_cache = ip_geolocation.get_cached_ip_data(test_ip) is not None
+            ip_data = ip_geolocation.get_ip_api_data(test_ip)
         
         # Return the raw response and additional information
         return Response({
             "status": "success",
             "requested_ip": test_ip,
             "api_url": api_url,
-            "response_status_code": response.status_code,
-            "ip_api_response": response.json(),
+            "from_cache": from_cache,
+            "ip_api_response": ip_data,
             "debug_info": {
                 "backend_version": "1.0",
                 "ip_api_fields_setting": settings.IP_API_FIELDS if hasattr(settings, 'IP_API_FIELDS') else None,
@@ -618,6 +705,7 @@ def check_tracking_records(request):
     
     Query Parameters:
         limit (optional): Number of recent records to fetch. Default is 10.
+        after (optional): next_cursor of the previous response, to fetch the older records after it.
     """
     try:
         # Get query parameters
@@ -627,8 +715,20 @@ def check_tracking_records(request):
         if limit > 50:
             limit = 50
             
-        # Get the most recent tracking records
-        records = UserTracking.objects.all().order_by('-timestamp')[:limit]
+        # Get the most recent tracking records, without the long user agent and URL columns
+        try:
+            records, next_cursor = pagination.paginate(
+                UserTracking.objects.only(
+                    'id', 'timestamp', 'ip_address', 'country', 'city', 'isp', 'device_type', 'is_bot'
+                ),
+                request.GET.get('after'),
+                max(limit, 1),
+            )
+        except ValueError as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         # Prepare a summary of each record focusing on IP data
         records_summary = []
@@ -654,9 +754,14 @@ def check_tracking_records(request):
             'stats': {
                 'total_records_checked': total_records,
                 'records_with_ip_data': records_with_ip_data,
-                'percentage_with_ip_data': round(records_with_ip_data / total_records * 100 if total_records else 0, 1)
+                'percentage_with_ip_data': round(records_with_ip_data / total_records * 100 if total_records else 0, 1),
+                # Visits accepted by this worker process but not saved yet
+                'queued_visits': visit_tracking.get_queue_depth()
             },
-            'records': records_summary
+            'write_buffer': visit_tracking.write_buffer.get_stats(),
+            'user_agent_cache': user_agent_classifier.get_cache_stats(),
+            'records': records_summary,
+            'next_cursor': next_cursor
         })
     except Exception as e:
         logging.error(f"Error checking tracking records: {str(e)}", exc_info=True)
@@ -665,6 +770,52 @@ def check_tracking_records(request):
             'message': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+def get_tracking_summary(request):
+    """
+    Summarise tracked visits per day, country and device type.
+
+    Reads the daily visit rollups instead of the raw tracking records, so it
+    also covers days whose raw records have been pruned.
+
+    Query Parameters:
+        days (optional): Number of days up to and including today. Default is 30.
+        start, end (optional): First and last day (YYYY-MM-DD) instead of days
+        include_bots (optional): Set to 'false' to leave bot visits out of the
+            per day, country and device type counts. Default is 'true'.
+    """
+    try:
+        try:
+            today = timezone.localdate()
+            if request.GET.get('start') or request.GET.get('end'):
+                start_day = parse_date(request.GET.get('start', ''))
+                last_day = parse_date(request.GET.get('end', '')) if request.GET.get('end') else today
+                if start_day is None or last_day is None:
+                    raise ValueError("start and end must be dates in YYYY-MM-DD format")
+            else:
+                days = int(request.GET.get('days', 30))
+                if days < 1:
+                    raise ValueError("days must be a positive integer")
+                last_day = today
+                start_day = today - timedelta(days=days - 1)
+            if start_day > last_day:
+                raise ValueError("start must not be after end")
+            if (last_day - start_day).days >= settings.TRACKING_SUMMARY_MAX_DAYS:
+                raise ValueError(f"The summary covers at most {settings.TRACKING_SUMMARY_MAX_DAYS} days")
+        except ValueError as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        include_bots = request.GET.get('include_bots', 'true').lower() == 'true'
+        summary = tracking_rollups.get_visit_summary(start_day, last_day + timedelta(days=1), include_bots)
+
+        return Response(dict({'status': 'success'}, **summary))
+    except Exception as e:
+        logging.error(f"Error summarising tracked visits: {str(e)}", exc_info=True)
+        return Response({
+            'status': 'error',
+            'message': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @api_view(['GET'])
 def debug_ip_tracking(request, ip=None):
     """
@@ -692,30 +843,21 @@ def debug_ip_tracking(request, ip=None):
         debug_log.append("Step 2: Making IP-API request")
         ip_data = None
         api_url = None
-        response_status = None
+        from_cache = False
         error = None
         
         try:
             # Build the IP-API URL
-            api_url = settings.IP_API_URL.format(ip=test_ip)
-            
-            # Add fields parameter if specified in settings
-            if hasattr(settings, 'IP_API_FIELDS') and settings.IP_API_FIELDS:
-                fields_param = ','.join(settings.IP_API_FIELDS)
-                api_url = f"{api_url}?fields={fields_param}"
-            
+            api_url = ip_geolocation.build_api_url(test_ip)
             debug_log.append(f"API URL: {api_url}")
             
-            # Make the API request
-            response = requests.get(api_url, timeout=5)
-            response_status = response.status_code
-            debug_log.append(f"API response status: {response_status}")
+            # Make the API request, unless the response is cached
+            from_cache = ip_geolocation.get_cached_ip_data(test_ip) is not None
+            ip_data = ip_geolocation.get_ip_data(test_ip)
+            debug_log.append(f"API response data{' (cached)' if from_cache else ''}: {ip_data}")
             
-            if response_status == 200:
-                ip_data = response.json()
-                debug_log.append(f"API response data: {ip_data}")
-            else:
-                debug_log.append(f"API request failed with status {response_status}")
+            if ip_data.get('status') != 'success':
+                debug_log.append(f"API request failed: {ip_data.get('message')}")
         except Exception as e:
             error = str(e)
             debug_log.append(f"Error making API request: {error}")
@@ -762,7 +904,9 @@ def debug_ip_tracking(request, ip=None):
                         tracking_data.pop(field, None)
                 
                 # Create the record
-                record = UserTracking.objects.create(**tracking_data)
+                with transaction.atomic():
+                    record = UserTracking.objects.create(**tracking_data)
+                    tracking_rollups.add_visits([record])
                 record_id = record.id
                 debug_log.append(f"Test record created with ID: {record_id}")
             except Exception as e:
@@ -783,7 +927,9 @@ def debug_ip_tracking(request, ip=None):
                         if field in tracking_data:
                             minimal_data[field] = tracking_data[field]
                     
-                    record = UserTracking.objects.create(**minimal_data)
+                    with transaction.atomic():
+                        record = UserTracking.objects.create(**minimal_data)
+                        tracking_rollups.add_visits([record])
                     record_id = record.id
                     debug_log.append(f"Minimal test record created with ID: {record_id}")
                 except Exception as e2:
@@ -827,7 +973,7 @@ def debug_ip_tracking(request, ip=None):
             'debug_mode': True,
             'ip_address': test_ip,
             'api_url': api_url,
-            'api_response_status': response_status,
+            'api_response_cached': from_cache,
             'ip_data_received': bool(ip_data and ip_data.get('status') == 'success'),
             'test_record_id': record_id,
             'verification': verification_result,
@@ -842,16 +988,18 @@ def debug_ip_tracking(request, ip=None):
             'debug_mode': True
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@response_cache.cached_response(response_cache.ICCT_SCRUBBERS)
 @api_view(['GET'])
 def get_scrubber_vessels(request):
     """
     Get all ships that have scrubber systems installed.
     This endpoint returns data from the icct_scrubber_march_2025 table.
+    Served from the response cache until the table is reloaded.
     """
     try:
         # First, verify the table exists and get its structure
         table_info = {}
-        with connections['ais_data'].cursor() as cursor:
+        with connections[replicas.get_read_alias()].cursor() as cursor:
             # Check if table exists
             cursor.execute("""
                 SELECT EXISTS (
@@ -908,16 +1056,18 @@ def get_scrubber_vessels(request):
             "trace": error_details if settings.DEBUG else "Enable DEBUG for detailed trace"
         }, status=500)
 
+@response_cache.cached_response(response_cache.ICCT_ENGINES)
 @api_view(['GET'])
 def get_engine_data(request):
     """
     Get all ships that have engine data available.
     This endpoint returns data from the icct_wfr_combined table.
+    Served from the response cache until the table is reloaded.
     """
     try:
         # First, verify the table exists and get its structure
         table_info = {}
-        with connections['ais_data'].cursor() as cursor:
+        with connections[replicas.get_read_alias()].cursor() as cursor:
             # Check if table exists
             cursor.execute("""
                 SELECT EXISTS (
@@ -1070,126 +1220,211 @@ def debug_database_tables(request):
             "traceback": traceback.format_exc()
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-@api_view(['GET'])
-def get_past_scrubber_distribution(request):
+def _group_positions_by_interval(rows, grouping_format):
     """
-    Get scrubber vessel distribution data for a past time period.
-    This endpoint returns position data of scrubber vessels grouped by time intervals.
-    
-    Query parameters:
-    - time_value: integer value representing the amount of time to look back (default: 1)
-    - time_unit: string enum (Hour, Day, Week, Month, Year) representing the time unit (default: Hour)
-    - user_current_time: ISO format datetime string (optional, defaults to server's current time)
+    Group position rows ordered by interval into the time_groups response format.
+
+    Args:
+        rows: (interval_start, interval_end, imo_number, latitude, longitude) rows,
+              optionally followed by the number of raw positions each row represents
+        grouping_format: strftime format of the interval boundaries
+
+    Returns:
+        List of time group dictionaries with their positions
+    """
+    result_groups = []
+    current_group = None
+
+    for row in rows:
+        interval_start, interval_end, imo_number, latitude, longitude = row[:5]
+
+        # Skip null results that might come from LEFT JOIN
+        if imo_number is None:
+            continue
+
+        # Convert datetime to string in the specified format
+        interval_start_str = interval_start.strftime(grouping_format)
+
+        if current_group is None or current_group['interval_start'] != interval_start_str:
+            # Start a new group
+            current_group = {
+                'interval_start': interval_start_str,
+                'interval_end': interval_end.strftime(grouping_format),
+                'positions': []
+            }
+            result_groups.append(current_group)
+
+        position = {
+            'imo_number': imo_number,
+            'latitude': latitude,
+            'longitude': longitude
+        }
+        if len(row) > 5:
+            position['position_count'] = row[5]
+        current_group['positions'].append(position)
+
+    return result_groups
+
+
+ACTIVE_IMO_NUMBERS_QUERY = """
+    SELECT DISTINCT imo_number 
+    FROM ship_data 
+    WHERE imo_number IS NOT NULL
+    AND timestamp_ais >= %s
+    AND timestamp_ais < %s
+"""
+
+def _get_active_imo_numbers(cursor, start_time, end_time):
+    """
+    Get the IMO numbers of all vessels reporting positions in a time range,
+    used when the scrubber reference table is empty or unavailable.
+    """
+    cursor.execute(ACTIVE_IMO_NUMBERS_QUERY, [start_time, end_time])
+    return [int(row[0]) for row in cursor.fetchall() if str(row[0]).isdigit()]
+
+
+def _time_groups_response(request, result_groups, query_params):
+    """
+    Build the past scrubber distribution response in the layout the client asked for.
+    """
+    if wants_columnar(request):
+        data = columnar_time_groups(result_groups, is_binary_request(request))
+        data['query_params'] = query_params
+        return Response(data)
     
-    The response contains scrubber vessel positions grouped by time intervals,
-    suitable for creating time-based heatmaps or animations.
+    return Response({
+        "time_groups": result_groups,
+        "query_params": query_params
+    })
+
+
+def _resolve_distribution_window(params):
     """
+    Validate the past scrubber distribution query parameters and resolve the
+    time range to query, shared by the sync and async endpoints.
+
+    Returns:
+        Dictionary with the validated options, the time range with its
+        grouping format and interval unit, and the query_params echoed in
+        the response
+
+    Raises:
+        ValueError: If a parameter is invalid
+    """
+    # Extract query parameters
+    time_value = params.get('time_value', '1')
+    time_unit = params.get('time_unit', 'Hour')
+    user_current_time = params.get('user_current_time', None)
+    
+    # Validate time_value
     try:
-        # Extract query parameters
-        time_value = request.GET.get('time_value', '1')
-        time_unit = request.GET.get('time_unit', 'Hour')
-        user_current_time = request.GET.get('user_current_time', None)
-        
-        # Validate time_value
+        time_value = int(time_value)
+    except ValueError:
+        raise ValueError("time_value must be a valid integer")
+    if time_value <= 0:
+        raise ValueError("time_value must be a positive integer")
+    
+    # Validate time_unit
+    valid_time_units = ['Hour', 'Day', 'Week', 'Month', 'Year']
+    if time_unit not in valid_time_units:
+        raise ValueError(f"time_unit must be one of {', '.join(valid_time_units)}")
+    
+    # Stream the response for long time ranges
+    stream = params.get('stream', 'false').lower() == 'true'
+    
+    # Validate mode and grid resolution
+    resolution = params.get('resolution', None)
+    mode = params.get('mode', 'grid' if resolution else 'points')
+    if mode not in ['points', 'grid']:
+        raise ValueError("mode must be one of points, grid")
+    
+    if mode == 'grid':
         try:
-            time_value = int(time_value)
-            if time_value <= 0:
-                return Response({
-                    "error": "time_value must be a positive integer",
-                }, status=status.HTTP_400_BAD_REQUEST)
+            resolution = float(resolution) if resolution else settings.SCRUBBER_GRID_DEFAULT_RESOLUTION
         except ValueError:
-            return Response({
-                "error": "time_value must be a valid integer",
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Validate time_unit
-        valid_time_units = ['Hour', 'Day', 'Week', 'Month', 'Year']
-        if time_unit not in valid_time_units:
-            return Response({
-                "error": f"time_unit must be one of {', '.join(valid_time_units)}",
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Determine end time (user's current time or server time)
-        if user_current_time:
-            try:
-                end_time = parse_datetime(user_current_time)
-                if not end_time:
-                    raise ValueError("Invalid datetime format")
-                # Ensure timezone is set
-                if not end_time.tzinfo:
-                    end_time = end_time.replace(tzinfo=timezone.utc)
-            except ValueError:
-                return Response({
-                    "error": "user_current_time must be a valid ISO format datetime string",
-                }, status=status.HTTP_400_BAD_REQUEST)
-        else:
-            end_time = timezone.now()
-        
-        # Calculate start time based on time_value and time_unit
-        # Use the requested time unit directly instead of converting
-        actual_unit = time_unit.lower()
-        
-        # Skip the most recent period to ensure data completeness
-        if time_unit == 'Hour':
-            adjusted_end_time = end_time.replace(minute=0, second=0, microsecond=0)
-            target_start_time = adjusted_end_time - timezone.timedelta(hours=time_value)
-            
-            grouping_format = "%Y-%m-%d %H:00:00"  # Group by hour
-            group_by_sql = "date_trunc('hour', timestamp_ais)"
-            interval_unit = "hour"
-        elif time_unit == 'Day':
-            adjusted_end_time = end_time.replace(hour=0, minute=0, second=0, microsecond=0)
-            target_start_time = adjusted_end_time - timezone.timedelta(days=time_value)
-            
-            grouping_format = "%Y-%m-%d 00:00:00"  # Group by day
-            group_by_sql = "date_trunc('day', timestamp_ais)"
-            interval_unit = "day"
-        elif time_unit == 'Week':
-            # Define Week as exactly 7 days
-            adjusted_end_time = end_time.replace(hour=0, minute=0, second=0, microsecond=0)
-            # Adjust to the start of the week (Monday)
-            weekday = adjusted_end_time.weekday()
-            adjusted_end_time = adjusted_end_time - timezone.timedelta(days=weekday)
-            target_start_time = adjusted_end_time - timezone.timedelta(weeks=time_value)
-            
-            grouping_format = "%Y-%m-%d 00:00:00"  # Group by week start date (Monday)
-            group_by_sql = "date_trunc('week', timestamp_ais)"  # PostgreSQL's week starts on Monday
-            interval_unit = "week"
-        elif time_unit == 'Month':
-            adjusted_end_time = end_time.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            
-            # Calculate months back using a loop to handle variable month lengths
-            target_start_time = adjusted_end_time
-            for _ in range(time_value):
-                # Go back one month at a time
-                if target_start_time.month == 1:
-                    target_start_time = target_start_time.replace(year=target_start_time.year-1, month=12)
-                else:
-                    target_start_time = target_start_time.replace(month=target_start_time.month-1)
-            
-            grouping_format = "%Y-%m-01 00:00:00"  # Group by month
-            group_by_sql = "date_trunc('month', timestamp_ais)"  # PostgreSQL's date_trunc for month
-            interval_unit = "month"
-        else:  # Year
-            adjusted_end_time = end_time.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-            
-            # Go back years
-            target_start_time = adjusted_end_time.replace(year=adjusted_end_time.year - time_value)
-            
-            grouping_format = "%Y-%m-01 00:00:00"  # Group by month
-            group_by_sql = "date_trunc('month', timestamp_ais)"
-            interval_unit = "month"
+            raise ValueError("resolution must be a valid number")
+        if not 0.01 <= resolution <= 5:
+            raise ValueError("resolution must be between 0.01 and 5 degrees")
+    
+    # Determine end time (user's current time or server time)
+    if user_current_time:
+        try:
+            end_time = parse_datetime(user_current_time)
+            if not end_time:
+                raise ValueError("Invalid datetime format")
+            # Ensure timezone is set
+            if not end_time.tzinfo:
+                end_time = end_time.replace(tzinfo=timezone.utc)
+        except ValueError:
+            raise ValueError("user_current_time must be a valid ISO format datetime string")
+    else:
+        end_time = timezone.now()
+    
+    # Calculate start time based on time_value and time_unit
+    # Use the requested time unit directly instead of converting
+    actual_unit = time_unit.lower()
+    
+    # Skip the most recent period to ensure data completeness
+    if time_unit == 'Hour':
+        adjusted_end_time = end_time.replace(minute=0, second=0, microsecond=0)
+        target_start_time = adjusted_end_time - timezone.timedelta(hours=time_value)
+        
+        grouping_format = "%Y-%m-%d %H:00:00"  # Group by hour
+        interval_unit = "hour"
+    elif time_unit == 'Day':
+        adjusted_end_time = end_time.replace(hour=0, minute=0, second=0, microsecond=0)
+        target_start_time = adjusted_end_time - timezone.timedelta(days=time_value)
+        
+        grouping_format = "%Y-%m-%d 00:00:00"  # Group by day
+        interval_unit = "day"
+    elif time_unit == 'Week':
+        # Define Week as exactly 7 days
+        adjusted_end_time = end_time.replace(hour=0, minute=0, second=0, microsecond=0)
+        # Adjust to the start of the week (Monday)
+        weekday = adjusted_end_time.weekday()
+        adjusted_end_time = adjusted_end_time - timezone.timedelta(days=weekday)
+        target_start_time = adjusted_end_time - timezone.timedelta(weeks=time_value)
+        
+        grouping_format = "%Y-%m-%d 00:00:00"  # Group by week start date (Monday)
+        interval_unit = "week"
+    elif time_unit == 'Month':
+        adjusted_end_time = end_time.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        
+        # Calculate months back using a loop to handle variable month lengths
+        target_start_time = adjusted_end_time
+        for _ in range(time_value):
+            # Go back one month at a time
+            if target_start_time.month == 1:
+                target_start_time = target_start_time.replace(year=target_start_time.year-1, month=12)
+            else:
+                target_start_time = target_start_time.replace(month=target_start_time.month-1)
         
-        # Store the query target start time (before adjustment)
-        original_target_start_time = target_start_time
+        grouping_format = "%Y-%m-01 00:00:00"  # Group by month
+        interval_unit = "month"
+    else:  # Year
+        adjusted_end_time = end_time.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
         
-        # Use adjusted end time instead of the original end time for the query
-        end_time = adjusted_end_time
+        # Go back years
+        target_start_time = adjusted_end_time.replace(year=adjusted_end_time.year - time_value)
         
-        # Find the earliest actual record date to handle incomplete early data
-        earliest_record_time = None
-        with connections['ais_data'].cursor() as cursor:
-            try:
+        grouping_format = "%Y-%m-01 00:00:00"  # Group by month
+        interval_unit = "month"
+    
+    # Store the query target start time (before adjustment)
+    original_target_start_time = target_start_time
+    
+    # Use adjusted end time instead of the original end time for the query
+    end_time = adjusted_end_time
+    
+    # Find the earliest actual record date to handle incomplete early data,
+    # from the cached dataset metadata when it has been computed
+    earliest_record_time = None
+    try:
+        metadata = dataset_metadata.get_dataset_metadata()
+        if metadata:
+            earliest_record_time = metadata['earliest_record']
+        else:
+            with connections[replicas.get_read_alias()].cursor() as cursor:
                 cursor.execute("""
                     SELECT MIN(timestamp_ais) 
                     FROM ship_data 
@@ -1200,322 +1435,239 @@ def get_past_scrubber_distribution(request):
                     earliest_record_time = earliest_record[0]
                     if earliest_record_time.tzinfo is None:
                         earliest_record_time = earliest_record_time.replace(tzinfo=timezone.utc)
-                    logging.info(f"Earliest record in database: {earliest_record_time.isoformat()}")
-            except Exception as e:
-                logging.error(f"Error finding earliest record: {str(e)}")
-                # Continue without this optimization if it fails
-        
-        # Adjust the start time based on actual earliest data
-        if earliest_record_time and earliest_record_time > target_start_time:
-            logging.info(f"Target start time ({target_start_time.isoformat()}) is earlier than earliest record ({earliest_record_time.isoformat()})")
+        if earliest_record_time:
+            logging.info(f"Earliest record in database: {earliest_record_time.isoformat()}")
+    except Exception as e:
+        logging.error(f"Error finding earliest record: {str(e)}")
+        # Continue without this optimization if it fails
+    
+    # Adjust the start time based on actual earliest data
+    if earliest_record_time and earliest_record_time > target_start_time:
+        logging.info(f"Target start time ({target_start_time.isoformat()}) is earlier than earliest record ({earliest_record_time.isoformat()})")
+        
+        # Adjust the start_time to the beginning of the next complete time unit
+        if actual_unit == 'hour':
+            # Start from the next complete hour
+            start_time = earliest_record_time.replace(minute=0, second=0, microsecond=0)
+            start_time = start_time + timezone.timedelta(hours=1)
+        elif actual_unit == 'day':
+            # Start from the next complete day
+            start_time = earliest_record_time.replace(hour=0, minute=0, second=0, microsecond=0)
+            start_time = start_time + timezone.timedelta(days=1)
+        elif actual_unit == 'week':
+            # Start from the next complete week, which begins on Monday like date_trunc('week')
+            start_time = earliest_record_time.replace(hour=0, minute=0, second=0, microsecond=0)
+            start_time = start_time + timezone.timedelta(days=7 - start_time.weekday())
+        elif actual_unit == 'month':
+            # Start from the next complete month
+            if earliest_record_time.month == 12:
+                start_time = earliest_record_time.replace(
+                    year=earliest_record_time.year + 1,
+                    month=1,
+                    day=1,
+                    hour=0, 
+                    minute=0, 
+                    second=0, 
+                    microsecond=0
+                )
+            else:
+                start_time = earliest_record_time.replace(
+                    month=earliest_record_time.month + 1,
+                    day=1,
+                    hour=0, 
+                    minute=0, 
+                    second=0, 
+                    microsecond=0
+                )
+        else:
+            # Default case - use earliest record time
+            start_time = earliest_record_time
+        
+        logging.info(f"Adjusted start time to next complete {actual_unit}: {start_time.isoformat()}")
+    else:
+        # Use the target start time if no adjustment needed
+        start_time = target_start_time
+        
+    # Log the query parameters for debugging
+    logging.info(f"Past scrubber distribution query: time_value={time_value}, time_unit={time_unit}, actual_unit={actual_unit}")
+    logging.info(f"Original target start time: {original_target_start_time.isoformat()}")
+    logging.info(f"Final time range after adjustments: {start_time.isoformat()} to {end_time.isoformat()}")
+    
+    response_query_params = {
+        "time_value": time_value,
+        "time_unit": time_unit,
+        "actual_unit": actual_unit,
+        "target_start_time": original_target_start_time.isoformat(),
+        "adjusted_start_time": start_time.isoformat(),
+        "end_time": end_time.isoformat(),
+        "data_availability": {
+            "earliest_record": earliest_record_time.isoformat() if earliest_record_time else None,
+            "start_adjusted": earliest_record_time > original_target_start_time if earliest_record_time else False
+        }
+    }
+    
+    
+    return {
+        'time_value': time_value,
+        'time_unit': time_unit,
+        'actual_unit': actual_unit,
+        'stream': stream,
+        'mode': mode,
+        'resolution': resolution,
+        'grouping_format': grouping_format,
+        'interval_unit': interval_unit,
+        'start_time': start_time,
+        'end_time': end_time,
+        'query_params': response_query_params,
+    }
+
+
+@api_view(['GET'])
+@renderer_classes(POSITION_RENDERER_CLASSES)
+def get_past_scrubber_distribution(request):
+    """
+    Get scrubber vessel distribution data for a past time period.
+    This endpoint returns position data of scrubber vessels grouped by time intervals.
+    
+    Query parameters:
+    - time_value: integer value representing the amount of time to look back (default: 1)
+    - time_unit: string enum (Hour, Day, Week, Month, Year) representing the time unit (default: Hour)
+    - user_current_time: ISO format datetime string (optional, defaults to server's current time)
+    - source: set to 'raw' to bypass the pre-aggregated rollups and query ship_data directly
+    - mode: 'points' (default) or 'grid'; grid is implied when resolution is given
+    - resolution: grid cell size in degrees for mode=grid (default: SCRUBBER_GRID_DEFAULT_RESOLUTION)
+    - stream: set to 'true' to stream the positions through a server-side cursor, keeping
+      memory use flat for long time ranges (points mode with the row layout only)
+    - layout: set to 'columnar' to return the positions of each time group as parallel
+      imo_index/latitude/longitude arrays; MessagePack responses (Accept: application/x-msgpack
+      or format=msgpack) always use this layout with float32/uint32 typed arrays
+    
+    The response contains scrubber vessel positions grouped by time intervals,
+    suitable for creating time-based heatmaps or animations.
+    
+    In grid mode each time group instead holds parallel lat_index, lon_index and
+    counts arrays of the occupied grid cells, where a cell centre lies at
+    (index + 0.5) * resolution degrees.
+    """
+    try:
+        try:
+            window = _resolve_distribution_window(request.GET)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        time_unit = window['time_unit']
+        # Only the row layout is streamed, columnar and MessagePack responses are built in memory
+        stream = window['stream'] and not wants_columnar(request)
+        mode = window['mode']
+        resolution = window['resolution']
+        grouping_format = window['grouping_format']
+        interval_unit = window['interval_unit']
+        start_time = window['start_time']
+        end_time = window['end_time']
+        response_query_params = window['query_params']
+        # ship_data reads go to a replica within the lag limit; the rollups and the
+        # scrubber table fingerprint, which replicas do not track, stay on the primary
+        read_alias = replicas.get_read_alias()
+        
+        # Grid mode: position counts per grid cell instead of individual positions
+        if mode == 'grid':
+            grid_rows = None
+            data_source = 'raw'
+            if settings.SCRUBBER_ROLLUPS_ENABLED and request.GET.get('source') != 'raw':
+                grid_rows = scrubber_rollups.fetch_rollup_grid(interval_unit, start_time, end_time, resolution)
+                data_source = 'rollup'
             
-            # Adjust the start_time to the beginning of the next complete time unit
-            if actual_unit == 'hour':
-                # Start from the next complete hour
-                start_time = earliest_record_time.replace(minute=0, second=0, microsecond=0)
-                start_time = start_time + timezone.timedelta(hours=1)
-            elif actual_unit == 'day':
-                # Start from the next complete day
-                start_time = earliest_record_time.replace(hour=0, minute=0, second=0, microsecond=0)
-                start_time = start_time + timezone.timedelta(days=1)
-            elif actual_unit == 'month':
-                # Start from the next complete month
-                if earliest_record_time.month == 12:
-                    start_time = earliest_record_time.replace(
-                        year=earliest_record_time.year + 1,
-                        month=1,
-                        day=1,
-                        hour=0, 
-                        minute=0, 
-                        second=0, 
-                        microsecond=0
-                    )
-                else:
-                    start_time = earliest_record_time.replace(
-                        month=earliest_record_time.month + 1,
-                        day=1,
-                        hour=0, 
-                        minute=0, 
-                        second=0, 
-                        microsecond=0
+            if grid_rows is None:
+                data_source = 'raw'
+                int_imo_numbers = scrubber_vessels.get_scrubber_imo_numbers()
+                with connections[read_alias].cursor() as cursor:
+                    grid_query, grid_params = scrubber_distribution.build_grid_query(
+                        interval_unit, start_time, end_time, int_imo_numbers, resolution
                     )
-            else:
-                # Default case - use earliest record time
-                start_time = earliest_record_time
+                    cursor.execute(grid_query, grid_params)
+                    grid_rows = cursor.fetchall()
             
-            logging.info(f"Adjusted start time to next complete {actual_unit}: {start_time.isoformat()}")
-        else:
-            # Use the target start time if no adjustment needed
-            start_time = target_start_time
+            result_groups = scrubber_distribution.group_grid_rows(grid_rows, grouping_format)
+            logging.info(
+                f"Returning {len(result_groups)} grid time groups with "
+                f"{sum(len(g['counts']) for g in result_groups)} occupied cells from {data_source} data"
+            )
             
-        # Log the query parameters for debugging
-        logging.info(f"Past scrubber distribution query: time_value={time_value}, time_unit={time_unit}, actual_unit={actual_unit}")
-        logging.info(f"Original target start time: {original_target_start_time.isoformat()}")
-        logging.info(f"Final time range after adjustments: {start_time.isoformat()} to {end_time.isoformat()}")
+            return Response({
+                "grid": {
+                    "resolution": resolution,
+                },
+                "time_groups": result_groups,
+                "query_params": dict(response_query_params, mode=mode, source=data_source)
+            })
         
-        # First, get the list of scrubber vessel IMO numbers
-        scrubber_vessels = []
-        with connections['ais_data'].cursor() as cursor:
-            try:
-                # Get all scrubber vessels from the specialized table
-                cursor.execute("""
-                    SELECT DISTINCT imo_number 
-                    FROM icct_scrubber_march_2025
-                    WHERE imo_number IS NOT NULL
-                    AND sox_scrubber_status IS NOT NULL
-                    AND sox_scrubber_status != 'Not installed'
-                """)
+        # Serve from the pre-aggregated rollups when they cover the requested range,
+        # falling back to raw ship_data below (or when source=raw is requested)
+        if settings.SCRUBBER_ROLLUPS_ENABLED and request.GET.get('source') != 'raw':
+            if stream:
+                rollup_query = scrubber_rollups.build_rollup_positions_query(interval_unit, start_time, end_time)
+                if rollup_query is not None:
+                    logging.info(f"Streaming time groups from the scrubber {interval_unit} rollup")
+                    return streaming.streaming_json_response(streaming.json_time_groups(
+                        streaming.iter_server_side_rows(*rollup_query),
+                        grouping_format,
+                        {"query_params": dict(response_query_params, source="rollup")}
+                    ))
+            
+            rollup_rows = None if stream else scrubber_rollups.fetch_rollup_positions(interval_unit, start_time, end_time)
+            if rollup_rows:
+                result_groups = _group_positions_by_interval(rollup_rows, grouping_format)
+                for group in result_groups:
+                    group['vessel_count'] = len(set(position['imo_number'] for position in group['positions']))
                 
-                # Get all IMO numbers from the scrubber table
-                scrubber_table_imos = [str(row[0]) for row in cursor.fetchall()]
-                logging.info(f"Found {len(scrubber_table_imos)} vessels in scrubber table")
+                logging.info(f"Returning {len(result_groups)} time groups from the scrubber {interval_unit} rollup")
                 
-                if scrubber_table_imos:
-                    # Convert to a list suitable for SQL IN clause
-                    imo_list_str = ','.join([f"'{imo}'" for imo in scrubber_table_imos])
-                    
-                    # Filter for active vessels during the time range
-                    query = f"""
-                        SELECT DISTINCT imo_number 
-                        FROM ship_data 
-                        WHERE imo_number IS NOT NULL
-                        AND timestamp_ais >= %s
-                        AND timestamp_ais < %s
-                        AND imo_number IN ({imo_list_str})
-                    """
-                    
-                    cursor.execute(query, [start_time, end_time])
-                    
-                    # Get active IMOs during the time period
-                    active_scrubber_imos = [str(row[0]) for row in cursor.fetchall()]
-                    logging.info(f"Found {len(active_scrubber_imos)} active scrubber vessels in the selected time period")
-                    
-                    # Use active IMOs if available, otherwise fall back to all scrubber IMOs
-                    if active_scrubber_imos:
-                        scrubber_vessels = active_scrubber_imos
-                    else:
-                        scrubber_vessels = scrubber_table_imos
-                else:
+                return _time_groups_response(request, result_groups, dict(response_query_params, source="rollup"))
+        
+        # Scrubber vessel IMO numbers, cached per process and passed to the query as one array parameter
+        with connections[read_alias].cursor() as cursor:
+            try:
+                int_imo_numbers = scrubber_vessels.get_scrubber_imo_numbers()
+                logging.info(f"Found {len(int_imo_numbers)} vessels in scrubber table")
+                
+                if not int_imo_numbers:
                     # Fallback to a more general approach - all vessels in the time period
                     logging.warning("No vessels found in scrubber table, using fallback method")
-                    cursor.execute("""
-                        SELECT DISTINCT imo_number 
-                        FROM ship_data 
-                        WHERE imo_number IS NOT NULL
-                        AND timestamp_ais >= %s
-                        AND timestamp_ais < %s
-                    """, [start_time, end_time])
-                    
-                    scrubber_vessels = [str(row[0]) for row in cursor.fetchall()]
-                    logging.info(f"Found {len(scrubber_vessels)} vessels using fallback method")
+                    int_imo_numbers = _get_active_imo_numbers(cursor, start_time, end_time)
+                    logging.info(f"Found {len(int_imo_numbers)} vessels using fallback method")
                 
             except Exception as e:
                 # If there's an error with the specialized table, use a direct query to ship_data
                 logging.error(f"Error querying scrubber table: {str(e)}")
                 logging.warning("Using direct ship_data query due to error")
                 
-                cursor.execute("""
-                    SELECT DISTINCT imo_number 
-                    FROM ship_data 
-                    WHERE imo_number IS NOT NULL
-                    AND timestamp_ais >= %s
-                    AND timestamp_ais < %s
-                """, [start_time, end_time])
-                
-                scrubber_vessels = [str(row[0]) for row in cursor.fetchall()]
-                logging.info(f"Found {len(scrubber_vessels)} vessels using error fallback method")
-            
-            if not scrubber_vessels:
-                logging.warning("No vessels found matching the criteria for the specified time period")
-                return Response({
-                    "status": "no_data",
-                    "message": "No vessels found matching the criteria for the specified time period",
-                    "time_groups": [],
-                    "query_params": {
-                        "time_value": time_value,
-                        "time_unit": time_unit,
-                        "actual_unit": actual_unit,
-                        "target_start_time": original_target_start_time.isoformat(),
-                        "adjusted_start_time": start_time.isoformat(),
-                        "end_time": end_time.isoformat(),
-                        "data_availability": {
-                            "earliest_record": earliest_record_time.isoformat() if earliest_record_time else None,
-                            "start_adjusted": earliest_record_time > original_target_start_time if earliest_record_time else False
-                        }
-                    }
-                }, status=status.HTTP_404_NOT_FOUND)
+                int_imo_numbers = _get_active_imo_numbers(cursor, start_time, end_time)
+                logging.info(f"Found {len(int_imo_numbers)} vessels using error fallback method")
         
-        if not scrubber_vessels:
-            logging.warning("No scrubber vessels found in the database")
+        if not int_imo_numbers:
+            logging.warning("No vessels found matching the criteria for the specified time period")
             return Response({
-                "message": "No scrubber vessels found in the database",
+                "status": "no_data",
+                "message": "No vessels found matching the criteria for the specified time period",
                 "time_groups": [],
-                "query_params": {
-                    "time_value": time_value,
-                    "time_unit": time_unit,
-                    "actual_unit": actual_unit,
-                    "target_start_time": original_target_start_time.isoformat(),
-                    "adjusted_start_time": start_time.isoformat(),
-                    "end_time": end_time.isoformat(),
-                    "data_availability": {
-                        "earliest_record": earliest_record_time.isoformat() if earliest_record_time else None,
-                        "start_adjusted": earliest_record_time > original_target_start_time if earliest_record_time else False
-                    }
-                }
-            })
-        
-        logging.info(f"Found {len(scrubber_vessels)} scrubber vessels")
+                "query_params": response_query_params
+            }, status=status.HTTP_404_NOT_FOUND)
         
-        # Format the list of IMO numbers for SQL IN clause
-        imo_list = "', '".join(scrubber_vessels)
+        logging.info(f"Found {len(int_imo_numbers)} scrubber vessels")
         
         # Check if the database is using PostgreSQL
-        db_engine = connections['ais_data'].vendor
+        db_engine = connections[read_alias].vendor
         
         # Adjust SQL for different database engines
         if db_engine == 'postgresql':
-            # PostgreSQL query - using date_trunc and parameterized query
-            # Use placeholders for the IN clause to prevent SQL injection
-            int_imo_numbers = [int(imo) for imo in scrubber_vessels if imo.isdigit()]
-            logging.info(f"Original IMO numbers: {scrubber_vessels}")
-            logging.info(f"Converted to integer IMO numbers: {int_imo_numbers}")
-            logging.info(f"Time range for query: {start_time} to {end_time}")
-            
-            if not int_imo_numbers:
-                logging.warning("No valid IMO numbers for query - all IMOs failed integer conversion")
-                return Response({
-                    "message": "No valid IMO numbers found for query",
-                    "time_groups": [],
-                    "query_params": {
-                        "time_value": time_value,
-                        "time_unit": time_unit,
-                        "actual_unit": actual_unit,
-                        "target_start_time": original_target_start_time.isoformat(),
-                        "adjusted_start_time": start_time.isoformat(),
-                        "end_time": end_time.isoformat(),
-                        "data_availability": {
-                            "earliest_record": earliest_record_time.isoformat() if earliest_record_time else None,
-                            "start_adjusted": earliest_record_time > original_target_start_time if earliest_record_time else False
-                        }
-                    }
-                })
-            
-            placeholder_str = ','.join(['%s'] * len(int_imo_numbers))
-            
-            # Modify the query based on time_unit to address the inconsistency between hour/day granularity
-            if time_unit in ['Week', 'Month', 'Year']:
-                # For Week, Month, Year: First collect all data points, then group by the proper interval
-                
-                # Log the SQL parameters
-                logging.info(f"SQL params for time intervals: start={start_time}, end={end_time}, interval_unit={interval_unit}")
-                
-                time_groups_query = f"""
-                    WITH all_time_intervals AS (
-                        SELECT 
-                            time_series as interval_start,
-                            time_series + interval '1 {interval_unit}' as interval_end
-                        FROM generate_series(
-                            %s::timestamp, 
-                            %s::timestamp - interval '1 {interval_unit}', 
-                            interval '1 {interval_unit}'
-                        ) AS time_series
-                    ),
-                    vessel_positions AS (
-                        SELECT 
-                            {group_by_sql} as time_group,
-                            imo_number,
-                            latitude,
-                            longitude
-                        FROM ship_data
-                        WHERE 
-                            timestamp_ais >= %s AND 
-                            timestamp_ais < %s AND
-                            imo_number IN ({placeholder_str})
-                    )
-                    SELECT 
-                        ti.interval_start,
-                        ti.interval_end,
-                        vp.imo_number,
-                        vp.latitude,
-                        vp.longitude
-                    FROM all_time_intervals ti
-                    LEFT JOIN vessel_positions vp ON 
-                        vp.time_group >= ti.interval_start AND 
-                        vp.time_group < ti.interval_end
-                    WHERE vp.imo_number IS NOT NULL
-                    ORDER BY ti.interval_start, vp.imo_number
-                """
-                # Create parameters for this query
-                query_params = [start_time, end_time, start_time, end_time] + int_imo_numbers
-                
-                # Log the expected number of time intervals that should be generated
-                if interval_unit == 'day':
-                    days_diff = (end_time - start_time).days
-                    logging.info(f"Expected {days_diff} day intervals between {start_time} and {end_time}")
-                elif interval_unit == 'week':
-                    weeks_diff = (end_time - start_time).days // 7
-                    logging.info(f"Expected {weeks_diff} week intervals between {start_time} and {end_time}")
-                elif interval_unit == 'month':
-                    month_diff = (end_time.year - start_time.year) * 12 + end_time.month - start_time.month
-                    logging.info(f"Expected {month_diff} month intervals between {start_time} and {end_time}")
-            else:
-                # Original query for Hour and Day granularity
-                time_groups_query = f"""
-                    WITH time_groups AS (
-                        SELECT 
-                            {group_by_sql} as interval_start,
-                            {group_by_sql} + interval '1 {interval_unit}' as interval_end
-                        FROM ship_data
-                        WHERE 
-                            timestamp_ais >= %s AND 
-                            timestamp_ais < %s AND
-                            imo_number IN ({placeholder_str})
-                        GROUP BY {group_by_sql}
-                        ORDER BY interval_start
-                    )
-                    SELECT 
-                        tg.interval_start,
-                        tg.interval_end,
-                        sd.imo_number,
-                        sd.latitude,
-                        sd.longitude
-                    FROM time_groups tg
-                    JOIN ship_data sd ON 
-                        sd.timestamp_ais >= tg.interval_start AND 
-                        sd.timestamp_ais < tg.interval_end AND
-                        sd.imo_number IN ({placeholder_str})
-                    ORDER BY tg.interval_start, sd.imo_number
-                """
-                # Create parameters list with start_time, end_time, and IMO numbers (twice)
-                query_params = [start_time, end_time] + int_imo_numbers + int_imo_numbers
+            # Bucket every position in a single pass, ordered by interval
+            logging.info(f"SQL params for time intervals: start={start_time}, end={end_time}, interval_unit={interval_unit}")
+            time_groups_query, query_params = scrubber_distribution.build_bucketed_query(
+                interval_unit, start_time, end_time, int_imo_numbers
+            )
         else:
             # Generic fallback for other database engines - simplified query
-            # Use placeholders for the IN clause to prevent SQL injection
-            # Convert IMO numbers to integers since they appear to be stored as numbers in the database
-            int_imo_numbers = [int(imo) for imo in scrubber_vessels if imo.isdigit()]
-            logging.info(f"Original IMO numbers: {scrubber_vessels}")
-            logging.info(f"Converted to integer IMO numbers: {int_imo_numbers}")
-            logging.info(f"Time range for query: {start_time} to {end_time}")
-            
-            if not int_imo_numbers:
-                logging.warning("No valid IMO numbers for query - all IMOs failed integer conversion")
-                return Response({
-                    "message": "No valid IMO numbers found for query",
-                    "time_groups": [],
-                    "query_params": {
-                        "time_value": time_value,
-                        "time_unit": time_unit,
-                        "actual_unit": actual_unit,
-                        "target_start_time": original_target_start_time.isoformat(),
-                        "adjusted_start_time": start_time.isoformat(),
-                        "end_time": end_time.isoformat(),
-                        "data_availability": {
-                            "earliest_record": earliest_record_time.isoformat() if earliest_record_time else None,
-                            "start_adjusted": earliest_record_time > original_target_start_time if earliest_record_time else False
-                        }
-                    }
-                })
-                
+            # Use placeholders for the IN clause since arrays are not available
             placeholder_str = ','.join(['%s'] * len(int_imo_numbers))
             time_groups_query = f"""
                 SELECT 
@@ -1533,57 +1685,22 @@ def get_past_scrubber_distribution(request):
             # Create parameters list with start_time, end_time, and IMO numbers
             query_params = [start_time, end_time] + int_imo_numbers
         
+        # Stream the positions through a server-side cursor instead of building the response in memory
+        if stream and db_engine == 'postgresql':
+            logging.info("Streaming time groups from ship_data")
+            return streaming.streaming_json_response(streaming.json_time_groups(
+                streaming.iter_server_side_rows(time_groups_query, query_params, using=read_alias),
+                grouping_format,
+                {"query_params": response_query_params}
+            ))
+        
         # Query ship positions within the time range, grouped by time interval
         result_groups = []
         
-        with connections['ais_data'].cursor() as cursor:
+        with connections[read_alias].cursor() as cursor:
             if db_engine == 'postgresql':
                 cursor.execute(time_groups_query, query_params)
-                
-                # Process results into time-grouped format
-                current_group = None
-                current_positions = []
-                
-                for row in cursor.fetchall():
-                    interval_start = row[0]
-                    interval_end = row[1]
-                    imo_number = row[2]
-                    latitude = row[3]
-                    longitude = row[4]
-                    
-                    # Skip null results that might come from LEFT JOIN
-                    if imo_number is None:
-                        continue
-                    
-                    # Convert datetime to string in the specified format
-                    interval_start_str = interval_start.strftime(grouping_format)
-                    interval_end_str = interval_end.strftime(grouping_format)
-                    
-                    if current_group is None or current_group['interval_start'] != interval_start_str:
-                        # Add the previous group to results if it exists
-                        if current_group is not None:
-                            current_group['positions'] = current_positions
-                            result_groups.append(current_group)
-                        
-                        # Start a new group
-                        current_group = {
-                            'interval_start': interval_start_str,
-                            'interval_end': interval_end_str,
-                            'positions': []
-                        }
-                        current_positions = []
-                    
-                    # Add the position to the current group
-                    current_positions.append({
-                        'imo_number': imo_number,
-                        'latitude': latitude,
-                        'longitude': longitude
-                    })
-                
-                # Add the last group
-                if current_group is not None:
-                    current_group['positions'] = current_positions
-                    result_groups.append(current_group)
+                result_groups = _group_positions_by_interval(cursor.fetchall(), grouping_format)
             else:
                 # Non-PostgreSQL databases - group data in Python
                 cursor.execute(time_groups_query, query_params)
@@ -1664,21 +1781,7 @@ def get_past_scrubber_distribution(request):
         logging.info(f"Unique vessels per time group: {[g['vessel_count'] for g in result_groups]}")
         logging.info(f"Total unique vessels across all time periods: {len(all_unique_imos)}")
         
-        return Response({
-            "time_groups": result_groups,
-            "query_params": {
-                "time_value": time_value,
-                "time_unit": time_unit,
-                "actual_unit": actual_unit,
-                "target_start_time": original_target_start_time.isoformat(),
-                "adjusted_start_time": start_time.isoformat(),
-                "end_time": end_time.isoformat(),
-                "data_availability": {
-                    "earliest_record": earliest_record_time.isoformat() if earliest_record_time else None,
-                    "start_adjusted": earliest_record_time > original_target_start_time if earliest_record_time else False
-                }
-            }
-        })
+        return _time_groups_response(request, result_groups, response_query_params)
     
     except Exception as e:
         import traceback
@@ -1,17 +1,29 @@
+from django.conf import settings
+
+from apps.north_sea_watch.utils import replicas
+
+
 class AisDataRouter:
     """
     A router to control database operations for models in the ais_data_collection database.
     """
     # List of models that should use the ais_data database
-    ais_models = ['port', 'ship', 'shipdata', 'icctscrubbermarch2025', 'icctwfrcombined']
+    ais_models = ['port', 'ship', 'shipdata', 'shiplatestposition', 'icctscrubbermarch2025', 'icctwfrcombined']
+    
+    # AIS models read from the read replicas when configured. ship_latest_position is
+    # maintained by this app and read back right after writing, so it stays on the primary
+    replica_models = ['port', 'ship', 'shipdata', 'icctscrubbermarch2025', 'icctwfrcombined']
     
     # List of models that should use the default database
-    default_models = ['portcontent', 'usertracking']
+    default_models = ['portcontent', 'usertracking', 'usertrackingdailyrollup']
     
     def db_for_read(self, model, **hints):
         """
-        Attempts to read ais models go to ais_data database.
+        Attempts to read ais models go to ais_data database, or one of its
+        read replicas within the lag limit.
         """
+        if model._meta.app_label == 'north_sea_watch' and model._meta.model_name.lower() in self.replica_models:
+            return replicas.get_read_alias()
         if model._meta.app_label == 'north_sea_watch' and model._meta.model_name.lower() in self.ais_models:
             return 'ais_data'
         if model._meta.app_label == 'north_sea_watch' and model._meta.model_name.lower() in self.default_models:
@@ -38,7 +50,10 @@ class AisDataRouter:
         """
         Make sure the ais models don't get migrated to the default database.
         And make sure the default models get migrated to the default database.
+        Nothing is migrated on the read replicas, they follow the primary.
         """
+        if db in settings.AIS_DATA_REPLICAS:
+            return False
         if app_label == 'north_sea_watch' and model_name and model_name.lower() in self.ais_models:
             return db == 'ais_data'
         if app_label == 'north_sea_watch' and model_name and model_name.lower() in self.default_models:
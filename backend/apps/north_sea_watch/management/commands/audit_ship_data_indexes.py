@@ -0,0 +1,162 @@
+"""
+Management command to audit and build the indexes of the ship_data table.
+Reports the existing, missing, invalid and redundant indexes, builds the
+missing ones with CREATE INDEX CONCURRENTLY and compares EXPLAIN ANALYZE of
+every endpoint query before and after.
+"""
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+from apps.north_sea_watch.utils.fleet_snapshot import ACTIVE_SHIPS_FALLBACK_QUERY
+from apps.north_sea_watch.utils.scrubber_distribution import build_bucketed_query, build_grid_query
+from apps.north_sea_watch.utils.scrubber_vessels import get_scrubber_imo_numbers
+from apps.north_sea_watch.utils.ship_paths import SHIP_PATH_QUERY, SHIP_PATHS_QUERY
+from apps.north_sea_watch.utils.ship_data_indexes import audit_indexes, create_index
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Partition indexes are reported once, as ship_data_*_<index>
+PARTITION_INDEX_PATTERN = re.compile(r'^ship_data_(?:p\d{8}|default)_')
+
+class Command(BaseCommand):
+    help = 'Audit the ship_data indexes and build the recommended composite, covering and BRIN indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the audit and the current query plans, do not build indexes',
+        )
+        parser.add_argument(
+            '--no-explain',
+            action='store_true',
+            help='Skip the EXPLAIN ANALYZE comparison of the endpoint queries',
+        )
+        parser.add_argument(
+            '--imo',
+            type=int,
+            help='IMO number used for the ship path queries (default: a recently reporting vessel)',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections['ais_data']
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.ERROR("The index audit requires a PostgreSQL database"))
+            return
+
+        try:
+            with connection.cursor() as cursor:
+                audit = audit_indexes(cursor)
+                self._write_audit(audit)
+
+                workload = [] if options['no_explain'] else self._build_workload(cursor, options)
+                before = {label: self._explain(cursor, query, params) for label, query, params in workload}
+
+                if options['dry_run'] or not audit['missing']:
+                    for label, result in before.items():
+                        self._write_plan(label, result)
+                    self.stdout.write(self.style.SUCCESS(
+                        "Dry run complete" if options['dry_run'] else "All recommended indexes exist"
+                    ))
+                    return
+
+                for name in audit['missing']:
+                    self.stdout.write(f"Building {name} concurrently")
+                    create_index(cursor, name)
+                cursor.execute("ANALYZE ship_data")
+
+                after = {label: self._explain(cursor, query, params) for label, query, params in workload}
+                if workload:
+                    self.stdout.write("\nquery                      before ms    after ms   indexes after")
+                    for label, _, _ in workload:
+                        self.stdout.write(
+                            f"{label:<26} {before[label]['execution_ms']:>9.1f} {after[label]['execution_ms']:>11.1f}"
+                            f"   {', '.join(after[label]['indexes']) or '-'}"
+                        )
+
+            self.stdout.write(self.style.SUCCESS(f"Built {len(audit['missing'])} indexes"))
+        except Exception as e:
+            logger.error(f"Error auditing ship_data indexes: {str(e)}")
+            self.stdout.write(
+                self.style.ERROR(f"Failed to audit ship_data indexes: {str(e)}")
+            )
+
+    def _write_audit(self, audit):
+        """
+        Print the existing indexes and the audit findings.
+        """
+        self.stdout.write("Existing ship_data indexes:")
+        for index in audit['indexes']:
+            flags = [] if index['valid'] else ['INVALID']
+            if index['name'] in audit['redundant']:
+                flags.append('redundant with the covering index')
+            self.stdout.write(
+                f"  {index['name']} ({(index['size'] or 0) / 1024 / 1024:.1f} MB) {index['definition']}"
+                + (f" [{', '.join(flags)}]" if flags else "")
+            )
+        self.stdout.write(f"Missing recommended indexes: {', '.join(audit['missing']) or 'none'}")
+        if audit['redundant']:
+            self.stdout.write(
+                f"Redundant indexes that can be dropped once the covering index exists: {', '.join(audit['redundant'])}"
+            )
+
+    def _build_workload(self, cursor, options):
+        """
+        Return (label, query, params) of the ship_data queries behind the endpoints.
+        """
+        now = timezone.now()
+        imo_numbers = get_scrubber_imo_numbers(cursor)
+
+        imo_number = options['imo']
+        if imo_number is None:
+            cursor.execute(
+                "SELECT imo_number FROM ship_data WHERE timestamp_ais >= %s LIMIT 1",
+                [now - timedelta(hours=24)]
+            )
+            row = cursor.fetchone()
+            imo_number = int(row[0]) if row else 0
+
+        return [
+            ('ship-path', SHIP_PATH_QUERY, [imo_number, now - timedelta(hours=24)]),
+            ('ship-paths scrubber 24h', SHIP_PATHS_QUERY, [imo_numbers, now - timedelta(hours=24), now]),
+            ('active-ships fallback', ACTIVE_SHIPS_FALLBACK_QUERY, [now - timedelta(hours=3)]),
+            ('distribution day 7d', *build_bucketed_query('day', now - timedelta(days=7), now, imo_numbers)),
+            ('distribution grid 24h', *build_grid_query('hour', now - timedelta(hours=24), now, imo_numbers, 0.1)),
+        ]
+
+    def _explain(self, cursor, query, params):
+        """
+        Run EXPLAIN ANALYZE and collect the execution time and the indexes used.
+        """
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+        result = cursor.fetchone()[0]
+        if isinstance(result, str):
+            result = json.loads(result)
+        result = result[0]
+
+        indexes = set()
+        nodes = [result['Plan']]
+        while nodes:
+            node = nodes.pop()
+            if 'Index Name' in node:
+                indexes.add(PARTITION_INDEX_PATTERN.sub('ship_data_*_', node['Index Name']))
+            nodes.extend(node.get('Plans', []))
+
+        return {
+            'execution_ms': result['Execution Time'],
+            'planning_ms': result['Planning Time'],
+            'shared_hit': result['Plan'].get('Shared Hit Blocks', 0),
+            'shared_read': result['Plan'].get('Shared Read Blocks', 0),
+            'indexes': sorted(indexes),
+        }
+
+    def _write_plan(self, label, result):
+        self.stdout.write(
+            f"{label}: {result['execution_ms']:.1f} ms execution, {result['planning_ms']:.1f} ms planning, "
+            f"{result['shared_hit']} blocks hit, {result['shared_read']} read, "
+            f"indexes: {', '.join(result['indexes']) or '-'}"
+        )
@@ -0,0 +1,269 @@
+"""
+Management command to benchmark the past scrubber distribution queries.
+Fills a temporary ship_data table with synthetic AIS positions, which shadows
+the real table for this database session only, and compares the plan and
+timing of the former interval join queries with the single-pass bucketed query.
+"""
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+from apps.north_sea_watch.utils.scrubber_distribution import BUCKET_UNITS, build_bucketed_query
+from datetime import timedelta
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Requested range per bucket size, similar to typical frontend requests
+BENCHMARK_WINDOWS = {
+    'hour': timedelta(hours=24),
+    'day': timedelta(days=30),
+    'week': timedelta(weeks=8),
+    'month': timedelta(days=90),
+}
+
+# Synthetic IMO numbers start here; the first --scrubber-vessels of them are queried
+FIRST_SYNTHETIC_IMO = 9000000
+
+
+def build_legacy_query(interval_unit, start_time, end_time, imo_numbers):
+    """
+    Build the query the endpoint used before the bucketed query, for comparison.
+
+    Hours and days were grouped from ship_data and joined back onto ship_data
+    on a timestamp range, weeks and months range joined a generated series of
+    intervals against every position.
+    """
+    placeholder_str = ','.join(['%s'] * len(imo_numbers))
+    group_by_sql = f"date_trunc('{interval_unit}', timestamp_ais)"
+
+    if interval_unit in ['week', 'month']:
+        query = f"""
+            WITH all_time_intervals AS (
+                SELECT
+                    time_series as interval_start,
+                    time_series + interval '1 {interval_unit}' as interval_end
+                FROM generate_series(
+                    %s::timestamp,
+                    %s::timestamp - interval '1 {interval_unit}',
+                    interval '1 {interval_unit}'
+                ) AS time_series
+            ),
+            vessel_positions AS (
+                SELECT
+                    {group_by_sql} as time_group,
+                    imo_number,
+                    latitude,
+                    longitude
+                FROM ship_data
+                WHERE
+                    timestamp_ais >= %s AND
+                    timestamp_ais < %s AND
+                    imo_number IN ({placeholder_str})
+            )
+            SELECT
+                ti.interval_start,
+                ti.interval_end,
+                vp.imo_number,
+                vp.latitude,
+                vp.longitude
+            FROM all_time_intervals ti
+            LEFT JOIN vessel_positions vp ON
+                vp.time_group >= ti.interval_start AND
+                vp.time_group < ti.interval_end
+            WHERE vp.imo_number IS NOT NULL
+            ORDER BY ti.interval_start, vp.imo_number
+        """
+        return query, [start_time, end_time, start_time, end_time] + list(imo_numbers)
+
+    query = f"""
+        WITH time_groups AS (
+            SELECT
+                {group_by_sql} as interval_start,
+                {group_by_sql} + interval '1 {interval_unit}' as interval_end
+            FROM ship_data
+            WHERE
+                timestamp_ais >= %s AND
+                timestamp_ais < %s AND
+                imo_number IN ({placeholder_str})
+            GROUP BY {group_by_sql}
+            ORDER BY interval_start
+        )
+        SELECT
+            tg.interval_start,
+            tg.interval_end,
+            sd.imo_number,
+            sd.latitude,
+            sd.longitude
+        FROM time_groups tg
+        JOIN ship_data sd ON
+            sd.timestamp_ais >= tg.interval_start AND
+            sd.timestamp_ais < tg.interval_end AND
+            sd.imo_number IN ({placeholder_str})
+        ORDER BY tg.interval_start, sd.imo_number
+    """
+    return query, [start_time, end_time] + list(imo_numbers) + list(imo_numbers)
+
+
+class Command(BaseCommand):
+    help = 'Compare the legacy and bucketed past scrubber distribution queries on synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=3000000,
+            help='Number of synthetic ship_data rows (default: 3000000)',
+        )
+        parser.add_argument(
+            '--vessels',
+            type=int,
+            default=2000,
+            help='Number of distinct synthetic vessels (default: 2000)',
+        )
+        parser.add_argument(
+            '--scrubber-vessels',
+            type=int,
+            default=400,
+            help='Number of vessels included in the queries (default: 400)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=120,
+            help='Number of days the synthetic positions are spread over (default: 120)',
+        )
+        parser.add_argument(
+            '--units',
+            nargs='+',
+            choices=BUCKET_UNITS,
+            default=list(BUCKET_UNITS),
+            help='Bucket sizes to benchmark (default: all)',
+        )
+        parser.add_argument(
+            '--statement-timeout',
+            type=int,
+            default=600,
+            help='Abort any single query after this many seconds (default: 600)',
+        )
+        parser.add_argument(
+            '--no-plans',
+            action='store_true',
+            help='Only print timings, not the full EXPLAIN ANALYZE output',
+        )
+        parser.add_argument(
+            '--database',
+            default='ais_data',
+            help='Database alias to run the benchmark on (default: ais_data)',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.ERROR("The benchmark requires a PostgreSQL database"))
+            return
+
+        data_end = timezone.now().replace(minute=0, second=0, microsecond=0)
+        imo_numbers = list(range(FIRST_SYNTHETIC_IMO, FIRST_SYNTHETIC_IMO + options['scrubber_vessels']))
+        results = []
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SET statement_timeout = %s", [options['statement_timeout'] * 1000])
+                self._create_synthetic_data(cursor, options, data_end)
+
+                for interval_unit in options['units']:
+                    cursor.execute(
+                        "SELECT date_trunc(%s, %s::timestamptz), date_trunc(%s, %s::timestamptz)",
+                        [
+                            interval_unit, data_end - BENCHMARK_WINDOWS[interval_unit],
+                            interval_unit, data_end,
+                        ]
+                    )
+                    start_time, end_time = cursor.fetchone()
+                    self.stdout.write(f"\n=== {interval_unit}: {start_time} to {end_time} ===")
+
+                    queries = [
+                        ('legacy', build_legacy_query(interval_unit, start_time, end_time, imo_numbers)),
+                        ('bucketed', build_bucketed_query(interval_unit, start_time, end_time, imo_numbers)),
+                    ]
+                    for label, (query, params) in queries:
+                        results.append(
+                            (interval_unit, label) + self._run_query(cursor, label, query, params, options)
+                        )
+        except Exception as e:
+            logger.error(f"Error benchmarking scrubber distribution queries: {str(e)}")
+            self.stdout.write(self.style.ERROR(f"Benchmark failed: {str(e)}"))
+            return
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute("DROP TABLE IF EXISTS pg_temp.ship_data")
+                cursor.execute("RESET statement_timeout")
+
+        self.stdout.write("\nunit      query       rows    execution ms   fetch ms")
+        for interval_unit, label, row_count, execution_ms, fetch_ms in results:
+            self.stdout.write(
+                f"{interval_unit:<9} {label:<9} {row_count:>8} {execution_ms:>14.1f} {fetch_ms:>10.1f}"
+            )
+        self.stdout.write(self.style.SUCCESS("Benchmark complete"))
+
+    def _create_synthetic_data(self, cursor, options, data_end):
+        """
+        Create and fill the temporary ship_data table with the real table's indexes.
+        """
+        self.stdout.write(
+            f"Generating {options['rows']} synthetic positions for {options['vessels']} vessels "
+            f"over {options['days']} days"
+        )
+        started = time.perf_counter()
+
+        cursor.execute("DROP TABLE IF EXISTS pg_temp.ship_data")
+        cursor.execute("""
+            CREATE TEMPORARY TABLE ship_data (
+                id bigserial PRIMARY KEY,
+                imo_number integer NOT NULL,
+                timestamp_ais timestamp with time zone NOT NULL,
+                latitude double precision,
+                longitude double precision
+            )
+        """)
+        cursor.execute("""
+            INSERT INTO pg_temp.ship_data (imo_number, timestamp_ais, latitude, longitude)
+            SELECT %s + (g %% %s),
+                   %s::timestamptz - random() * %s * interval '1 day',
+                   51 + random() * 8,
+                   -4 + random() * 13
+            FROM generate_series(1, %s) AS g
+        """, [FIRST_SYNTHETIC_IMO, options['vessels'], data_end, options['days'], options['rows']])
+        cursor.execute("CREATE INDEX ON pg_temp.ship_data (imo_number)")
+        cursor.execute("CREATE INDEX ON pg_temp.ship_data (timestamp_ais)")
+        cursor.execute("ANALYZE pg_temp.ship_data")
+
+        self.stdout.write(f"Synthetic data ready in {time.perf_counter() - started:.1f} s")
+
+    def _run_query(self, cursor, label, query, params, options):
+        """
+        Run EXPLAIN ANALYZE and a timed fetch of the query.
+
+        Returns:
+            Tuple of the row count, server execution time and client fetch time in ms
+        """
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, params)
+        plan = [row[0] for row in cursor.fetchall()]
+        execution_ms = next(
+            (float(line.split(':')[1].split()[0]) for line in plan if line.startswith('Execution Time')),
+            0.0
+        )
+
+        if not options['no_plans']:
+            self.stdout.write(f"\n--- {label} plan ---")
+            for line in plan:
+                self.stdout.write(line)
+
+        started = time.perf_counter()
+        cursor.execute(query, params)
+        row_count = len(cursor.fetchall())
+        fetch_ms = (time.perf_counter() - started) * 1000
+
+        self.stdout.write(f"{label}: {row_count} rows, {execution_ms:.1f} ms execution, {fetch_ms:.1f} ms fetch")
+        return row_count, execution_ms, fetch_ms
@@ -0,0 +1,171 @@
+"""
+Management command to benchmark the user agent classification of tracked visits.
+Classifies a stream of real user agent strings, repeated the way a few
+browsers and crawlers dominate visit traffic, with the former per-request
+identifier loop and parser, the compiled classifier and its memoized variant.
+"""
+from django.core.management.base import BaseCommand
+from apps.north_sea_watch.models import UserTracking
+from apps.north_sea_watch.utils import user_agent_classifier
+import logging
+import random
+import time
+import user_agents
+
+logger = logging.getLogger(__name__)
+
+# Real user agent strings of browsers and crawlers, most frequent first
+USER_AGENT_CORPUS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_4_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4.1 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Linux; Android 10; K) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36 Edg/124.0.0.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4.1 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0',
+    'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)',
+    'Mozilla/5.0 (Linux; Android 6.0.1; Nexus 5X Build/MMB29P) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.6367.155 Mobile Safari/537.36 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)',
+    'Mozilla/5.0 (compatible; bingbot/2.0; +http://www.bing.com/bingbot.htm)',
+    'Mozilla/5.0 (iPad; CPU OS 17_4_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4.1 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Linux; Android 14; SAMSUNG SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) SamsungBrowser/24.0 Chrome/117.0.0.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0',
+    'Mozilla/5.0 (compatible; AhrefsBot/7.0; +http://ahrefs.com/robot/)',
+    'Mozilla/5.0 (compatible; SemrushBot/7~bl; +http://www.semrush.com/bot.html)',
+    'Mozilla/5.0 (compatible; YandexBot/3.0; +http://yandex.com/bots)',
+    'facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)',
+    'WhatsApp/2.23.20.0',
+    'Slackbot-LinkExpanding 1.0 (+https://api.slack.com/robots)',
+    'Mozilla/5.0 (compatible; Discordbot/2.0; +https://discordapp.com)',
+    'TelegramBot (like TwitterBot)',
+    'Mozilla/5.0 AppleWebKit/537.36 (KHTML, like Gecko); compatible; GPTBot/1.0; +https://openai.com/gptbot',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/13.1.1 Safari/605.1.15 (Applebot/0.1; +http://www.apple.com/go/applebot)',
+    'Mozilla/5.0 (compatible; UptimeRobot/2.0; http://www.uptimerobot.com/)',
+    'python-requests/2.32.3',
+    'curl/8.5.0',
+]
+
+
+def legacy_classify(user_agent):
+    """
+    Classify a user agent the way track_user_visit did before the classifier, for comparison.
+    """
+    bot_identifiers = user_agent_classifier.BOT_IDENTIFIERS
+    is_bot = False
+    bot_agent = ""
+    if user_agent:
+        ua_lower = user_agent.lower()
+        for bot_id in bot_identifiers:
+            if bot_id in ua_lower:
+                is_bot = True
+                bot_agent = user_agent
+                break
+
+    device_type = "Unknown"
+    if user_agent:
+        ua = user_agents.parse(user_agent)
+        if ua.is_mobile:
+            device_type = "mobile"
+        elif ua.is_pc:
+            device_type = "desktop"
+        elif ua.is_tablet:
+            device_type = "mobile"
+    return user_agent_classifier.UserAgentClassification(device_type, is_bot, bot_agent)
+
+
+class Command(BaseCommand):
+    help = 'Compare the former and the compiled, memoized user agent classification'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20000,
+            help='Number of user agents classified per variant (default: 20000)',
+        )
+        parser.add_argument(
+            '--file',
+            help='Read the corpus from this file, one user agent per line, instead of the built-in one',
+        )
+        parser.add_argument(
+            '--from-tracking',
+            type=int,
+            default=0,
+            metavar='N',
+            help='Use the user agents of the latest N tracked visits as the corpus, with their real frequencies',
+        )
+
+    def handle(self, *args, **options):
+        corpus = self._load_corpus(options)
+        if not corpus:
+            self.stdout.write(self.style.ERROR("The user agent corpus is empty"))
+            return
+
+        # Skewed towards the first entries, as real traffic is
+        rng = random.Random(42)
+        if options['from_tracking']:
+            stream = [rng.choice(corpus) for _ in range(options['iterations'])]
+        else:
+            weights = [1 / (rank + 1) for rank in range(len(corpus))]
+            stream = rng.choices(corpus, weights=weights, k=options['iterations'])
+        self.stdout.write(
+            f"Classifying {len(stream)} user agents, {len(set(stream))} distinct, "
+            f"{sum(len(ua) for ua in stream) / len(stream):.0f} characters on average"
+        )
+
+        # The results must not change
+        mismatches = [ua for ua in set(stream) if legacy_classify(ua) != user_agent_classifier.classify_user_agent(ua)]
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f"{len(mismatches)} user agents classified differently:"))
+            for user_agent in mismatches[:10]:
+                self.stdout.write(f"  {user_agent}")
+            return
+
+        def detect_bot_loop(user_agent):
+            ua_lower = user_agent.lower()
+            return any(bot_id in ua_lower for bot_id in user_agent_classifier.BOT_IDENTIFIERS)
+
+        def detect_bot_pattern(user_agent):
+            return user_agent_classifier.BOT_PATTERN.search(user_agent.lower()) is not None
+
+        variants = [
+            ('bot detection, identifier loop', detect_bot_loop),
+            ('bot detection, compiled pattern', detect_bot_pattern),
+            ('classification, former', legacy_classify),
+            ('classification, compiled', user_agent_classifier._classify),
+            ('classification, memoized', user_agent_classifier.classify_user_agent),
+        ]
+
+        self.stdout.write("\nvariant                               total ms   us per call")
+        for label, classify in variants:
+            user_agent_classifier.clear_cache()
+            started = time.perf_counter()
+            for user_agent in stream:
+                classify(user_agent)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{label:<36} {elapsed * 1000:>9.1f} {elapsed / len(stream) * 1e6:>13.2f}")
+
+        cache_stats = user_agent_classifier.get_cache_stats()
+        self.stdout.write(f"\nMemoized run: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+        self.stdout.write(self.style.SUCCESS("Benchmark complete"))
+
+    def _load_corpus(self, options):
+        """
+        Return the user agent strings to benchmark with.
+        """
+        if options['file']:
+            with open(options['file']) as corpus_file:
+                return [line.strip() for line in corpus_file if line.strip()]
+
+        if options['from_tracking']:
+            try:
+                return list(
+                    UserTracking.objects.exclude(user_agent__isnull=True).exclude(user_agent='')
+                    .order_by('-timestamp').values_list('user_agent', flat=True)[:options['from_tracking']]
+                )
+            except Exception as e:
+                logger.error(f"Error reading tracked user agents: {str(e)}")
+                self.stdout.write(self.style.ERROR(f"Could not read tracked user agents: {str(e)}"))
+                return []
+
+        return USER_AGENT_CORPUS
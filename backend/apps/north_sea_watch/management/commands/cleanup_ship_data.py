@@ -6,6 +6,12 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
 from django.db import connections
+from apps.north_sea_watch.utils.dataset_metadata import refresh_dataset_metadata
+from apps.north_sea_watch.utils.latest_positions import prune_latest_positions
+from apps.north_sea_watch.utils.scrubber_rollups import prune_rollups
+from apps.north_sea_watch.utils.ship_data_partitions import (
+    drop_expired_partitions, ensure_partitions, is_partitioned
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -49,48 +55,79 @@ class Command(BaseCommand):
                     )
                     return
                 
-                if count == 0:
-                    self.stdout.write(
-                        self.style.SUCCESS("No records found to delete")
-                    )
-                    return
-                
-                # If count is large, delete in batches to avoid long locks
-                batch_size = options['batch_size']
-                total_deleted = 0
-                
-                self.stdout.write(f"Found {count} records to delete. Proceeding with batch size of {batch_size}")
+                # Keep the partitions of the coming days ready
+                partitioned = is_partitioned(cursor)
+                if partitioned:
+                    created = ensure_partitions(cursor)
+                    self.stdout.write(f"Created {len(created)} upcoming partitions")
                 
-                while total_deleted < count:
-                    # PostgreSQL doesn't support LIMIT in DELETE directly, so use this approach
-                    cursor.execute(
-                        """
-                        DELETE FROM ship_data
-                        WHERE id IN (
-                            SELECT id FROM ship_data
-                            WHERE timestamp_ais < %s
-                            ORDER BY id
-                            LIMIT %s
+                if partitioned:
+                    # Whole expired days are dropped as partitions, only rows of the
+                    # partition the cutoff falls on are deleted. Empty expired
+                    # partitions are dropped as well
+                    dropped = drop_expired_partitions(cursor, cutoff_date)
+                    self.stdout.write(f"Dropped {len(dropped)} expired partitions")
+                    
+                    if count:
+                        cursor.execute("DELETE FROM ship_data WHERE timestamp_ais < %s", [cutoff_date])
+                    total_deleted = count
+                elif count == 0:
+                    total_deleted = 0
+                else:
+                    # If count is large, delete in batches to avoid long locks
+                    batch_size = options['batch_size']
+                    total_deleted = 0
+                    
+                    self.stdout.write(f"Found {count} records to delete. Proceeding with batch size of {batch_size}")
+                    
+                    while total_deleted < count:
+                        # PostgreSQL doesn't support LIMIT in DELETE directly, so use this approach
+                        cursor.execute(
+                            """
+                            DELETE FROM ship_data
+                            WHERE id IN (
+                                SELECT id FROM ship_data
+                                WHERE timestamp_ais < %s
+                                ORDER BY id
+                                LIMIT %s
+                            )
+                            """,
+                            [cutoff_date, batch_size]
                         )
-                        """,
-                        [cutoff_date, batch_size]
-                    )
                     
-                    deleted_in_batch = cursor.rowcount
-                    total_deleted += deleted_in_batch
+                        deleted_in_batch = cursor.rowcount
+                        total_deleted += deleted_in_batch
                     
-                    # Log progress
-                    self.stdout.write(
-                        f"Deleted batch of {deleted_in_batch} records. Progress: {total_deleted}/{count}"
-                    )
+                        # Log progress
+                        self.stdout.write(
+                            f"Deleted batch of {deleted_in_batch} records. Progress: {total_deleted}/{count}"
+                        )
                     
-                    # If we deleted fewer records than the batch size, we're done
-                    if deleted_in_batch < batch_size:
-                        break
+                        # If we deleted fewer records than the batch size, we're done
+                        if deleted_in_batch < batch_size:
+                            break
             
-            self.stdout.write(
-                self.style.SUCCESS(f"Successfully deleted {total_deleted} records older than 3 months")
-            )
+            if total_deleted:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Successfully deleted {total_deleted} records older than 3 months")
+                )
+            else:
+                self.stdout.write(
+                    self.style.SUCCESS("No records found to delete")
+                )
+            
+            # Drop ships whose latest known position has expired as well
+            pruned = prune_latest_positions(cutoff_date)
+            self.stdout.write(f"Removed {pruned} expired entries from ship_latest_position")
+            
+            # The hourly and daily scrubber rollups expire with their raw positions
+            pruned_rollups = prune_rollups(cutoff_date)
+            self.stdout.write(f"Removed {sum(pruned_rollups.values())} expired scrubber rollup rows")
+            
+            # Recompute the day the cutoff falls on, earlier days are dropped from the metadata
+            metadata = refresh_dataset_metadata(since=cutoff_date, until=cutoff_date)
+            if metadata:
+                self.stdout.write(f"Dataset metadata updated, earliest record: {metadata['earliest_record']}")
             
         except Exception as e:
             logger.error(f"Error cleaning up ship_data: {str(e)}")
@@ -0,0 +1,35 @@
+"""
+Management command to invalidate cached responses of the reference data
+endpoints. Run it after reloading the ports or ICCT tables to serve the new
+data at once, instead of after the next table check.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from apps.north_sea_watch.utils import response_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Invalidate the cached responses of the ports, port contents and ICCT endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'groups',
+            nargs='*',
+            help=f"Groups of endpoints to invalidate: {', '.join(response_cache.GROUPS)} (default: all groups)",
+        )
+
+    def handle(self, *args, **options):
+        unknown = [group for group in options['groups'] if group not in response_cache.GROUPS]
+        if unknown:
+            raise CommandError(f"Unknown groups: {', '.join(unknown)}")
+
+        try:
+            groups = options['groups'] or response_cache.GROUPS
+            response_cache.invalidate(groups)
+            self.stdout.write(self.style.SUCCESS(f"Invalidated cached responses of {', '.join(groups)}"))
+        except Exception as e:
+            logger.error(f"Error invalidating cached responses: {str(e)}")
+            self.stdout.write(
+                self.style.ERROR(f"Failed to invalidate cached responses: {str(e)}")
+            )
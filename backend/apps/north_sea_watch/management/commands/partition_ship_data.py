@@ -0,0 +1,63 @@
+"""
+Management command to manage the daily partitions of ship_data.
+Converts ship_data into a partitioned table with --convert, and otherwise
+pre-creates the partitions of the coming days.
+"""
+from django.core.management.base import BaseCommand
+from django.db import connections
+from apps.north_sea_watch.utils.ship_data_partitions import (
+    DEFAULT_DAYS_AHEAD, LEGACY_TABLE, convert_to_partitioned, ensure_partitions,
+    get_partition_summary, is_partitioned
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Convert ship_data to daily range partitions and pre-create upcoming partitions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Copy ship_data into a partitioned table and swap it in (blocks writers while copying)',
+        )
+        parser.add_argument(
+            '--days-ahead',
+            type=int,
+            default=DEFAULT_DAYS_AHEAD,
+            help=f'Days of partitions to create ahead of today (default: {DEFAULT_DAYS_AHEAD})',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with connections['ais_data'].cursor() as cursor:
+                if options['convert']:
+                    self.stdout.write("Converting ship_data into daily partitions")
+                    stats = convert_to_partitioned(cursor, days_ahead=options['days_ahead'])
+                    self.stdout.write(
+                        f"Copied {stats['rows']} rows into {stats['partitions']} partitions, "
+                        f"the original table is kept as {LEGACY_TABLE}"
+                    )
+                elif not is_partitioned(cursor):
+                    self.stdout.write(
+                        self.style.WARNING("ship_data is not partitioned, run with --convert first")
+                    )
+                    return
+                else:
+                    created = ensure_partitions(cursor, days_ahead=options['days_ahead'])
+                    self.stdout.write(f"Created {len(created)} partitions")
+
+                summary = get_partition_summary(cursor)
+            
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"ship_data has {summary['partitions']} daily partitions from {summary['first_day']} "
+                    f"to {summary['last_day']}, {summary['default_partition_rows']} rows in the default partition"
+                )
+            )
+        except Exception as e:
+            logger.error(f"Error managing ship_data partitions: {str(e)}")
+            self.stdout.write(
+                self.style.ERROR(f"Failed to manage ship_data partitions: {str(e)}")
+            )
@@ -0,0 +1,46 @@
+"""
+Management command to delete old raw tracked visits.
+Each day is recounted into the daily visit rollups before its raw visits are
+deleted, so the visit summaries keep covering it.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.north_sea_watch.utils.tracking_rollups import prune_raw_visits
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Delete raw user_tracking visits older than the retention period, keeping their daily rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.TRACKING_RAW_RETENTION_DAYS,
+            help=f'Days of raw visits to keep, including today (default: {settings.TRACKING_RAW_RETENTION_DAYS})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the visits that would be deleted without deleting them',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError("--days must be at least 1")
+
+        try:
+            stats = prune_raw_visits(options['days'], dry_run=options['dry_run'])
+
+            action = 'Would delete' if options['dry_run'] else 'Deleted'
+            self.stdout.write(
+                f"{action} {stats['visits_deleted']} raw visits of {stats['days']} days "
+                f"before {stats['cutoff_day']}"
+            )
+            self.stdout.write(self.style.SUCCESS("Raw visit retention applied"))
+        except Exception as e:
+            logger.error(f"Error pruning raw visits: {str(e)}")
+            self.stdout.write(
+                self.style.ERROR(f"Failed to prune raw visits: {str(e)}")
+            )
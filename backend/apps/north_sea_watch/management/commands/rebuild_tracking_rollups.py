@@ -0,0 +1,60 @@
+"""
+Management command to recount the daily visit rollups from the raw tracked visits.
+Backfills the rollups of visits saved before they were maintained incrementally,
+or repairs them after raw visits were changed outside the tracking endpoint.
+"""
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from apps.north_sea_watch.utils.tracking_rollups import get_oldest_visit_day, rebuild_rollups
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Recount the daily visit rollups from user_tracking, one day per transaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=str,
+            help='First day to recount, YYYY-MM-DD (default: the day of the oldest raw visit)',
+        )
+        parser.add_argument(
+            '--until',
+            type=str,
+            help='Last day to recount, YYYY-MM-DD (default: today)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_date(options['since']) if options['since'] else None
+            until = parse_date(options['until']) if options['until'] else timezone.localdate()
+        except ValueError:
+            since = until = None
+        if (options['since'] and since is None) or until is None:
+            raise CommandError("--since and --until must be dates in YYYY-MM-DD format")
+
+        try:
+            oldest_day = get_oldest_visit_day()
+            if oldest_day is None:
+                self.stdout.write("No tracked visits to roll up")
+                return
+            # Days before the oldest raw visit were pruned and keep their rollups
+            day = max(since or oldest_day, oldest_day)
+
+            days = 0
+            rows = 0
+            while day <= until:
+                rows += rebuild_rollups(day, day + timedelta(days=1))
+                days += 1
+                day += timedelta(days=1)
+
+            self.stdout.write(f"Recounted {days} days into {rows} rollup rows")
+            self.stdout.write(self.style.SUCCESS("Visit rollups rebuilt"))
+        except Exception as e:
+            logger.error(f"Error rebuilding visit rollups: {str(e)}")
+            self.stdout.write(
+                self.style.ERROR(f"Failed to rebuild visit rollups: {str(e)}")
+            )
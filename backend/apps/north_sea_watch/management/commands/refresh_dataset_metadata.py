@@ -0,0 +1,44 @@
+"""
+Management command to recompute the ship_data daily stats behind the dataset
+metadata. Recomputes only the most recent days with --days, or every day.
+"""
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.north_sea_watch.utils.dataset_metadata import refresh_dataset_metadata
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Recompute the per-day ship_data counts and bounds served as dataset metadata'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Only recompute this many of the most recent days (default: all days)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            since = None
+            if options['days'] is not None:
+                since = timezone.now() - timedelta(days=max(options['days'] - 1, 0))
+
+            metadata = refresh_dataset_metadata(since=since)
+
+            if metadata is None:
+                self.stdout.write(self.style.SUCCESS("ship_data is empty, no dataset metadata to store"))
+                return
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Dataset metadata refreshed: {metadata['row_count']} rows over {metadata['day_count']} days "
+                    f"({metadata['earliest_record']} to {metadata['latest_record']})"
+                )
+            )
+        except Exception as e:
+            logger.error(f"Error refreshing dataset metadata: {str(e)}")
+            self.stdout.write(
+                self.style.ERROR(f"Failed to refresh dataset metadata: {str(e)}")
+            )
@@ -0,0 +1,28 @@
+"""
+Management command to rebuild the active ships fleet snapshot.
+Useful to warm the cache at startup or to refresh it from cron when the
+background refresher is disabled.
+"""
+from django.core.management.base import BaseCommand
+from apps.north_sea_watch.utils.fleet_snapshot import refresh_snapshot
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Rebuild the cached snapshot served by the active ships endpoint'
+
+    def handle(self, *args, **options):
+        try:
+            snapshot = refresh_snapshot()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Fleet snapshot refreshed with {len(snapshot['ships'])} ships "
+                    f"(ETag {snapshot['etag']})"
+                )
+            )
+        except Exception as e:
+            logger.error(f"Error refreshing fleet snapshot: {str(e)}")
+            self.stdout.write(
+                self.style.ERROR(f"Failed to refresh fleet snapshot: {str(e)}")
+            )
@@ -0,0 +1,49 @@
+"""
+Management command to bring the ship_latest_position table up to date.
+Processes the ship_data rows added since the last refresh, or rebuilds the
+table from scratch with --rebuild. The first run backfills the table, which
+the fleet snapshot only starts reading from once that has completed.
+"""
+from django.core.management.base import BaseCommand
+from apps.north_sea_watch.utils.latest_positions import (
+    DEFAULT_BATCH_SIZE, refresh_latest_positions, reset_latest_positions
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Incrementally refresh the latest position of every ship from ship_data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Empty the table and rebuild it from the whole ship_data table',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Number of ship_data ids to scan in each batch (default: {DEFAULT_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options['rebuild']:
+                self.stdout.write("Resetting ship_latest_position table")
+                reset_latest_positions()
+
+            stats = refresh_latest_positions(batch_size=options['batch_size'])
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Upserted {stats['ships_upserted']} ships in {stats['batches']} batches "
+                    f"(high-water mark: {stats['high_water_mark']})"
+                )
+            )
+        except Exception as e:
+            logger.error(f"Error refreshing latest positions: {str(e)}")
+            self.stdout.write(
+                self.style.ERROR(f"Failed to refresh latest positions: {str(e)}")
+            )
@@ -0,0 +1,51 @@
+"""
+Management command to keep the scrubber vessel position rollups up to date.
+The first run backfills the hourly, daily and monthly rollups from the whole
+ship_data table, later runs only aggregate the hours completed since.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+from apps.north_sea_watch.utils.scrubber_rollups import DEFAULT_LOOKBACK_HOURS, update_rollups
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Incrementally update the hourly, daily and monthly scrubber position rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=str,
+            help='Rebuild the rollups from this ISO datetime instead of the last update',
+        )
+        parser.add_argument(
+            '--lookback-hours',
+            type=int,
+            default=DEFAULT_LOOKBACK_HOURS,
+            help=f'Completed hours to re-aggregate for late AIS messages (default: {DEFAULT_LOOKBACK_HOURS})',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError("--since must be a valid ISO format datetime")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        try:
+            stats = update_rollups(since=since, lookback_hours=options['lookback_hours'])
+
+            for granularity, values in stats.items():
+                self.stdout.write(
+                    f"{granularity}: wrote {values['rows']} rows, rolled up until {values['rolled_up_until']}"
+                )
+            self.stdout.write(self.style.SUCCESS("Scrubber rollups updated"))
+        except Exception as e:
+            logger.error(f"Error updating scrubber rollups: {str(e)}")
+            self.stdout.write(
+                self.style.ERROR(f"Failed to update scrubber rollups: {str(e)}")
+            )
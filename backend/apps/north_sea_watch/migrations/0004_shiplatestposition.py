@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('north_sea_watch', '0003_icctscrubbermarch2025_icctwfrcombined_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShipLatestPosition',
+            fields=[
+                ('imo_number', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('source_id', models.BigIntegerField()),
+                ('timestamp_ais', models.DateTimeField()),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('destination', models.CharField(blank=True, max_length=255, null=True)),
+                ('navigational_status_code', models.IntegerField(blank=True, null=True)),
+                ('navigational_status', models.CharField(blank=True, max_length=100, null=True)),
+                ('true_heading', models.FloatField(blank=True, null=True)),
+                ('rate_of_turn', models.FloatField(blank=True, null=True)),
+                ('cog', models.FloatField(blank=True, null=True)),
+                ('sog', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'ship_latest_position',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('north_sea_watch', '0004_shiplatestposition'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTrackingDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('country', models.CharField(max_length=100)),
+                ('device_type', models.CharField(max_length=20)),
+                ('is_bot', models.BooleanField(default=False)),
+                ('visits', models.PositiveIntegerField(default=0)),
+                ('visits_with_ip_data', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'User Tracking Daily Rollup',
+                'verbose_name_plural': 'User Tracking Daily Rollups',
+                'db_table': 'user_tracking_daily_rollup',
+                'ordering': ['-day', '-visits'],
+                'unique_together': {('day', 'country', 'device_type', 'is_bot')},
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:23
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.functions.text
+
+from apps.common.migration_operations import AddIndexConcurrently, TrigramExtension
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently, without blocking visits being saved
+    atomic = False
+
+    dependencies = [
+        ('north_sea_watch', '0005_usertrackingdailyrollup'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AlterModelOptions(
+            name='usertracking',
+            options={'ordering': ['-timestamp', '-id'], 'verbose_name': 'User Tracking', 'verbose_name_plural': 'User Tracking'},
+        ),
+        AddIndexConcurrently(
+            model_name='usertracking',
+            index=models.Index(fields=['timestamp', 'id'], name='user_tracking_ts_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='usertracking',
+            index=models.Index(fields=['country', 'timestamp'], name='user_tracking_country_ts_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='usertracking',
+            index=models.Index(fields=['device_type', 'timestamp'], name='user_tracking_device_ts_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='usertracking',
+            index=models.Index(django.db.models.functions.text.Upper('session_id'), name='user_tracking_session_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='usertracking',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('ip_address'), name='gin_trgm_ops'), name='user_tracking_ip_trgm_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='usertracking',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('user_agent'), name='gin_trgm_ops'), name='user_tracking_ua_trgm_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='usertracking',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('page_url'), name='gin_trgm_ops'), name='user_tracking_page_trgm_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='usertracking',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('referer'), name='gin_trgm_ops'), name='user_tracking_referer_trgm_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:38
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+import django.db.models.functions.text
+
+from apps.common.migration_operations import AddIndexConcurrently, RemoveIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently, without blocking visits being saved
+    atomic = False
+
+    dependencies = [
+        ('north_sea_watch', '0006_usertracking_indexes'),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name='usertracking',
+            name='user_tracking_session_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='usertracking',
+            name='user_tracking_referer_trgm_idx',
+        ),
+        AddIndexConcurrently(
+            model_name='usertracking',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('session_id'), name='gin_trgm_ops'), name='user_tracking_sess_trgm_idx'),
+        ),
+    ]
@@ -1,4 +1,6 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from ckeditor.fields import RichTextField
 
 class Port(models.Model):
@@ -103,6 +105,33 @@ class ShipData(models.Model):
     def __str__(self):
         return f"Ship data for IMO {self.imo_number} at {self.timestamp_ais}"
 
+class ShipLatestPosition(models.Model):
+    """
+    Model representing the latest known position of each ship.
+    Maps to the 'ship_latest_position' table in the ais_data_collection database,
+    which is maintained incrementally from ship_data by utils.latest_positions.
+    """
+    imo_number = models.CharField(max_length=20, primary_key=True)
+    source_id = models.BigIntegerField()
+    timestamp_ais = models.DateTimeField()
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    destination = models.CharField(max_length=255, null=True, blank=True)
+    navigational_status_code = models.IntegerField(null=True, blank=True)
+    navigational_status = models.CharField(max_length=100, null=True, blank=True)
+    true_heading = models.FloatField(null=True, blank=True)
+    rate_of_turn = models.FloatField(null=True, blank=True)
+    cog = models.FloatField(null=True, blank=True)
+    sog = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        managed = False  # Created and refreshed by the refresh_latest_positions command
+        db_table = 'ship_latest_position'
+        app_label = 'north_sea_watch'
+
+    def __str__(self):
+        return f"Latest position for IMO {self.imo_number} at {self.timestamp_ais}"
+
 class UserTracking(models.Model):
     """
     Model for tracking user visits to the website.
@@ -138,11 +167,49 @@ class UserTracking(models.Model):
         app_label = 'north_sea_watch'
         verbose_name = 'User Tracking'
         verbose_name_plural = 'User Tracking'
-        ordering = ['-timestamp']
+        ordering = ['-timestamp', '-id']
+        indexes = [
+            # Keyset pagination over (timestamp, id), alone and within the admin list filters
+            models.Index(fields=['timestamp', 'id'], name='user_tracking_ts_id_idx'),
+            models.Index(fields=['country', 'timestamp'], name='user_tracking_country_ts_idx'),
+            models.Index(fields=['device_type', 'timestamp'], name='user_tracking_device_ts_idx'),
+            # Admin search: substrings of the searched columns, as searched in UPPER() by icontains,
+            # so the searches combine the indexes instead of scanning the table. Every index here
+            # is updated by every tracked visit, so only these few columns are searchable
+            GinIndex(OpClass(Upper('ip_address'), name='gin_trgm_ops'), name='user_tracking_ip_trgm_idx'),
+            GinIndex(OpClass(Upper('user_agent'), name='gin_trgm_ops'), name='user_tracking_ua_trgm_idx'),
+            GinIndex(OpClass(Upper('page_url'), name='gin_trgm_ops'), name='user_tracking_page_trgm_idx'),
+            GinIndex(OpClass(Upper('session_id'), name='gin_trgm_ops'), name='user_tracking_sess_trgm_idx'),
+        ]
         
     def __str__(self):
         return f"Visit from {self.ip_address or 'Unknown'} at {self.timestamp or 'Unknown'}"
 
+class UserTrackingDailyRollup(models.Model):
+    """
+    Model holding the number of tracked visits per day, country, device type and bot flag.
+    Maintained incrementally by utils.tracking_rollups as visits are saved, so visit
+    statistics do not have to scan the user_tracking table.
+    This model is stored in the default database (backend).
+    """
+    day = models.DateField()
+    country = models.CharField(max_length=100)
+    device_type = models.CharField(max_length=20)
+    is_bot = models.BooleanField(default=False)
+    visits = models.PositiveIntegerField(default=0)
+    visits_with_ip_data = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'user_tracking_daily_rollup'
+        app_label = 'north_sea_watch'
+        verbose_name = 'User Tracking Daily Rollup'
+        verbose_name_plural = 'User Tracking Daily Rollups'
+        ordering = ['-day', '-visits']
+        unique_together = [('day', 'country', 'device_type', 'is_bot')]
+
+    def __str__(self):
+        return f"{self.visits} visits from {self.country} ({self.device_type}) on {self.day}"
+
 class ICCTScrubberMarch2025(models.Model):
     """
     Model representing scrubber vessel data from the ais_data_collection database.
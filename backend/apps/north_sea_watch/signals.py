@@ -1,11 +1,14 @@
 """
 Django signals for the north_sea_watch app.
-Handles automatic calculation of scrubber discharge rates for new ships.
+Handles automatic calculation of scrubber discharge rates for new ships and
+invalidates the cached port content responses when port contents change.
 """
 
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import Ship, ICCTWFRCombined
+from .models import Ship, ICCTWFRCombined, PortContent
+from .utils import response_cache
 from .utils.emission_calculator import calculate_ship_discharge_rates
 import logging
 
@@ -89,4 +92,19 @@ def calculate_ship_discharge_rates_on_create(sender, instance, created, **kwargs
     except Exception as e:
         logger.error(
             f"Error auto-calculating discharge rates for ship {instance.imo_number}: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+
+@receiver(post_save, sender=PortContent)
+@receiver(post_delete, sender=PortContent)
+def invalidate_port_content_responses(sender, instance, **kwargs):
+    """
+    Signal handler invalidating the cached port content responses.
+
+    The invalidation waits for the commit, so the next request cannot cache
+    the port contents from before the change.
+    """
+    transaction.on_commit(
+        lambda: response_cache.invalidate([response_cache.PORT_CONTENTS]),
+        using=kwargs.get('using'),
+    )
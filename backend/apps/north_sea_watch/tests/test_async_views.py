@@ -0,0 +1,114 @@
+"""
+Tests for the async variants of the read-only AIS endpoints.
+"""
+import importlib.util
+import json
+from unittest import mock, skipIf
+from django.conf import settings
+from django.test import AsyncRequestFactory, SimpleTestCase, override_settings
+from django.urls import path
+from apps.north_sea_watch.api.v1 import async_views, views
+from apps.north_sea_watch.utils import async_db
+from apps.north_sea_watch.utils.asgi_routing import AsyncViewRouter, is_async_request
+
+class AsyncViewsTestCase(SimpleTestCase):
+    """Test cases for the request handling that needs no database."""
+    
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+    
+    async def test_rejects_other_methods(self):
+        """Test that the async views only accept GET, like the sync views."""
+        response = await async_views.get_ship_path(self.factory.post('/ship-path/9000002/'), '9000002')
+        
+        self.assertEqual(response.status_code, 405)
+    
+    async def test_invalid_path_options(self):
+        """Test that invalid ship path options are rejected before querying."""
+        request = self.factory.get('/ship-path/9000002/', {'tolerance': 'far'})
+        response = await async_views.get_ship_path(request, '9000002')
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content), {"error": "tolerance must be a number of metres"})
+    
+    def test_needs_sync_view(self):
+        """Test that only formats outside plain JSON are passed on to the sync views."""
+        self.assertFalse(async_views._needs_sync_view(self.factory.get('/active-ships/')))
+        self.assertFalse(async_views._needs_sync_view(self.factory.get('/active-ships/', {'format': 'json'})))
+        self.assertTrue(async_views._needs_sync_view(self.factory.get('/active-ships/', {'format': 'msgpack'})))
+        self.assertTrue(async_views._needs_sync_view(
+            self.factory.get('/active-ships/', headers={'Accept': 'application/x-msgpack'})
+        ))
+
+
+# The AIS endpoints as routed with ASYNC_AIS_VIEWS_ENABLED
+urlpatterns = [
+    path('ship-path/<str:imo_number>/', async_views.get_ship_path),
+    path('ship-paths/', views.get_ship_paths),
+]
+
+
+def _scope(path, query_string=b'', headers=()):
+    return {'type': 'http', 'path': path, 'query_string': query_string, 'headers': list(headers)}
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncRoutingTestCase(SimpleTestCase):
+    """Test cases for routing requests between the async views and the WSGI application."""
+    
+    def test_async_views_run_on_the_event_loop(self):
+        """Test that plain JSON and streamed requests of async views are served natively."""
+        self.assertTrue(is_async_request(_scope('/ship-path/9000002/')))
+        self.assertTrue(is_async_request(_scope('/ship-path/9000002/', b'stream=true')))
+        self.assertTrue(is_async_request(_scope('/ship-path/9000002/', b'format=json')))
+    
+    def test_sync_requests_go_to_the_wsgi_application(self):
+        """Test that sync views, unknown paths and MessagePack requests are served by the thread pool."""
+        self.assertFalse(is_async_request(_scope('/ship-paths/')))
+        self.assertFalse(is_async_request(_scope('/missing/')))
+        self.assertFalse(is_async_request(_scope('/ship-path/9000002/', b'format=msgpack')))
+        self.assertFalse(is_async_request(_scope(
+            '/ship-path/9000002/', headers=[(b'accept', b'application/x-msgpack')]
+        )))
+    
+    @skipIf(importlib.util.find_spec('a2wsgi') is None, "requires a2wsgi (requirements/async.txt)")
+    async def test_lifespan_shutdown_closes_pools(self):
+        """Test that the lifespan shutdown closes the async connection pools."""
+        messages = iter([{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+        sent = []
+        
+        async def receive():
+            return next(messages)
+        
+        async def send(message):
+            sent.append(message['type'])
+        
+        router = AsyncViewRouter(None, lambda environ, start_response: [], threads=1)
+        with mock.patch.object(async_db, 'close_pool', mock.AsyncMock()) as close_pool:
+            await router({'type': 'lifespan'}, receive, send)
+        
+        close_pool.assert_awaited_once()
+        self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+
+class AsyncPoolConnInfoTestCase(SimpleTestCase):
+    """Test cases for the connection parameters of the async pools."""
+    
+    @skipIf(async_db.AsyncConnectionPool is None, "requires psycopg 3 (requirements/psycopg3.txt)")
+    def test_conninfo_includes_options(self):
+        """Test that libpq OPTIONS reach the pool and Django-only ones are left out."""
+        from psycopg.conninfo import conninfo_to_dict
+        
+        database = {
+            'NAME': 'ais_data', 'USER': 'reader', 'PASSWORD': '', 'HOST': 'replica', 'PORT': '5432',
+            'OPTIONS': {'connect_timeout': 3, 'sslmode': 'require', 'options': '-c statement_timeout=5000',
+                        'pool': {'max_size': 4}},
+        }
+        with mock.patch.dict(settings.DATABASES, {'conninfo_test': database}):
+            params = conninfo_to_dict(async_db._conninfo('conninfo_test'))
+        
+        self.assertEqual(params, {
+            'dbname': 'ais_data', 'user': 'reader', 'host': 'replica', 'port': '5432',
+            'connect_timeout': '3', 'sslmode': 'require',
+            'options': '-c statement_timeout=5000 -c TimeZone=UTC',
+        })
@@ -0,0 +1,95 @@
+"""
+Tests for the columnar encoding utilities.
+"""
+from array import array
+from datetime import datetime, timezone
+from django.test import SimpleTestCase
+from apps.north_sea_watch.utils.columnar import (
+    MISSING_EPOCH_SECONDS, columnar_active_ships, columnar_ship_path, columnar_time_groups
+)
+
+TIME_GROUPS = [
+    {
+        'interval_start': '2025-03-01 00:00:00',
+        'interval_end': '2025-03-02 00:00:00',
+        'vessel_count': 2,
+        'positions': [
+            {'imo_number': 9000001, 'latitude': 54.123456789, 'longitude': 3.2},
+            {'imo_number': 9000002, 'latitude': 55.0, 'longitude': -1.5},
+        ],
+    },
+    {
+        'interval_start': '2025-03-02 00:00:00',
+        'interval_end': '2025-03-03 00:00:00',
+        'vessel_count': 1,
+        'positions': [
+            {'imo_number': 9000002, 'latitude': 55.5, 'longitude': 4.5},
+        ],
+    },
+]
+
+class ColumnarTimeGroupsTestCase(SimpleTestCase):
+    """Test cases for the columnar past scrubber distribution layout."""
+    
+    def test_json_columns(self):
+        """Test that positions become parallel arrays with a shared IMO list."""
+        data = columnar_time_groups(TIME_GROUPS, binary=False)
+        
+        self.assertEqual(data['imo_numbers'], [9000001, 9000002])
+        self.assertEqual(data['time_groups'][0]['imo_index'], [0, 1])
+        self.assertEqual(data['time_groups'][0]['latitude'], [54.12346, 55.0])
+        self.assertEqual(data['time_groups'][1]['imo_index'], [1])
+        self.assertEqual(data['time_groups'][1]['vessel_count'], 1)
+    
+    def test_binary_columns(self):
+        """Test that binary columns are little-endian float32 and uint32 arrays."""
+        data = columnar_time_groups(TIME_GROUPS, binary=True)
+        group = data['time_groups'][0]
+        
+        self.assertEqual(len(group['latitude']), 8)
+        self.assertEqual(array('I', group['imo_index']).tolist(), [0, 1])
+        self.assertAlmostEqual(array('f', group['longitude'])[1], -1.5)
+        self.assertAlmostEqual(array('f', group['latitude'])[0], 54.123456789, places=5)
+
+class ColumnarShipPathTestCase(SimpleTestCase):
+    """Test cases for the columnar ship path layout."""
+    
+    def test_ship_path_columns(self):
+        """Test that timestamps become epoch seconds and missing floats stay null."""
+        timestamp = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+        rows = [
+            (9000001, timestamp, 54.1, 3.2, 'ROTTERDAM', 0, 'Under way', None, 0.0, 90.0, 12.5),
+        ]
+        
+        data = columnar_ship_path(rows, 9000001, binary=False)
+        
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['timestamp'], [int(timestamp.timestamp())])
+        self.assertEqual(data['true_heading'], [None])
+        self.assertEqual(data['destination'], ['ROTTERDAM'])
+    
+    def test_missing_timestamps(self):
+        """Test that positions without a timestamp are encoded as null, or the sentinel in binary output."""
+        timestamp = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+        rows = [
+            (9000001, None, 54.1, 3.2, None, None, None, None, None, None, None),
+            (9000001, timestamp, 54.2, 3.3, None, None, None, None, None, None, None),
+        ]
+        
+        self.assertEqual(columnar_ship_path(rows, 9000001, binary=False)['timestamp'], [None, int(timestamp.timestamp())])
+        self.assertEqual(
+            array('I', columnar_ship_path(rows, 9000001, binary=True)['timestamp']).tolist(),
+            [MISSING_EPOCH_SECONDS, int(timestamp.timestamp())]
+        )
+        
+        ships = [{
+            'imo_number': 9000001, 'mmsi': None, 'name': 'North', 'ship_type': None, 'type_name': None,
+            'type_remark': None, 'length': None, 'width': None, 'max_draught': None, 'emission_berth': None,
+            'emission_anchor': None, 'emission_maneuver': None, 'emission_cruise': None,
+            'latest_position': {
+                'timestamp_ais': None, 'latitude': 54.1, 'longitude': 3.2, 'destination': None,
+                'navigational_status_code': None, 'navigational_status': None, 'true_heading': None,
+                'rate_of_turn': None, 'cog': None, 'sog': None,
+            },
+        }]
+        self.assertEqual(columnar_active_ships(ships, binary=False)['timestamp'], [None])
@@ -0,0 +1,139 @@
+"""
+Tests for the IP geolocation cache.
+"""
+from unittest.mock import patch
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from apps.north_sea_watch.utils import ip_geolocation
+
+LOCATED = {'status': 'success', 'country': 'Netherlands', 'countryCode': 'NL', 'city': 'Amsterdam'}
+FAILED = {'status': 'fail', 'message': 'reserved range'}
+
+class IPGeolocationCacheTestCase(SimpleTestCase):
+    """Test cases for caching IP-API responses."""
+    
+    def setUp(self):
+        cache.clear()
+        ip_geolocation.clear_local_cache()
+    
+    def tearDown(self):
+        cache.clear()
+        ip_geolocation.clear_local_cache()
+    
+    def test_repeated_lookup_cached(self):
+        """Test that IP-API is queried once per address."""
+        with patch.object(ip_geolocation, 'fetch_ip_data', return_value=LOCATED) as fetch_ip_data:
+            self.assertEqual(ip_geolocation.get_ip_api_data('198.51.100.7'), LOCATED)
+            self.assertEqual(ip_geolocation.get_ip_api_data('198.51.100.7'), LOCATED)
+            ip_geolocation.clear_local_cache()
+            # Other worker processes find it in the shared cache
+            self.assertEqual(ip_geolocation.get_ip_api_data('198.51.100.7'), LOCATED)
+        
+        fetch_ip_data.assert_called_once_with('198.51.100.7')
+    
+    @override_settings(IP_GEO_NEGATIVE_CACHE_SECONDS=0)
+    def test_failed_lookup_expires(self):
+        """Test that failed lookups are cached for the negative cache time only."""
+        with patch.object(ip_geolocation, 'fetch_ip_data', return_value=FAILED) as fetch_ip_data:
+            ip_geolocation.get_ip_api_data('10.0.0.1')
+            self.assertIsNone(ip_geolocation.get_cached_ip_data('10.0.0.1'))
+            ip_geolocation.get_ip_api_data('10.0.0.1')
+        
+        self.assertEqual(fetch_ip_data.call_count, 2)
+    
+    @override_settings(IP_GEO_CACHE_GROUP_BY_PREFIX=True)
+    def test_prefix_grouping(self):
+        """Test that addresses of one /24 network share a cache entry."""
+        self.assertEqual(ip_geolocation.get_cache_key('198.51.100.7'), 'ip_geo:198.51.100.0/24')
+        self.assertEqual(ip_geolocation.get_cache_key('2001:db8:1:2::1'), 'ip_geo:2001:db8:1::/48')
+        self.assertEqual(ip_geolocation.get_cache_key('Unknown'), 'ip_geo:Unknown')
+        
+        with patch.object(ip_geolocation, 'fetch_ip_data', return_value=LOCATED) as fetch_ip_data:
+            ip_geolocation.get_ip_api_data('198.51.100.7')
+            ip_geolocation.get_ip_api_data('198.51.100.200')
+        
+        fetch_ip_data.assert_called_once()
+    
+    @override_settings(IP_GEO_CACHE_MAX_ENTRIES=2)
+    def test_local_cache_bounded(self):
+        """Test that the in-process cache evicts the least recently used lookups."""
+        with patch.object(ip_geolocation, 'fetch_ip_data', return_value=LOCATED):
+            for ip in ['198.51.100.1', '198.51.100.2', '198.51.100.1', '198.51.100.3']:
+                ip_geolocation.get_ip_api_data(ip)
+        
+        self.assertEqual(
+            list(ip_geolocation._local_cache), ['ip_geo:198.51.100.1', 'ip_geo:198.51.100.3']
+        )
+
+
+class FakeProvider(ip_geolocation.GeolocationProvider):
+    """Provider returning a fixed result, recording its lookups."""
+    
+    def __init__(self, name, ip_data):
+        self.name = name
+        self.ip_data = ip_data
+        self.lookups = []
+    
+    def lookup(self, ip_address):
+        self.lookups.append(ip_address)
+        return self.ip_data
+
+class GeolocationProvidersTestCase(SimpleTestCase):
+    """Test cases for the geolocation provider chain."""
+    
+    def setUp(self):
+        ip_geolocation._providers = None
+    
+    def tearDown(self):
+        ip_geolocation._providers = None
+    
+    def test_mmdb_record_conversion(self):
+        """Test that City and ASN database records fill the IP-API fields."""
+        city = {
+            'city': {'names': {'en': 'Rotterdam', 'nl': 'Rotterdam'}},
+            'country': {'iso_code': 'NL', 'names': {'en': 'Netherlands'}},
+            'location': {'latitude': 51.9225, 'longitude': 4.4792, 'time_zone': 'Europe/Amsterdam'},
+            'postal': {'code': '3011'},
+            'subdivisions': [{'iso_code': 'ZH', 'names': {'en': 'South Holland'}}],
+        }
+        asn = {'autonomous_system_number': 1136, 'autonomous_system_organization': 'KPN B.V.'}
+        
+        ip_data = ip_geolocation.mmdb_record_to_ip_data(city, asn)
+        
+        self.assertEqual(ip_geolocation.to_tracking_fields(ip_data), {
+            'country': 'Netherlands',
+            'country_code': 'NL',
+            'region': 'ZH',
+            'region_name': 'South Holland',
+            'city': 'Rotterdam',
+            'zip_code': '3011',
+            'latitude': 51.9225,
+            'longitude': 4.4792,
+            'timezone': 'Europe/Amsterdam',
+            'isp': 'KPN B.V.',
+            'org': 'KPN B.V.',
+            'as_number': 'AS1136 KPN B.V.',
+        })
+        self.assertIsNone(ip_geolocation.mmdb_record_to_ip_data({'country': {'iso_code': 'NL'}})['as'])
+    
+    def test_falls_back_to_next_provider(self):
+        """Test that addresses missing from the local database are looked up remotely."""
+        local = FakeProvider('mmdb', None)
+        remote = FakeProvider('ip-api', LOCATED)
+        with patch.object(ip_geolocation, 'get_providers', return_value=[local, remote]):
+            ip_data = ip_geolocation.get_ip_data('198.51.100.7')
+        
+        self.assertEqual(ip_data, dict(LOCATED, provider='ip-api'))
+        self.assertEqual(local.lookups, ['198.51.100.7'])
+        
+        local.ip_data = dict(LOCATED, city='Rotterdam')
+        with patch.object(ip_geolocation, 'get_providers', return_value=[local, remote]):
+            self.assertEqual(ip_geolocation.get_ip_data('198.51.100.7')['provider'], 'mmdb')
+        self.assertEqual(len(remote.lookups), 1)
+    
+    @override_settings(IP_GEO_PROVIDERS=['mmdb', 'ip-api', 'unknown'], IP_GEO_MMDB_CITY_PATH='')
+    def test_unavailable_providers_skipped(self):
+        """Test that providers which cannot be set up leave the remaining ones in place."""
+        providers = ip_geolocation.get_providers()
+        
+        self.assertEqual([provider.name for provider in providers], ['ip-api'])
@@ -0,0 +1,179 @@
+"""
+Tests for the incrementally maintained latest position table, on a PostgreSQL ais_data database.
+"""
+from datetime import timedelta
+from unittest import skipUnless
+from unittest.mock import patch
+from django.db import connections
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from apps.north_sea_watch.utils import fleet_snapshot
+from apps.north_sea_watch.utils import latest_positions
+
+SHIP_DATA_TABLE = """
+    CREATE TABLE ship_data (
+        id serial PRIMARY KEY,
+        imo_number varchar(20),
+        timestamp_ais timestamptz,
+        latitude double precision,
+        longitude double precision,
+        destination varchar(255),
+        navigational_status_code integer,
+        navigational_status varchar(100),
+        true_heading double precision,
+        rate_of_turn double precision,
+        cog double precision,
+        sog double precision
+    )
+"""
+
+SHIPS_TABLE = """
+    CREATE TABLE ships (
+        imo_number varchar(20) PRIMARY KEY,
+        mmsi varchar(20),
+        name varchar(255),
+        ship_type integer,
+        length double precision,
+        width double precision,
+        max_draught double precision,
+        type_name varchar(255),
+        type_remark varchar(255),
+        emission_berth numeric(10, 2),
+        emission_anchor numeric(10, 2),
+        emission_maneuver numeric(10, 2),
+        emission_cruise numeric(10, 2)
+    )
+"""
+
+
+def _insert_position(cursor, imo_number, timestamp, latitude):
+    cursor.execute(
+        "INSERT INTO ship_data (imo_number, timestamp_ais, latitude, longitude) VALUES (%s, %s, %s, 3.0)",
+        [imo_number, timestamp, latitude]
+    )
+
+
+@skipUnless(connections['ais_data'].vendor == 'postgresql', "the latest position table needs PostgreSQL")
+class LatestPositionsTestCase(TestCase):
+    """Test cases for refreshing the latest position table."""
+    databases = {'default', 'ais_data'}
+    
+    def setUp(self):
+        self.now = timezone.now()
+        self.cursor = connections['ais_data'].cursor()
+        self.addCleanup(self.cursor.close)
+        # ship_data and ships are not managed by Django, so the test database has neither
+        self.cursor.execute(SHIP_DATA_TABLE)
+        self.cursor.execute(SHIPS_TABLE)
+        self.cursor.execute("INSERT INTO ships (imo_number, name) VALUES ('9000001', 'North'), ('9000002', 'South')")
+    
+    def latitudes(self):
+        self.cursor.execute(f"SELECT imo_number, latitude FROM {latest_positions.LATEST_POSITION_TABLE} ORDER BY imo_number")
+        return dict(self.cursor.fetchall())
+    
+    def test_refresh_in_batches(self):
+        """Test that batched refreshes keep the newest position of each ship."""
+        _insert_position(self.cursor, '9000001', self.now - timedelta(minutes=10), 54.0)
+        _insert_position(self.cursor, '9000001', self.now - timedelta(minutes=5), 54.5)
+        _insert_position(self.cursor, '9000002', self.now - timedelta(minutes=5), 55.0)
+        
+        stats = latest_positions.refresh_latest_positions(batch_size=2)
+        
+        self.assertEqual(stats['batches'], 2)
+        self.assertEqual(stats['high_water_mark'], 3)
+        self.assertEqual(self.latitudes(), {'9000001': 54.5, '9000002': 55.0})
+        self.assertTrue(latest_positions.is_populated())
+        
+        # A late row carrying an older fix does not replace the newer one
+        _insert_position(self.cursor, '9000001', self.now - timedelta(minutes=20), 53.0)
+        _insert_position(self.cursor, '9000002', self.now, 55.5)
+        latest_positions.refresh_latest_positions()
+        
+        self.assertEqual(self.latitudes(), {'9000001': 54.5, '9000002': 55.5})
+    
+    def test_reset(self):
+        """Test that a reset empties the table until the next refresh."""
+        _insert_position(self.cursor, '9000001', self.now, 54.0)
+        latest_positions.refresh_latest_positions()
+        
+        latest_positions.reset_latest_positions()
+        
+        self.assertFalse(latest_positions.is_populated())
+        self.assertEqual(self.latitudes(), {})
+        latest_positions.refresh_latest_positions()
+        self.assertEqual(self.latitudes(), {'9000001': 54.0})
+    
+    @patch('apps.north_sea_watch.utils.fleet_snapshot.refresh_latest_positions')
+    def test_snapshot_before_backfill(self, refresh_latest_positions):
+        """Test that the snapshot queries ship_data instead of backfilling the table on the request path."""
+        _insert_position(self.cursor, '9000001', self.now, 54.0)
+        
+        with self.settings(FLEET_SNAPSHOT_USE_LATEST_POSITIONS=True):
+            ships = fleet_snapshot.build_active_ships()
+        
+        refresh_latest_positions.assert_not_called()
+        self.assertEqual([ship['imo_number'] for ship in ships], ['9000001'])
+        self.cursor.execute("SELECT to_regclass(%s)", [latest_positions.LATEST_POSITION_TABLE])
+        self.assertIsNone(self.cursor.fetchone()[0])
+    
+    def test_snapshot_after_backfill(self):
+        """Test that the snapshot refreshes and reads the table once it is populated."""
+        _insert_position(self.cursor, '9000001', self.now - timedelta(minutes=5), 54.0)
+        latest_positions.refresh_latest_positions()
+        _insert_position(self.cursor, '9000002', self.now, 55.0)
+        
+        with self.settings(FLEET_SNAPSHOT_USE_LATEST_POSITIONS=True):
+            ships = fleet_snapshot.build_active_ships()
+        
+        self.assertEqual([ship['name'] for ship in ships], ['North', 'South'])
+        self.assertEqual(self.latitudes(), {'9000001': 54.0, '9000002': 55.0})
+
+
+@skipUnless(connections['ais_data'].vendor == 'postgresql', "the latest position table needs PostgreSQL")
+class LatestPositionsLateCommitTestCase(TransactionTestCase):
+    """Test cases for ingest transactions committing after a refresh passed their ids."""
+    databases = {'default', 'ais_data'}
+    
+    def setUp(self):
+        self.now = timezone.now()
+        self.cursor = connections['ais_data'].cursor()
+        self.cursor.execute(SHIP_DATA_TABLE)
+        self.addCleanup(self.drop_tables)
+    
+    def drop_tables(self):
+        self.cursor.execute(f"""
+            DROP TABLE IF EXISTS ship_data, {latest_positions.LATEST_POSITION_TABLE},
+                {latest_positions.LATEST_POSITION_STATE_TABLE}
+        """)
+        self.cursor.close()
+    
+    def state(self):
+        self.cursor.execute(f"""
+            SELECT last_ship_data_id, pending_ship_data_id
+            FROM {latest_positions.LATEST_POSITION_STATE_TABLE}
+        """)
+        return self.cursor.fetchone()
+    
+    def test_late_commit_below_high_water_mark(self):
+        """Test that rows committed below the processed ids are picked up and the safe mark waits for them."""
+        ingest = connections.create_connection('ais_data')
+        self.addCleanup(ingest.close)
+        ingest.set_autocommit(False)
+        with ingest.cursor() as ingest_cursor:
+            # Takes id 1 but stays uncommitted while id 2 commits
+            _insert_position(ingest_cursor, '9000001', self.now, 54.5)
+        _insert_position(self.cursor, '9000001', self.now - timedelta(minutes=5), 54.0)
+        
+        latest_positions.refresh_latest_positions()
+        self.cursor.execute(f"SELECT source_id, latitude FROM {latest_positions.LATEST_POSITION_TABLE}")
+        self.assertEqual(self.cursor.fetchall(), [(2, 54.0)])
+        
+        # The open ingest transaction keeps the safe mark from passing its id
+        latest_positions.refresh_latest_positions()
+        self.assertEqual(self.state(), (0, 2))
+        
+        ingest.commit()
+        latest_positions.refresh_latest_positions()
+        self.cursor.execute(f"SELECT source_id, latitude FROM {latest_positions.LATEST_POSITION_TABLE}")
+        self.assertEqual(self.cursor.fetchall(), [(1, 54.5)])
+        self.assertEqual(self.state(), (2, 2))
@@ -0,0 +1,86 @@
+"""
+Tests for the ais_data read replica routing.
+"""
+import threading
+from unittest.mock import MagicMock, patch
+from django.test import SimpleTestCase, override_settings
+from apps.north_sea_watch.db_routers import AisDataRouter
+from apps.north_sea_watch.utils import replicas
+
+REPLICAS = ['ais_data_replica_1', 'ais_data_replica_2']
+
+class ReplicaRoutingTestCase(SimpleTestCase):
+    """Test cases for picking the database alias of read-only AIS queries."""
+    
+    def setUp(self):
+        replicas._lag_state.clear()
+    
+    def tearDown(self):
+        replicas._lag_state.clear()
+    
+    @override_settings(AIS_DATA_REPLICAS=[])
+    def test_primary_without_replicas(self):
+        """Test that reads stay on the primary when no replica is configured."""
+        self.assertEqual(replicas.get_read_alias(), 'ais_data')
+    
+    @override_settings(AIS_DATA_REPLICAS=REPLICAS, AIS_DATA_REPLICA_MAX_LAG_SECONDS=30)
+    def test_skips_lagging_replicas(self):
+        """Test that lagging and unreachable replicas are left out of the rotation."""
+        lags = {'ais_data_replica_1': 120.0, 'ais_data_replica_2': 2.0}
+        with patch.object(replicas, 'measure_lag', side_effect=lags.get):
+            self.assertEqual({replicas.get_read_alias() for _ in range(4)}, {'ais_data_replica_2'})
+        
+        replicas._lag_state.clear()
+        with patch.object(replicas, 'measure_lag', return_value=None):
+            self.assertEqual(replicas.get_read_alias(), 'ais_data')
+    
+    @override_settings(AIS_DATA_REPLICAS=REPLICAS, AIS_DATA_REPLICA_LAG_CHECK_SECONDS=60)
+    def test_lag_checked_periodically(self):
+        """Test that the lag is measured once per check interval, not on every read."""
+        with patch.object(replicas, 'measure_lag', return_value=0.0) as measure_lag:
+            self.assertEqual({replicas.get_read_alias() for _ in range(4)}, set(REPLICAS))
+        
+        self.assertEqual(measure_lag.call_count, len(REPLICAS))
+    
+    @override_settings(AIS_DATA_REPLICAS=REPLICAS[:1], AIS_DATA_REPLICA_LAG_CHECK_SECONDS=60)
+    def test_single_lag_check(self):
+        """Test that reads do not wait for a lag check already running in another thread."""
+        replicas._lag_state['ais_data_replica_1'] = {'lag': 1.0, 'checked_at': -3600.0}
+        started, release = threading.Event(), threading.Event()
+        
+        def slow_measure_lag(alias):
+            started.set()
+            release.wait(5)
+            return 2.0
+        
+        with patch.object(replicas, 'measure_lag', side_effect=slow_measure_lag) as measure_lag:
+            checker = threading.Thread(target=replicas.get_read_alias)
+            checker.start()
+            self.assertTrue(started.wait(5))
+            self.assertEqual(replicas.get_read_alias(), 'ais_data_replica_1')
+            release.set()
+            checker.join(5)
+        
+        self.assertEqual(measure_lag.call_count, 1)
+        self.assertEqual(replicas._lag_state['ais_data_replica_1']['lag'], 2.0)
+    
+    @override_settings(AIS_DATA_REPLICAS=REPLICAS[:1], AIS_DATA_REPLICA_MAX_LAG_SECONDS=30)
+    def test_disconnected_replica(self):
+        """Test that a replica whose WAL receiver stopped is taken out of the rotation."""
+        connection = MagicMock(vendor='postgresql')
+        # What REPLICA_LAG_QUERY returns without a streaming WAL receiver
+        connection.cursor.return_value.__enter__.return_value.fetchone.return_value = (None,)
+        
+        with patch.object(replicas, 'connections', {'ais_data_replica_1': connection}):
+            self.assertIsNone(replicas.measure_lag('ais_data_replica_1'))
+            self.assertEqual(replicas.get_read_alias(), 'ais_data')
+        
+        connection.close.assert_not_called()
+    
+    @override_settings(AIS_DATA_REPLICAS=REPLICAS)
+    def test_no_migrations_on_replicas(self):
+        """Test that the router never migrates a replica."""
+        router = AisDataRouter()
+        
+        self.assertFalse(router.allow_migrate('ais_data_replica_1', 'north_sea_watch', 'ship'))
+        self.assertTrue(router.allow_migrate('ais_data', 'north_sea_watch', 'ship'))
@@ -0,0 +1,67 @@
+"""
+Tests for the response cache of the reference data endpoints.
+"""
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from apps.north_sea_watch.utils import response_cache
+
+@override_settings(RESPONSE_CACHE_ENABLED=True)
+class ResponseCacheTestCase(SimpleTestCase):
+    """Test cases for caching and revalidating responses."""
+    
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.calls = []
+        self.status = 200
+        
+        @response_cache.cached_response(response_cache.PORT_CONTENTS)
+        def view(request):
+            self.calls.append(request.GET.urlencode())
+            return HttpResponse(b'[{"port_name": "Rotterdam"}]', content_type='application/json', status=self.status)
+        self.view = view
+    
+    def test_served_from_cache(self):
+        """Test that a repeated request is served from the cache with the same ETag."""
+        first = self.view(self.factory.get('/api/v1/all-port-contents/'))
+        second = self.view(self.factory.get('/api/v1/all-port-contents/'))
+        
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second['Content-Type'], 'application/json')
+        self.assertIn('max-age=', second['Cache-Control'])
+    
+    def test_not_modified(self):
+        """Test that a request with the current ETag gets a 304 without content."""
+        etag = self.view(self.factory.get('/api/v1/all-port-contents/'))['ETag']
+        response = self.view(self.factory.get('/api/v1/all-port-contents/', HTTP_IF_NONE_MATCH=etag))
+        
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+    
+    def test_keyed_by_query_parameters(self):
+        """Test that query parameters select the entry, in any order."""
+        self.view(self.factory.get('/api/v1/all-port-contents/?a=1&b=2'))
+        self.view(self.factory.get('/api/v1/all-port-contents/?b=2&a=1'))
+        self.view(self.factory.get('/api/v1/all-port-contents/?a=2&b=2'))
+        
+        self.assertEqual(self.calls, ['a=1&b=2', 'a=2&b=2'])
+    
+    def test_invalidate(self):
+        """Test that invalidating the group of an endpoint makes it query again."""
+        self.view(self.factory.get('/api/v1/all-port-contents/'))
+        response_cache.invalidate([response_cache.PORT_CONTENTS])
+        self.view(self.factory.get('/api/v1/all-port-contents/'))
+        
+        self.assertEqual(len(self.calls), 2)
+    
+    def test_errors_not_cached(self):
+        """Test that failed responses are not cached."""
+        self.status = 500
+        self.view(self.factory.get('/api/v1/all-port-contents/'))
+        response = self.view(self.factory.get('/api/v1/all-port-contents/'))
+        
+        self.assertEqual(len(self.calls), 2)
+        self.assertFalse(response.has_header('ETag'))
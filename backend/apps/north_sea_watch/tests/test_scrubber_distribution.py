@@ -0,0 +1,66 @@
+"""
+Tests for the past scrubber distribution query utilities.
+"""
+from datetime import datetime
+from django.test import SimpleTestCase
+from apps.north_sea_watch.utils.scrubber_distribution import (
+    build_bucketed_query,
+    build_grid_query,
+    group_grid_rows
+)
+
+HOUR_FORMAT = "%Y-%m-%d %H:00:00"
+
+class ScrubberDistributionQueryTestCase(SimpleTestCase):
+    """Test cases for the bucketed and grid query builders."""
+    
+    def test_bucketed_query_params(self):
+        """Test that the IMO list is passed once as an array parameter."""
+        start = datetime(2025, 3, 1)
+        end = datetime(2025, 3, 2)
+        query, params = build_bucketed_query('day', start, end, [9000001, 9000002])
+        
+        self.assertIn('= ANY(%s)', query)
+        self.assertEqual(params, ['day', 'day', '1 day', start, end, [9000001, 9000002]])
+    
+    def test_invalid_interval_unit(self):
+        """Test that interval units date_trunc is not given are rejected."""
+        with self.assertRaises(ValueError):
+            build_bucketed_query('year; DROP TABLE ship_data', None, None, [])
+        with self.assertRaises(ValueError):
+            build_grid_query('minute', None, None, [], 0.1)
+
+class GroupGridRowsTestCase(SimpleTestCase):
+    """Test cases for converting grid query rows into time groups."""
+    
+    def test_group_grid_rows(self):
+        """Test that totals rows and cell rows are merged per interval."""
+        first = datetime(2025, 3, 1, 10)
+        second = datetime(2025, 3, 1, 11)
+        third = datetime(2025, 3, 1, 12)
+        rows = [
+            (first, second, None, None, 5, 2),
+            (first, second, 534, 12, 3, 2),
+            (first, second, 535, -1, 2, 1),
+            (second, third, None, None, 1, 1),
+            (second, third, 540, 20, 1, 1),
+        ]
+        
+        time_groups = group_grid_rows(rows, HOUR_FORMAT)
+        
+        self.assertEqual(len(time_groups), 2)
+        self.assertEqual(time_groups[0], {
+            'interval_start': '2025-03-01 10:00:00',
+            'interval_end': '2025-03-01 11:00:00',
+            'vessel_count': 2,
+            'position_count': 5,
+            'lat_index': [534, 535],
+            'lon_index': [12, -1],
+            'counts': [3, 2],
+        })
+        self.assertEqual(time_groups[1]['counts'], [1])
+        self.assertEqual(time_groups[1]['vessel_count'], 1)
+    
+    def test_group_grid_rows_empty(self):
+        """Test that no rows produce no time groups."""
+        self.assertEqual(group_grid_rows([], HOUR_FORMAT), [])
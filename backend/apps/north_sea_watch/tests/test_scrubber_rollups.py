@@ -0,0 +1,68 @@
+"""
+Tests for the scrubber vessel position rollups, on a PostgreSQL ais_data database.
+"""
+from datetime import datetime, timedelta
+from unittest import skipUnless
+from django.db import connections
+from django.test import TestCase
+from apps.north_sea_watch.utils import scrubber_rollups
+
+@skipUnless(connections['ais_data'].vendor == 'postgresql', "the rollups need PostgreSQL")
+class PruneRollupsTestCase(TestCase):
+    """Test cases for expiring the rollups with the raw ship_data."""
+    databases = {'default', 'ais_data'}
+    
+    def setUp(self):
+        self.cursor = connections['ais_data'].cursor()
+        self.addCleanup(self.cursor.close)
+        # ship_data is not managed by Django, the rollup tables copy its column types
+        self.cursor.execute("""
+            CREATE TABLE ship_data (
+                id serial PRIMARY KEY,
+                imo_number integer,
+                timestamp_ais timestamp,
+                latitude double precision,
+                longitude double precision
+            )
+        """)
+        scrubber_rollups.ensure_tables(self.cursor)
+    
+    def add_bucket(self, granularity, bucket_start):
+        self.cursor.execute(f"""
+            INSERT INTO {scrubber_rollups.ROLLUP_TABLES[granularity]}
+                (bucket_start, imo_number, cell_lat, cell_lon, latitude, longitude, position_count)
+            VALUES (%s, 9000001, 1080, 60, 54.0, 3.0, 4)
+        """, [bucket_start])
+    
+    def buckets(self, granularity):
+        self.cursor.execute(
+            f"SELECT bucket_start FROM {scrubber_rollups.ROLLUP_TABLES[granularity]} ORDER BY bucket_start"
+        )
+        return [row[0] for row in self.cursor.fetchall()]
+    
+    def covered_from(self):
+        self.cursor.execute(f"SELECT granularity, covered_from FROM {scrubber_rollups.ROLLUP_STATE_TABLE}")
+        return {granularity: covered_from.replace(tzinfo=None) for granularity, covered_from in self.cursor.fetchall()}
+    
+    def test_prune_rollups(self):
+        """Test that hourly and daily buckets ending before the cutoff are removed and monthly ones kept."""
+        cutoff = datetime(2025, 3, 10, 14, 30)
+        for granularity in scrubber_rollups.ROLLUP_TABLES:
+            scrubber_rollups._set_state(self.cursor, granularity, datetime(2025, 1, 1), datetime(2025, 6, 1))
+        for hour in (datetime(2025, 3, 10, 13), datetime(2025, 3, 10, 14), datetime(2025, 3, 10, 15)):
+            self.add_bucket('hour', hour)
+        for day in (datetime(2025, 3, 9), datetime(2025, 3, 10), datetime(2025, 3, 11)):
+            self.add_bucket('day', day)
+        self.add_bucket('month', datetime(2025, 1, 1))
+        
+        deleted = scrubber_rollups.prune_rollups(cutoff)
+        
+        self.assertEqual(deleted, {'hour': 1, 'day': 1})
+        self.assertEqual(self.buckets('hour'), [datetime(2025, 3, 10, 14), datetime(2025, 3, 10, 15)])
+        self.assertEqual(self.buckets('day'), [datetime(2025, 3, 10), datetime(2025, 3, 11)])
+        self.assertEqual(self.buckets('month'), [datetime(2025, 1, 1)])
+        self.assertEqual(self.covered_from(), {
+            'hour': datetime(2025, 3, 10, 14),
+            'day': datetime(2025, 3, 10),
+            'month': datetime(2025, 1, 1),
+        })
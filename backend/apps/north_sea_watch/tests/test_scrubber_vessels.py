@@ -0,0 +1,78 @@
+"""
+Tests for the scrubber vessel IMO number cache.
+"""
+from django.test import SimpleTestCase, override_settings
+from apps.north_sea_watch.utils import scrubber_vessels
+
+class FakeDatabase:
+    vendor = 'postgresql'
+
+class FakeCursor:
+    """Cursor returning a fixed fingerprint and IMO list, recording its queries."""
+    
+    db = FakeDatabase()
+    
+    def __init__(self, fingerprint, imo_numbers):
+        self.fingerprint = fingerprint
+        self.imo_numbers = imo_numbers
+        self.queries = []
+        self.result = None
+    
+    def execute(self, query, params=None):
+        self.queries.append(query)
+        if query == scrubber_vessels.POSTGRES_FINGERPRINT_QUERY:
+            self.result = [self.fingerprint]
+        else:
+            self.result = [(imo,) for imo in self.imo_numbers]
+    
+    def fetchone(self):
+        return self.result[0]
+    
+    def fetchall(self):
+        return self.result
+
+class ScrubberImoCacheTestCase(SimpleTestCase):
+    """Test cases for the process-wide scrubber IMO cache."""
+    
+    def setUp(self):
+        scrubber_vessels.clear_cache()
+    
+    def tearDown(self):
+        scrubber_vessels.clear_cache()
+    
+    @override_settings(SCRUBBER_IMO_CACHE_CHECK_SECONDS=3600)
+    def test_cached_between_checks(self):
+        """Test that the table is not queried again within the check interval."""
+        cursor = FakeCursor((1, 1, 10, 0, 0), ['9000002', '9000004'])
+        
+        self.assertEqual(scrubber_vessels.get_scrubber_imo_numbers(cursor), [9000002, 9000004])
+        self.assertEqual(scrubber_vessels.get_scrubber_imo_numbers(cursor), [9000002, 9000004])
+        self.assertEqual(len(cursor.queries), 2)
+    
+    @override_settings(SCRUBBER_IMO_CACHE_CHECK_SECONDS=0)
+    def test_unchanged_fingerprint(self):
+        """Test that only the fingerprint is queried while the table is unchanged."""
+        cursor = FakeCursor((1, 1, 10, 0, 0), ['9000002'])
+        scrubber_vessels.get_scrubber_imo_numbers(cursor)
+        
+        cursor.imo_numbers = ['9000006']
+        self.assertEqual(scrubber_vessels.get_scrubber_imo_numbers(cursor), [9000002])
+        self.assertEqual(cursor.queries[-1], scrubber_vessels.POSTGRES_FINGERPRINT_QUERY)
+    
+    @override_settings(SCRUBBER_IMO_CACHE_CHECK_SECONDS=0)
+    def test_reload_on_change(self):
+        """Test that a changed fingerprint reloads the IMO numbers."""
+        cursor = FakeCursor((1, 1, 10, 0, 0), ['9000002'])
+        scrubber_vessels.get_scrubber_imo_numbers(cursor)
+        
+        cursor.fingerprint = (1, 1, 11, 0, 0)
+        cursor.imo_numbers = ['9000006', 'unknown']
+        self.assertEqual(scrubber_vessels.get_scrubber_imo_numbers(cursor), [9000006])
+    
+    @override_settings(SCRUBBER_IMO_CACHE_CHECK_SECONDS=3600)
+    def test_returns_copy(self):
+        """Test that callers cannot modify the cached list."""
+        cursor = FakeCursor((1, 1, 10, 0, 0), ['9000002'])
+        scrubber_vessels.get_scrubber_imo_numbers(cursor).append(1)
+        
+        self.assertEqual(scrubber_vessels.get_scrubber_imo_numbers(cursor), [9000002])
@@ -0,0 +1,32 @@
+"""
+Tests for the ship_data index audit utilities.
+"""
+from django.test import SimpleTestCase
+from apps.north_sea_watch.utils.ship_data_indexes import (
+    RECOMMENDED_INDEXES, _definition, _is_covering_prefix
+)
+
+class IndexDefinitionTestCase(SimpleTestCase):
+    """Test cases for matching pg_get_indexdef() output."""
+    
+    def test_definition_matches_recommended(self):
+        """Test that a reported index definition compares equal to the recommended one."""
+        indexdef = (
+            "CREATE INDEX other_name ON public.ship_data USING btree (imo_number, timestamp_ais DESC) "
+            "INCLUDE (latitude, longitude, destination, navigational_status_code, navigational_status, "
+            "true_heading, rate_of_turn, cog, sog)"
+        )
+        
+        self.assertEqual(_definition(indexdef), RECOMMENDED_INDEXES['ship_data_imo_timestamp_covering_idx'])
+        self.assertEqual(
+            _definition("CREATE INDEX ship_data_timestamp_brin_idx ON ONLY public.ship_data USING brin (timestamp_ais)"),
+            RECOMMENDED_INDEXES['ship_data_timestamp_brin_idx']
+        )
+    
+    def test_covering_prefix(self):
+        """Test that only btree indexes on a prefix of the covering keys are redundant."""
+        self.assertTrue(_is_covering_prefix("USING btree (imo_number)"))
+        self.assertTrue(_is_covering_prefix("USING btree (imo_number, timestamp_ais)"))
+        self.assertFalse(_is_covering_prefix("USING btree (timestamp_ais)"))
+        self.assertFalse(_is_covering_prefix("USING btree (imo_number, timestamp_ais, id)"))
+        self.assertFalse(_is_covering_prefix("USING brin (timestamp_ais)"))
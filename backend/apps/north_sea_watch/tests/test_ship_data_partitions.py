@@ -0,0 +1,126 @@
+"""
+Tests for the ship_data partition management, on a PostgreSQL ais_data database.
+"""
+from datetime import datetime, time, timedelta
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase
+from django.utils import timezone
+from apps.north_sea_watch.utils import ship_data_partitions as partitions
+
+def _at(day, hour=6):
+    return datetime.combine(day, time(hour))
+
+@skipUnless(connections['ais_data'].vendor == 'postgresql', "partitioning needs PostgreSQL")
+class ShipDataPartitionsTestCase(TestCase):
+    """Test cases for converting, extending and expiring the daily partitions."""
+    databases = {'default', 'ais_data'}
+    
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.cursor = connections['ais_data'].cursor()
+        self.addCleanup(self.cursor.close)
+        # ship_data is not managed by Django, so the test database has none
+        self.cursor.execute("""
+            CREATE TABLE ship_data (
+                id serial PRIMARY KEY,
+                imo_number integer,
+                timestamp_ais timestamp,
+                latitude double precision,
+                longitude double precision
+            )
+        """)
+    
+    def insert_rows(self, *timestamps):
+        for timestamp in timestamps:
+            self.cursor.execute(
+                "INSERT INTO ship_data (imo_number, timestamp_ais, latitude, longitude) VALUES (9000001, %s, 54.0, 3.0)",
+                [timestamp]
+            )
+    
+    def count(self, table):
+        self.cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        return self.cursor.fetchone()[0]
+    
+    def partition_bound(self, name):
+        self.cursor.execute("SELECT pg_get_expr(relpartbound, oid) FROM pg_class WHERE relname = %s", [name])
+        return self.cursor.fetchone()[0]
+    
+    def test_convert_to_partitioned(self):
+        """Test that conversion copies every row into daily partitions of [day, day + 1)."""
+        first_day = self.today - timedelta(days=2)
+        self.insert_rows(_at(first_day), _at(first_day, 23), _at(self.today), None)
+        
+        result = partitions.convert_to_partitioned(self.cursor, days_ahead=1)
+        
+        self.assertTrue(partitions.is_partitioned(self.cursor))
+        self.assertEqual(result, {'rows': 4, 'partitions': 4})
+        self.assertEqual(
+            [day for _, day in partitions.list_partitions(self.cursor)],
+            [first_day + timedelta(days=offset) for offset in range(4)]
+        )
+        self.assertEqual(
+            self.partition_bound(partitions.partition_name(first_day)),
+            f"FOR VALUES FROM ('{first_day} 00:00:00') TO ('{first_day + timedelta(days=1)} 00:00:00')"
+        )
+        self.assertEqual(self.count(partitions.partition_name(first_day)), 2)
+        # Rows without a timestamp land in the default partition
+        self.assertEqual(self.count(partitions.DEFAULT_PARTITION), 1)
+        self.assertEqual(self.count(partitions.LEGACY_TABLE), 4)
+        
+        # New rows continue after the copied ids
+        self.insert_rows(_at(self.today))
+        self.cursor.execute("SELECT MAX(id) FROM ship_data")
+        self.assertEqual(self.cursor.fetchone()[0], 5)
+    
+    def test_create_partition_moves_default_rows(self):
+        """Test that a new partition takes over the rows of its day from the default partition."""
+        partitions.convert_to_partitioned(self.cursor, days_ahead=0)
+        later_day = self.today + timedelta(days=10)
+        self.insert_rows(_at(later_day), _at(later_day + timedelta(days=1)))
+        self.assertEqual(self.count(partitions.DEFAULT_PARTITION), 2)
+        
+        self.assertTrue(partitions.create_partition(self.cursor, later_day))
+        self.assertFalse(partitions.create_partition(self.cursor, later_day))
+        
+        self.assertEqual(self.count(partitions.partition_name(later_day)), 1)
+        self.assertEqual(self.count(partitions.DEFAULT_PARTITION), 1)
+        self.assertEqual(self.count('ship_data'), 2)
+    
+    def test_drop_expired_partitions(self):
+        """Test that only partitions ending on or before the cutoff day are dropped."""
+        first_day = self.today - timedelta(days=3)
+        self.insert_rows(*(_at(first_day + timedelta(days=offset)) for offset in range(4)))
+        partitions.convert_to_partitioned(self.cursor, days_ahead=0)
+        
+        # The cutoff falls on the third day, whose rows before the cutoff stay for the caller
+        cutoff_day = first_day + timedelta(days=2)
+        dropped = partitions.drop_expired_partitions(self.cursor, _at(cutoff_day, 12))
+        
+        self.assertEqual(dropped, [partitions.partition_name(first_day), partitions.partition_name(first_day + timedelta(days=1))])
+        self.assertEqual(
+            [day for _, day in partitions.list_partitions(self.cursor)],
+            [cutoff_day, self.today]
+        )
+        self.cursor.execute("SELECT to_regclass(%s)", [dropped[0]])
+        self.assertIsNone(self.cursor.fetchone()[0])
+        self.assertEqual(self.count('ship_data'), 2)
+    
+    @patch('apps.north_sea_watch.management.commands.cleanup_ship_data.refresh_dataset_metadata', return_value=None)
+    @patch('apps.north_sea_watch.management.commands.cleanup_ship_data.prune_rollups', return_value={})
+    @patch('apps.north_sea_watch.management.commands.cleanup_ship_data.prune_latest_positions', return_value=0)
+    def test_cleanup_without_expired_rows(self, prune_latest_positions, prune_rollups, refresh_dataset_metadata):
+        """Test that the cleanup still prunes the latest positions, rollups and metadata with nothing to delete."""
+        self.insert_rows(_at(self.today))
+        
+        output = StringIO()
+        call_command('cleanup_ship_data', stdout=output)
+        
+        self.assertIn("No records found to delete", output.getvalue())
+        prune_latest_positions.assert_called_once()
+        prune_rollups.assert_called_once()
+        refresh_dataset_metadata.assert_called_once()
+        self.assertEqual(self.count('ship_data'), 1)
@@ -0,0 +1,123 @@
+"""
+Tests for the streaming response utilities.
+"""
+import json
+from datetime import datetime
+from decimal import Decimal
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+from apps.north_sea_watch.utils.streaming import (
+    async_buffered, async_json_array, async_json_time_groups, buffered, dumps, json_array, json_document,
+    json_time_groups, json_tracks
+)
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+class JSONStreamingTestCase(SimpleTestCase):
+    """Test cases for the incremental JSON writers."""
+    
+    def test_dumps_matches_renderer(self):
+        """Test that values are serialised exactly as by the REST framework JSON renderer."""
+        value = {
+            'timestamp_ais': datetime(2025, 3, 1, 12, 30, 15, 123456),
+            'emission': Decimal('12.50'),
+            'destination': 'Göteborg\u2028',
+        }
+        
+        self.assertEqual(dumps(value), JSONRenderer().render(value).decode())
+        self.assertIn('"2025-03-01T12:30:15.123456"', dumps(value))
+    
+    def test_json_time_groups(self):
+        """Test that streamed time groups match the regular response format."""
+        first = datetime(2025, 3, 1)
+        second = datetime(2025, 3, 2)
+        third = datetime(2025, 3, 3)
+        rows = [
+            (first, second, 9000001, 54.1, 3.2),
+            (first, second, 9000001, 54.2, 3.3),
+            (first, second, 9000002, 55.0, 4.0),
+            (second, third, None, None, None),
+            (second, third, 9000002, 55.5, 4.5),
+        ]
+        
+        body = ''.join(json_time_groups(rows, "%Y-%m-%d 00:00:00", {"query_params": {"time_unit": "Day"}}))
+        
+        self.assertEqual(json.loads(body), {
+            "time_groups": [
+                {
+                    "interval_start": "2025-03-01 00:00:00",
+                    "interval_end": "2025-03-02 00:00:00",
+                    "positions": [
+                        {"imo_number": 9000001, "latitude": 54.1, "longitude": 3.2},
+                        {"imo_number": 9000001, "latitude": 54.2, "longitude": 3.3},
+                        {"imo_number": 9000002, "latitude": 55.0, "longitude": 4.0},
+                    ],
+                    "vessel_count": 2,
+                },
+                {
+                    "interval_start": "2025-03-02 00:00:00",
+                    "interval_end": "2025-03-03 00:00:00",
+                    "positions": [
+                        {"imo_number": 9000002, "latitude": 55.5, "longitude": 4.5},
+                    ],
+                    "vessel_count": 1,
+                },
+            ],
+            "query_params": {"time_unit": "Day"},
+        })
+    
+    def test_json_time_groups_empty(self):
+        """Test that no rows produce an empty time_groups array."""
+        body = ''.join(json_time_groups([], "%Y-%m-%d 00:00:00", {}))
+        self.assertEqual(json.loads(body), {"time_groups": []})
+    
+    def test_json_array_buffered(self):
+        """Test that buffering joins fragments without changing the output."""
+        items = [{"index": index} for index in range(100)]
+        chunks = list(buffered(json_array(items), buffer_size=256))
+        
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(json.loads(''.join(chunks)), items)
+    
+    def test_json_tracks(self):
+        """Test that tracks are written with their positions and counts."""
+        tracks = [
+            (9000001, iter([{"latitude": 54.1}, {"latitude": 54.2}])),
+            (9000002, iter([])),
+        ]
+        body = ''.join(json_document('tracks', json_tracks(tracks), {"query_params": {"scope": None}}))
+        
+        self.assertEqual(json.loads(body), {
+            "tracks": [
+                {"imo_number": 9000001, "positions": [{"latitude": 54.1}, {"latitude": 54.2}], "count": 2},
+                {"imo_number": 9000002, "positions": [], "count": 0},
+            ],
+            "query_params": {"scope": None},
+        })
+    
+    async def test_async_json_time_groups(self):
+        """Test that the async writer produces the same output as the sync one."""
+        first = datetime(2025, 3, 1)
+        second = datetime(2025, 3, 2)
+        rows = [
+            (first, second, 9000001, 54.1, 3.2, 4),
+            (first, second, None, None, None, None),
+            (second, datetime(2025, 3, 3), 9000002, 55.0, 4.0, 2),
+        ]
+        extra = {"query_params": {"source": "rollup"}}
+        
+        pieces = [piece async for piece in async_json_time_groups(_aiter(rows), "%Y-%m-%d 00:00:00", extra)]
+        
+        self.assertEqual(''.join(pieces), ''.join(json_time_groups(rows, "%Y-%m-%d 00:00:00", extra)))
+    
+    async def test_async_json_array_buffered(self):
+        """Test that async buffering joins fragments without changing the output."""
+        items = [{"index": index} for index in range(100)]
+        chunks = [chunk async for chunk in async_buffered(async_json_array(_aiter(items)), buffer_size=256)]
+        
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(json.loads(''.join(chunks)), items)
@@ -0,0 +1,62 @@
+"""
+Tests for the track simplification utilities.
+"""
+from datetime import datetime, timedelta, timezone
+from django.test import SimpleTestCase
+from apps.north_sea_watch.utils.track_simplification import (
+    encode_polyline, encode_track, simplify_indices
+)
+
+class SimplifyIndicesTestCase(SimpleTestCase):
+    """Test cases for Douglas-Peucker simplification."""
+    
+    def test_straight_line(self):
+        """Test that points on a straight course are reduced to the endpoints."""
+        coordinates = [(54.0, 3.0 + i * 0.001) for i in range(100)]
+        
+        self.assertEqual(simplify_indices(coordinates, 10), [0, 99])
+    
+    def test_keeps_turns(self):
+        """Test that a turn larger than the tolerance is kept."""
+        coordinates = [(54.0, 3.0), (54.0, 3.05), (54.0, 3.1), (54.05, 3.1), (54.1, 3.1)]
+        
+        self.assertEqual(simplify_indices(coordinates, 50), [0, 2, 4])
+    
+    def test_stationary_jitter(self):
+        """Test that GPS jitter of a moored ship within the tolerance is dropped."""
+        coordinates = [(54.0 + (i % 3) * 0.00001, 3.0 - (i % 2) * 0.00001) for i in range(500)]
+        
+        self.assertEqual(simplify_indices(coordinates, 20), [0, 499])
+    
+    def test_zero_tolerance(self):
+        """Test that a zero tolerance keeps every point."""
+        coordinates = [(54.0, 3.0), (54.0, 3.0), (54.0, 3.0)]
+        
+        self.assertEqual(simplify_indices(coordinates, 0), [0, 1, 2])
+
+class EncodePolylineTestCase(SimpleTestCase):
+    """Test cases for the encoded polyline output."""
+    
+    def test_reference_polyline(self):
+        """Test the example of the encoded polyline format specification."""
+        coordinates = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+        
+        self.assertEqual(encode_polyline(coordinates), '_p~iF~ps|U_ulLnnqC_mqNvxq`@')
+    
+    def test_track_time_deltas(self):
+        """Test that timestamps are sent as a start time and deltas."""
+        start = datetime(2025, 3, 1, tzinfo=timezone.utc)
+        timestamps = [start, start + timedelta(seconds=10), start + timedelta(seconds=70)]
+        
+        track = encode_track([(54.0, 3.0), (54.1, 3.1), (54.2, 3.2)], timestamps)
+        
+        self.assertEqual(track['count'], 3)
+        self.assertEqual(track['start_time'], int(start.timestamp()))
+        self.assertEqual(track['time_deltas'], [10, 60])
+    
+    def test_empty_track(self):
+        """Test that an empty track encodes without errors."""
+        track = encode_track([], [])
+        
+        self.assertEqual(track['polyline'], '')
+        self.assertIsNone(track['start_time'])
@@ -0,0 +1,115 @@
+"""
+Tests for the daily visit rollups.
+"""
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import skipUnless
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from apps.north_sea_watch.models import UserTracking, UserTrackingDailyRollup
+from apps.north_sea_watch.utils import tracking_rollups
+
+class VisitRollupTestCase(SimpleTestCase):
+    """Test cases for counting saved visits into rollup rows."""
+    
+    def test_count_visits(self):
+        """Test that visits are counted per day, country, device type and bot flag."""
+        records = [
+            UserTracking(timestamp=datetime(2025, 3, 1, 9, 0), country='Netherlands', device_type='mobile'),
+            UserTracking(timestamp=datetime(2025, 3, 1, 23, 59), country='Netherlands', device_type='mobile'),
+            UserTracking(timestamp=datetime(2025, 3, 2, 0, 0), country='Netherlands', device_type='mobile'),
+            UserTracking(timestamp=datetime(2025, 3, 1, 9, 0), device_type='desktop', is_bot=True),
+        ]
+        
+        self.assertEqual(tracking_rollups.count_visits(records), {
+            (date(2025, 3, 1), 'Netherlands', 'mobile', False): [2, 2],
+            (date(2025, 3, 2), 'Netherlands', 'mobile', False): [1, 1],
+            (date(2025, 3, 1), 'Unknown', 'desktop', True): [1, 0],
+        })
+    
+    def test_visits_with_ip_data(self):
+        """Test that visits located by city or ISP alone count as having IP data."""
+        records = [
+            UserTracking(timestamp=datetime(2025, 3, 1, 9, 0), city='Rotterdam', country=''),
+            UserTracking(timestamp=datetime(2025, 3, 1, 9, 0), isp='KPN B.V.'),
+            UserTracking(timestamp=datetime(2025, 3, 1, 9, 0)),
+            UserTracking(timestamp=None, country='Netherlands'),
+        ]
+        
+        self.assertEqual(tracking_rollups.count_visits(records), {
+            (date(2025, 3, 1), 'Unknown', 'Unknown', False): [3, 2],
+        })
+    
+    def test_rollup_day_in_server_timezone(self):
+        """Test that aware timestamps are counted on their day in the server timezone (UTC)."""
+        timestamp = datetime(2025, 3, 1, 23, 30, tzinfo=dt_timezone.utc)
+        
+        self.assertEqual(tracking_rollups.get_rollup_day(timestamp), date(2025, 3, 1))
+        self.assertEqual(tracking_rollups.get_rollup_day(timestamp.replace(tzinfo=None)), date(2025, 3, 1))
+
+
+class RollupDatabaseTestCase(TestCase):
+    """Test cases for writing, recounting and pruning the rollups in the database."""
+    
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.old_day = self.today - timedelta(days=10)
+    
+    def save_visits(self, day, count, **fields):
+        """Save visits at noon of the given day and add them to the rollups, as the tracking queue does."""
+        timestamp = timezone.make_aware(datetime.combine(day, datetime.min.time())) + timedelta(hours=12)
+        records = UserTracking.objects.bulk_create(
+            [UserTracking(timestamp=timestamp, **fields) for _ in range(count)]
+        )
+        tracking_rollups.add_visits(records)
+    
+    def rollups(self):
+        return {
+            (rollup.day, rollup.country, rollup.device_type, rollup.is_bot): (rollup.visits, rollup.visits_with_ip_data)
+            for rollup in UserTrackingDailyRollup.objects.all()
+        }
+    
+    def test_add_visits_accumulates(self):
+        """Test that visits added to an existing rollup row are added to its counts."""
+        self.save_visits(self.today, 2, country='Netherlands', device_type='mobile')
+        self.save_visits(self.today, 3, country='Netherlands', device_type='mobile')
+        self.save_visits(self.today, 1, device_type='mobile')
+        
+        self.assertEqual(self.rollups(), {
+            (self.today, 'Netherlands', 'mobile', False): (5, 5),
+            (self.today, 'Unknown', 'mobile', False): (1, 0),
+        })
+    
+    @skipUnless(connection.vendor == 'postgresql', "the recount locks the rollup table")
+    def test_rebuild_rollups(self):
+        """Test that a recount replaces the rollups of its days only."""
+        self.save_visits(self.old_day, 2, country='Netherlands', device_type='desktop')
+        self.save_visits(self.today, 1, country='Belgium', device_type='desktop')
+        UserTrackingDailyRollup.objects.filter(day=self.old_day).update(visits=7)
+        UserTrackingDailyRollup.objects.create(day=self.old_day, country='Germany', device_type='desktop', visits=4)
+        
+        written = tracking_rollups.rebuild_rollups(self.old_day, self.old_day + timedelta(days=1))
+        
+        self.assertEqual(written, 1)
+        self.assertEqual(self.rollups(), {
+            (self.old_day, 'Netherlands', 'desktop', False): (2, 2),
+            (self.today, 'Belgium', 'desktop', False): (1, 1),
+        })
+    
+    @skipUnless(connection.vendor == 'postgresql', "pruning recounts the rollups with a table lock")
+    def test_prune_keeps_rollup_totals(self):
+        """Test that pruning the raw visits keeps their counts in the rollups."""
+        self.save_visits(self.old_day, 3, country='Netherlands', device_type='mobile')
+        self.save_visits(self.old_day, 2, device_type='desktop', is_bot=True)
+        self.save_visits(self.today, 1, country='Netherlands', device_type='mobile')
+        summary_range = (self.old_day, self.today + timedelta(days=1))
+        before = tracking_rollups.get_visit_summary(*summary_range)
+        
+        stats = tracking_rollups.prune_raw_visits(retention_days=3)
+        
+        self.assertEqual(stats['visits_deleted'], 5)
+        self.assertEqual(stats['days'], 1)
+        self.assertEqual(UserTracking.objects.count(), 1)
+        self.assertEqual(tracking_rollups.get_visit_summary(*summary_range), before)
+        self.assertEqual(before['totals']['visits'], 6)
+        self.assertEqual(before['totals']['bot_visits'], 2)
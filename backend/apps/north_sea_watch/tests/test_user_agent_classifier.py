@@ -0,0 +1,52 @@
+"""
+Tests for the user agent classifier.
+"""
+from django.test import SimpleTestCase
+from apps.north_sea_watch.utils import user_agent_classifier
+
+DESKTOP_UA = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+)
+IPHONE_UA = (
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_4_1 like Mac OS X) AppleWebKit/605.1.15 '
+    '(KHTML, like Gecko) Version/17.4.1 Mobile/15E148 Safari/604.1'
+)
+BOT_UA = 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)'
+
+class UserAgentClassifierTestCase(SimpleTestCase):
+    """Test cases for classifying user agent strings."""
+    
+    def setUp(self):
+        user_agent_classifier.clear_cache()
+    
+    def tearDown(self):
+        user_agent_classifier.clear_cache()
+    
+    def test_detect_bot(self):
+        """Test that bot user agents are flagged and kept as the bot agent."""
+        self.assertEqual(user_agent_classifier.classify_user_agent(BOT_UA)[1:], (True, BOT_UA))
+        self.assertEqual(user_agent_classifier.classify_user_agent(DESKTOP_UA)[1:], (False, ""))
+        self.assertTrue(user_agent_classifier.classify_user_agent('facebookexternalhit/1.1').is_bot)
+        self.assertEqual(user_agent_classifier.classify_user_agent(''), user_agent_classifier.UNKNOWN_USER_AGENT)
+    
+    def test_device_type(self):
+        """Test that phones are classified as mobile and PCs as desktop devices."""
+        self.assertEqual(user_agent_classifier.classify_user_agent(IPHONE_UA).device_type, 'mobile')
+        self.assertEqual(user_agent_classifier.classify_user_agent(DESKTOP_UA).device_type, 'desktop')
+    
+    def test_repeated_user_agent_memoized(self):
+        """Test that a user agent is parsed once and then served from the cache."""
+        for _ in range(3):
+            user_agent_classifier.classify_user_agent(DESKTOP_UA)
+        user_agent_classifier.classify_user_agent(IPHONE_UA)
+        
+        stats = user_agent_classifier.get_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['currsize']), (2, 2, 2))
+    
+    def test_long_user_agent_not_memoized(self):
+        """Test that oversized user agents are classified without filling the cache."""
+        user_agent = DESKTOP_UA + ' x' * user_agent_classifier.MAX_CACHED_LENGTH
+        
+        self.assertEqual(user_agent_classifier.classify_user_agent(user_agent).device_type, 'desktop')
+        self.assertEqual(user_agent_classifier.get_cache_stats()['currsize'], 0)
@@ -0,0 +1,47 @@
+"""
+Tests for the visit tracking enrichment and queue.
+"""
+from datetime import datetime
+from unittest.mock import patch
+from django.test import SimpleTestCase, override_settings
+from apps.north_sea_watch.utils import visit_tracking
+
+DESKTOP_UA = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+)
+
+class VisitTrackingTestCase(SimpleTestCase):
+    """Test cases for preparing tracked visits for the database."""
+    
+    def test_enrich_visit(self):
+        """Test that a visit gets its device type and location, and loses unknown fields."""
+        visit = {
+            'ip_address': '203.0.113.7',
+            'timestamp': datetime(2025, 3, 1, 12, 0),
+            'user_agent': DESKTOP_UA,
+            'page_url': 'https://northseawatch.org/',
+            'not_a_field': 'dropped',
+        }
+        with patch.object(visit_tracking, 'lookup_ip', return_value={'country': 'Netherlands'}) as lookup_ip:
+            tracking_data = visit_tracking.enrich_visit(visit)
+        
+        lookup_ip.assert_called_once_with('203.0.113.7')
+        self.assertEqual(tracking_data['device_type'], 'desktop')
+        self.assertEqual(tracking_data['country'], 'Netherlands')
+        self.assertFalse(tracking_data['is_bot'])
+        self.assertNotIn('not_a_field', tracking_data)
+        self.assertIn('not_a_field', visit)
+    
+    def test_unknown_ip_not_looked_up(self):
+        """Test that visits without a client IP skip the geolocation lookup."""
+        with patch.object(visit_tracking, 'lookup_ip') as lookup_ip:
+            visit_tracking.enrich_visit({'ip_address': 'Unknown', 'device_type': 'mobile'})
+        
+        lookup_ip.assert_not_called()
+    
+    @override_settings(TRACKING_QUEUE_MAX_SIZE=0)
+    def test_full_queue_drops_visit(self):
+        """Test that visits are rejected instead of queued without limit."""
+        self.assertFalse(visit_tracking.enqueue_visit({'ip_address': '203.0.113.7'}))
+        self.assertEqual(visit_tracking.get_queue_depth(), 0)
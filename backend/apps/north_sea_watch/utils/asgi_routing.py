@@ -0,0 +1,84 @@
+"""
+ASGI request routing utilities.
+Under the ASGI server only the async views run on the event loop. Every other
+request goes to the WSGI application on a pool of threads, as under the
+threaded WSGI server, instead of through Django's ASGI handler, which runs
+sync views through thread-sensitive sync_to_async and reads their streamed
+responses into memory in full.
+"""
+
+import asyncio
+import logging
+from urllib.parse import parse_qs
+
+from django.urls import Resolver404, resolve
+
+from apps.north_sea_watch.api.v1.async_views import needs_sync_view
+from apps.north_sea_watch.utils import async_db
+
+logger = logging.getLogger(__name__)
+
+
+def is_async_request(scope) -> bool:
+    """
+    Check whether an HTTP request is handled natively by an async view.
+
+    Requests for formats the async views pass on to the sync views, such as
+    MessagePack, count as sync requests.
+    """
+    path = scope['path']
+    root_path = scope.get('root_path', '')
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return False
+    if not asyncio.iscoroutinefunction(match.func):
+        return False
+
+    query = parse_qs(scope.get('query_string', b'').decode('latin1'))
+    requested_format = query['format'][-1] if 'format' in query else None
+    accept = ','.join(
+        value.decode('latin1') for name, value in scope.get('headers', []) if name == b'accept'
+    )
+    return not needs_sync_view(requested_format, accept)
+
+
+class AsyncViewRouter:
+    """
+    ASGI application serving the async views with Django's ASGI handler and
+    all other HTTP requests with the WSGI application on a thread pool. It
+    also handles the lifespan protocol, closing the async connection pools
+    on shutdown.
+    """
+
+    def __init__(self, asgi_application, wsgi_application, threads: int):
+        # Streams the responses of the WSGI application, unlike Django's ASGI handler
+        from a2wsgi import WSGIMiddleware
+
+        self.asgi_application = asgi_application
+        self.wsgi_application = WSGIMiddleware(wsgi_application, workers=threads)
+        logger.info(f"Serving the sync views on {threads} threads")
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http' and not is_async_request(scope):
+            await self.wsgi_application(scope, receive, send)
+        else:
+            await self.asgi_application(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                try:
+                    await async_db.close_pool()
+                except Exception as e:
+                    logger.error(f"Error closing the async connection pools: {str(e)}")
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
@@ -0,0 +1,181 @@
+"""
+Async database access utilities.
+Runs the read-only ais_data queries of the async views on a psycopg 3
+connection pool owned by the ASGI server's event loop, so concurrent requests
+wait on PostgreSQL without each holding a worker thread.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import AsyncIterator, List
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from apps.north_sea_watch.utils.streaming import STREAM_CHUNK_ROWS
+
+try:
+    from psycopg.conninfo import make_conninfo
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:  # Optional dependency
+    AsyncConnectionPool = None
+
+logger = logging.getLogger(__name__)
+
+_pool_lock = threading.Lock()
+# (pool, event loop that created it) by database alias
+_pools = {}
+
+
+# OPTIONS of Django's PostgreSQL backend that are not libpq connection parameters
+DJANGO_ONLY_OPTIONS = ('pool', 'isolation_level', 'server_side_binding', 'assume_role', 'cursor_factory')
+
+
+def _conninfo(using: str) -> str:
+    """
+    Build a libpq connection string from the Django settings of a database,
+    including its OPTIONS, such as sslmode or the connect_timeout of replicas.
+    """
+    database = settings.DATABASES[using]
+    params = {
+        key: value for key, value in database.get('OPTIONS', {}).items()
+        if key not in DJANGO_ONLY_OPTIONS
+    }
+    # Match the session time zone of Django's own connections
+    params['options'] = ' '.join(filter(None, [params.get('options'), '-c TimeZone=UTC']))
+    params.update({
+        'dbname': database['NAME'],
+        'user': database.get('USER') or None,
+        'password': database.get('PASSWORD') or None,
+        'host': database.get('HOST') or None,
+        'port': database.get('PORT') or None,
+    })
+    return make_conninfo(**{key: value for key, value in params.items() if value is not None})
+
+
+def _get_pool(using: str = 'ais_data'):
+    """
+    Return the connection pool of a database, creating it on first use.
+
+    The pool belongs to the loop that created it. Under the ASGI server that is
+    the one loop of the worker process; other loops, such as the short-lived
+    ones used to run async views under WSGI, get None.
+    """
+    if AsyncConnectionPool is None or connections[using].vendor != 'postgresql':
+        return None
+
+    loop = asyncio.get_running_loop()
+    with _pool_lock:
+        if using not in _pools:
+            pool = AsyncConnectionPool(
+                _conninfo(using),
+                kwargs={'autocommit': True},
+                min_size=settings.ASYNC_AIS_POOL_MIN_SIZE,
+                max_size=settings.ASYNC_AIS_POOL_MAX_SIZE,
+                timeout=settings.ASYNC_AIS_POOL_TIMEOUT,
+                name=f'{using}-async',
+                open=False,
+            )
+            _pools[using] = (pool, loop)
+            logger.info(
+                f"Created async {using} connection pool "
+                f"({settings.ASYNC_AIS_POOL_MIN_SIZE}-{settings.ASYNC_AIS_POOL_MAX_SIZE} connections)"
+            )
+        pool, pool_loop = _pools[using]
+        return pool if pool_loop is loop else None
+
+
+def _fetch_all_sync(query: str, params, using: str) -> List[tuple]:
+    with connections[using].cursor() as cursor:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+
+async def fetch_all(query: str, params=None, using: str = 'ais_data') -> List[tuple]:
+    """
+    Run a read-only query and return all of its rows.
+
+    Without psycopg 3, on databases other than PostgreSQL and outside the
+    pool's event loop, the query runs on a Django connection in a thread.
+
+    Args:
+        query: SQL query with %s placeholders
+        params: Query parameters
+        using: Database alias
+
+    Returns:
+        List of row tuples
+    """
+    pool = _get_pool(using)
+    if pool is None:
+        return await sync_to_async(_fetch_all_sync)(query, params, using)
+
+    # Opening an open pool returns immediately
+    await pool.open()
+    async with pool.connection() as connection:
+        async with connection.cursor() as cursor:
+            await cursor.execute(query, params)
+            return await cursor.fetchall()
+
+
+def pool_available(using: str = 'ais_data') -> bool:
+    """
+    Check whether queries on a database run on the connection pool of the
+    running event loop, rather than on a Django connection in a thread.
+    """
+    return _get_pool(using) is not None
+
+
+async def iter_server_side_rows(query: str, params, using: str = 'ais_data',
+                                chunk_size: int = STREAM_CHUNK_ROWS) -> AsyncIterator[tuple]:
+    """
+    Yield the rows of a read-only query, fetched through a named server-side cursor.
+
+    Async variant of streaming.iter_server_side_rows: the pooled connection is
+    held, in a transaction, for as long as the generator is being consumed.
+    Without the pool the rows are read in full in a thread, so callers that
+    stream check pool_available first.
+
+    Args:
+        query: SQL query with %s placeholders
+        params: Query parameters
+        using: Database alias
+        chunk_size: Number of rows fetched per round trip
+    """
+    pool = _get_pool(using)
+    if pool is None:
+        for row in await sync_to_async(_fetch_all_sync)(query, params, using):
+            yield row
+        return
+
+    await pool.open()
+    async with pool.connection() as connection:
+        # Named cursors only live inside a transaction
+        async with connection.transaction():
+            async with connection.cursor(name='async_stream') as cursor:
+                await cursor.execute(query, params)
+                while True:
+                    rows = await cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield row
+
+
+async def close_pool() -> None:
+    """
+    Close the connection pools created on the running event loop. Called on
+    the lifespan shutdown of the ASGI server.
+    """
+    loop = asyncio.get_running_loop()
+    with _pool_lock:
+        pools = []
+        for using, (pool, pool_loop) in list(_pools.items()):
+            if pool_loop is loop:
+                pools.append(pool)
+                del _pools[using]
+
+    for pool in pools:
+        await pool.close()
@@ -0,0 +1,181 @@
+"""
+Columnar encoding utilities for the position endpoints.
+Converts lists of position objects into parallel arrays, so keys are no longer
+repeated for every point. Binary encodings pack numeric columns into
+little-endian typed arrays that clients can view as Float32Array/Uint32Array.
+"""
+
+import math
+import sys
+from array import array
+from typing import Dict, Iterable, List
+
+# Typed array codes: 4 byte float and 4 byte unsigned integer
+FLOAT32 = 'f'
+UINT32 = 'I'
+
+# Epoch seconds of missing timestamps in binary output, which has no null
+MISSING_EPOCH_SECONDS = 0
+
+# Decimal places kept for coordinates in JSON, about the precision of a float32
+JSON_COORDINATE_DECIMALS = 5
+
+LAYOUT_COLUMNAR = 'columnar'
+
+
+class ColumnEncoder:
+    """
+    Encodes value columns either as JSON arrays or as packed typed arrays.
+    """
+
+    def __init__(self, binary: bool):
+        self.binary = binary
+
+    def floats(self, values: Iterable) -> object:
+        """
+        Encode a float32 column. Missing values become NaN in binary output.
+        """
+        if self.binary:
+            column = array(FLOAT32, (math.nan if value is None else value for value in values))
+            return self._pack(column)
+        return [None if value is None else round(value, JSON_COORDINATE_DECIMALS) for value in values]
+
+    def uints(self, values: Iterable) -> object:
+        """
+        Encode a uint32 column, used for indexes and epoch seconds.
+        """
+        if self.binary:
+            return self._pack(array(UINT32, values))
+        return list(values)
+
+    def epoch_seconds(self, values: Iterable) -> object:
+        """
+        Encode a column of datetimes as epoch seconds. Missing values become
+        MISSING_EPOCH_SECONDS in binary output.
+        """
+        missing = MISSING_EPOCH_SECONDS if self.binary else None
+        return self.uints(missing if value is None else int(value.timestamp()) for value in values)
+
+    @staticmethod
+    def _pack(column: array) -> bytes:
+        if sys.byteorder != 'little':
+            column.byteswap()
+        return column.tobytes()
+
+
+class ImoIndex:
+    """
+    Assigns every IMO number a small integer index, in order of appearance.
+    """
+
+    def __init__(self):
+        self.index = {}
+        self.imo_numbers = []
+
+    def __call__(self, imo_number) -> int:
+        position = self.index.get(imo_number)
+        if position is None:
+            position = len(self.imo_numbers)
+            self.index[imo_number] = position
+            self.imo_numbers.append(imo_number)
+        return position
+
+
+def columnar_time_groups(time_groups: List[Dict], binary: bool) -> Dict:
+    """
+    Convert past scrubber distribution time groups into the columnar layout.
+
+    Positions of every group become parallel imo_index, latitude and longitude
+    columns (and position_count for rollup data), where imo_index points into
+    the shared imo_numbers list.
+
+    Args:
+        time_groups: Time groups in the regular response format
+        binary: Pack numeric columns into typed arrays
+
+    Returns:
+        Dictionary with imo_numbers and the columnar time_groups
+    """
+    encoder = ColumnEncoder(binary)
+    imo_index = ImoIndex()
+    groups = []
+
+    for group in time_groups:
+        positions = group['positions']
+        columnar_group = {
+            'interval_start': group['interval_start'],
+            'interval_end': group['interval_end'],
+            'vessel_count': group.get('vessel_count'),
+            'imo_index': encoder.uints(imo_index(position['imo_number']) for position in positions),
+            'latitude': encoder.floats(position['latitude'] for position in positions),
+            'longitude': encoder.floats(position['longitude'] for position in positions),
+        }
+        if positions and 'position_count' in positions[0]:
+            columnar_group['position_count'] = encoder.uints(
+                position['position_count'] for position in positions
+            )
+        groups.append(columnar_group)
+
+    return {
+        'layout': LAYOUT_COLUMNAR,
+        'imo_numbers': imo_index.imo_numbers,
+        'time_groups': groups,
+    }
+
+
+def columnar_ship_path(rows: List[tuple], imo_number, binary: bool) -> Dict:
+    """
+    Convert ship path query rows into the columnar layout.
+
+    Args:
+        rows: Rows of the ship path query ordered by timestamp
+        imo_number: IMO number of the ship
+        binary: Pack numeric columns into typed arrays
+    """
+    encoder = ColumnEncoder(binary)
+    return {
+        'layout': LAYOUT_COLUMNAR,
+        'imo_number': imo_number,
+        'count': len(rows),
+        'timestamp': encoder.epoch_seconds(row[1] for row in rows),
+        'latitude': encoder.floats(row[2] for row in rows),
+        'longitude': encoder.floats(row[3] for row in rows),
+        'destination': [row[4] for row in rows],
+        'navigational_status_code': [row[5] for row in rows],
+        'navigational_status': [row[6] for row in rows],
+        'true_heading': encoder.floats(row[7] for row in rows),
+        'rate_of_turn': encoder.floats(row[8] for row in rows),
+        'cog': encoder.floats(row[9] for row in rows),
+        'sog': encoder.floats(row[10] for row in rows),
+    }
+
+
+def columnar_active_ships(ships: List[Dict], binary: bool) -> Dict:
+    """
+    Convert the active ships snapshot into the columnar layout.
+
+    Ship attributes and the latest position fields become one column each,
+    with the position timestamp as epoch seconds.
+    """
+    encoder = ColumnEncoder(binary)
+    positions = [ship['latest_position'] for ship in ships]
+
+    columns = {
+        'layout': LAYOUT_COLUMNAR,
+        'count': len(ships),
+    }
+    for field in ['imo_number', 'mmsi', 'name', 'ship_type', 'type_name', 'type_remark']:
+        columns[field] = [ship[field] for ship in ships]
+    for field in ['length', 'width', 'max_draught', 'emission_berth', 'emission_anchor',
+                  'emission_maneuver', 'emission_cruise']:
+        columns[field] = encoder.floats(ship[field] for ship in ships)
+
+    columns['timestamp'] = encoder.epoch_seconds(position['timestamp_ais'] for position in positions)
+    columns['latitude'] = encoder.floats(position['latitude'] for position in positions)
+    columns['longitude'] = encoder.floats(position['longitude'] for position in positions)
+    for field in ['destination', 'navigational_status_code', 'navigational_status']:
+        columns[field] = [position[field] for position in positions]
+    for field in ['true_heading', 'rate_of_turn', 'cog', 'sog']:
+        columns[field] = encoder.floats(position[field] for position in positions)
+
+    return columns
@@ -0,0 +1,177 @@
+"""
+Dataset metadata utilities.
+Maintains per-day row and vessel counts of ship_data in the ais_data database
+and serves the resulting dataset bounds from the cache, so endpoints no longer
+scan ship_data for its earliest record on every request.
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DAILY_STATS_TABLE = 'ship_data_daily_stats'
+
+METADATA_CACHE_KEY = 'dataset_metadata:ship_data'
+
+
+def ensure_tables(cursor) -> None:
+    """
+    Create the daily stats table if it does not exist yet.
+
+    The earliest and latest columns copy the timestamp type of ship_data.
+    """
+    cursor.execute("SELECT to_regclass(%s)", [DAILY_STATS_TABLE])
+    if cursor.fetchone()[0] is not None:
+        return
+
+    logger.info(f"Creating {DAILY_STATS_TABLE} table")
+    cursor.execute(f"""
+        CREATE TABLE {DAILY_STATS_TABLE} AS
+        SELECT timestamp_ais::date AS day,
+               0::bigint AS row_count,
+               0::integer AS vessel_count,
+               timestamp_ais AS earliest,
+               timestamp_ais AS latest,
+               now() AS refreshed_at
+        FROM ship_data
+        WITH NO DATA
+    """)
+    cursor.execute(f"ALTER TABLE {DAILY_STATS_TABLE} ADD PRIMARY KEY (day)")
+
+
+def _as_day(value) -> Optional[date]:
+    if value is None or (isinstance(value, date) and not isinstance(value, datetime)):
+        return value
+    return value.date()
+
+
+def _aware(value):
+    if value is not None and timezone.is_naive(value):
+        return timezone.make_aware(value)
+    return value
+
+
+def _load_metadata(cursor) -> Optional[Dict]:
+    """
+    Build the dataset metadata from the daily stats table.
+
+    Returns:
+        Dictionary with the earliest and latest record, total row count and
+        per-day counts, or None if the table holds no days
+    """
+    cursor.execute(f"""
+        SELECT day, row_count, vessel_count, earliest, latest, refreshed_at
+        FROM {DAILY_STATS_TABLE}
+        ORDER BY day
+    """)
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+
+    return {
+        'earliest_record': _aware(min(row[3] for row in rows)),
+        'latest_record': _aware(max(row[4] for row in rows)),
+        'row_count': sum(row[1] for row in rows),
+        'day_count': len(rows),
+        'refreshed_at': max(row[5] for row in rows),
+        'days': [
+            {
+                'date': row[0].isoformat(),
+                'row_count': row[1],
+                'vessel_count': row[2],
+            }
+            for row in rows
+        ],
+    }
+
+
+def refresh_dataset_metadata(since=None, until=None) -> Optional[Dict]:
+    """
+    Recompute the daily stats of ship_data and update the cached metadata.
+
+    Days before the earliest remaining ship_data record are removed, so a
+    purge only needs to recompute the day its cutoff falls on.
+
+    Args:
+        since: Recompute days from the day of this date or datetime (default: all days)
+        until: Recompute days before the day after this date or datetime (default: no limit)
+
+    Returns:
+        The refreshed dataset metadata, or None if ship_data is empty
+    """
+    since_day = _as_day(since)
+    until_day = _as_day(until)
+
+    conditions = ["timestamp_ais IS NOT NULL"]
+    day_conditions = ["TRUE"]
+    params = []
+    if since_day is not None:
+        conditions.append("timestamp_ais >= %s")
+        day_conditions.append("day >= %s")
+        params.append(since_day)
+    if until_day is not None:
+        conditions.append("timestamp_ais < %s")
+        day_conditions.append("day < %s")
+        params.append(until_day + timedelta(days=1))
+
+    with connections['ais_data'].cursor() as cursor:
+        with transaction.atomic(using='ais_data'):
+            ensure_tables(cursor)
+
+            cursor.execute(
+                f"DELETE FROM {DAILY_STATS_TABLE} WHERE {' AND '.join(day_conditions)}",
+                params
+            )
+            cursor.execute(f"""
+                INSERT INTO {DAILY_STATS_TABLE}
+                    (day, row_count, vessel_count, earliest, latest, refreshed_at)
+                SELECT timestamp_ais::date, COUNT(*), COUNT(DISTINCT imo_number),
+                       MIN(timestamp_ais), MAX(timestamp_ais), now()
+                FROM ship_data
+                WHERE {' AND '.join(conditions)}
+                GROUP BY 1
+            """, params)
+            refreshed_days = cursor.rowcount
+
+            cursor.execute(f"""
+                DELETE FROM {DAILY_STATS_TABLE}
+                WHERE day < COALESCE(
+                    (SELECT MIN(timestamp_ais)::date FROM ship_data), 'infinity'::date
+                )
+            """)
+            expired_days = cursor.rowcount
+
+            metadata = _load_metadata(cursor)
+
+    cache.set(METADATA_CACHE_KEY, metadata, settings.DATASET_METADATA_CACHE_SECONDS)
+    logger.info(f"Refreshed {refreshed_days} days of ship_data stats, removed {expired_days} expired days")
+    return metadata
+
+
+def get_dataset_metadata() -> Optional[Dict]:
+    """
+    Return the cached dataset metadata, reading the daily stats table on a cold cache.
+
+    Returns:
+        The dataset metadata, or None if it has not been computed yet
+    """
+    metadata = cache.get(METADATA_CACHE_KEY)
+    if metadata is not None:
+        return metadata
+
+    with connections['ais_data'].cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [DAILY_STATS_TABLE])
+        if cursor.fetchone()[0] is None:
+            return None
+        metadata = _load_metadata(cursor)
+
+    if metadata is not None:
+        cache.set(METADATA_CACHE_KEY, metadata, settings.DATASET_METADATA_CACHE_SECONDS)
+    return metadata
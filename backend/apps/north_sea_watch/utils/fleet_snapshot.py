@@ -0,0 +1,269 @@
+"""
+Current fleet snapshot utilities.
+Keeps a cached copy of the latest position of every active ship so that the
+active ships endpoint can serve concurrent map viewers from memory instead of
+re-running the position query for each of them.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, connections
+from django.utils import timezone
+
+from .columnar import columnar_active_ships
+from .latest_positions import is_populated, refresh_latest_positions
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_CACHE_KEY = 'fleet_snapshot:active_ships'
+REFRESH_LOCK_KEY = 'fleet_snapshot:refresh_lock'
+
+# Indexed lookup over ship_latest_position, kept current by latest_positions
+ACTIVE_SHIPS_QUERY = """
+    SELECT s.imo_number, s.mmsi, s.name, s.ship_type, s.length, s.width,
+           s.max_draught, s.type_name, s.type_remark,
+           s.emission_berth, s.emission_anchor, s.emission_maneuver, s.emission_cruise,
+           lp.timestamp_ais, lp.latitude, lp.longitude, lp.destination,
+           lp.navigational_status_code, lp.navigational_status, lp.true_heading,
+           lp.rate_of_turn, lp.cog, lp.sog
+    FROM ship_latest_position lp
+    JOIN ships s ON s.imo_number = lp.imo_number
+    WHERE lp.timestamp_ais >= %s
+    ORDER BY s.name
+"""
+
+# Derives the latest positions from ship_data directly, used as a fallback
+ACTIVE_SHIPS_FALLBACK_QUERY = """
+    WITH latest_positions AS (
+        SELECT DISTINCT ON (imo_number)
+            imo_number,
+            timestamp_ais,
+            latitude,
+            longitude,
+            destination,
+            navigational_status_code,
+            navigational_status,
+            true_heading,
+            rate_of_turn,
+            cog,
+            sog
+        FROM ship_data
+        WHERE timestamp_ais >= %s
+        ORDER BY imo_number, timestamp_ais DESC
+    )
+    SELECT s.imo_number, s.mmsi, s.name, s.ship_type, s.length, s.width,
+           s.max_draught, s.type_name, s.type_remark,
+           s.emission_berth, s.emission_anchor, s.emission_maneuver, s.emission_cruise,
+           lp.timestamp_ais, lp.latitude, lp.longitude, lp.destination,
+           lp.navigational_status_code, lp.navigational_status, lp.true_heading,
+           lp.rate_of_turn, lp.cog, lp.sog
+    FROM ships s
+    JOIN latest_positions lp ON s.imo_number = lp.imo_number
+    ORDER BY s.name
+"""
+
+# Serialises cold-start refreshes within a process
+_refresh_lock = threading.Lock()
+_refresher_thread = None
+_refresher_lock = threading.Lock()
+
+# Columnar encodings of the current snapshot, keyed by (ETag, binary)
+_columnar_cache = {}
+
+
+def _row_to_ship(row) -> Dict:
+    """
+    Convert a row of ACTIVE_SHIPS_QUERY into the active ships response format.
+    """
+    return {
+        'imo_number': row[0],
+        'mmsi': row[1],
+        'name': row[2],
+        'ship_type': row[3],
+        'length': row[4],
+        'width': row[5],
+        'max_draught': row[6],
+        'type_name': row[7],
+        'type_remark': row[8],
+        'emission_berth': float(row[9]) if row[9] is not None else None,
+        'emission_anchor': float(row[10]) if row[10] is not None else None,
+        'emission_maneuver': float(row[11]) if row[11] is not None else None,
+        'emission_cruise': float(row[12]) if row[12] is not None else None,
+        'latest_position': {
+            'imo_number': row[0],
+            'timestamp_ais': row[13],
+            'latitude': row[14],
+            'longitude': row[15],
+            'destination': row[16],
+            'navigational_status_code': row[17],
+            'navigational_status': row[18],
+            'true_heading': row[19],
+            'rate_of_turn': row[20],
+            'cog': row[21],
+            'sog': row[22]
+        }
+    }
+
+
+def build_active_ships() -> List[Dict]:
+    """
+    Query the latest position of every ship active within the snapshot window.
+
+    The latest position table is brought up to date first, which only scans
+    the ship_data rows ingested since the previous refresh. Until the
+    refresh_latest_positions command has backfilled it, which can take long
+    and so never runs on the request path, ship_data is queried directly.
+
+    Returns:
+        List of ship dictionaries ordered by ship name
+    """
+    window_start = timezone.now() - timedelta(hours=settings.FLEET_SNAPSHOT_WINDOW_HOURS)
+
+    query = ACTIVE_SHIPS_FALLBACK_QUERY
+    if settings.FLEET_SNAPSHOT_USE_LATEST_POSITIONS:
+        try:
+            if is_populated():
+                refresh_latest_positions()
+                query = ACTIVE_SHIPS_QUERY
+            else:
+                logger.warning(
+                    "Latest position table not populated yet, querying ship_data directly "
+                    "until the refresh_latest_positions command has run"
+                )
+        except Exception as e:
+            logger.warning(f"Latest position table unavailable, querying ship_data directly: {str(e)}")
+
+    with connections['ais_data'].cursor() as cursor:
+        cursor.execute(query, [window_start])
+        return [_row_to_ship(row) for row in cursor.fetchall()]
+
+
+def refresh_snapshot() -> Dict:
+    """
+    Rebuild the fleet snapshot and store it in the cache.
+
+    The ETag is derived from the snapshot content, and Last-Modified only moves
+    forward when the content actually changed, so clients revalidating an
+    unchanged fleet keep receiving 304 responses.
+
+    Returns:
+        The new snapshot dictionary
+    """
+    started = time.monotonic()
+    ships = build_active_ships()
+
+    body = json.dumps(ships, cls=DjangoJSONEncoder, sort_keys=True)
+    etag = '"%s"' % hashlib.md5(body.encode('utf-8')).hexdigest()
+    now = timezone.now()
+
+    previous = cache.get(SNAPSHOT_CACHE_KEY)
+    if previous and previous['etag'] == etag:
+        last_modified = previous['last_modified']
+    else:
+        last_modified = now
+
+    snapshot = {
+        'ships': ships,
+        'etag': etag,
+        'last_modified': last_modified,
+        'generated_at': now,
+    }
+
+    # Expire stale snapshots if the refresher stops running
+    cache.set(SNAPSHOT_CACHE_KEY, snapshot, timeout=settings.FLEET_SNAPSHOT_REFRESH_SECONDS * 3)
+
+    logger.info(
+        f"Refreshed fleet snapshot with {len(ships)} ships in "
+        f"{(time.monotonic() - started) * 1000:.0f} ms"
+    )
+    return snapshot
+
+
+def get_snapshot() -> Dict:
+    """
+    Return the cached fleet snapshot, building it on a cold cache.
+    """
+    snapshot = cache.get(SNAPSHOT_CACHE_KEY)
+    if snapshot is not None:
+        return snapshot
+
+    with _refresh_lock:
+        # Another thread may have refreshed while we were waiting
+        snapshot = cache.get(SNAPSHOT_CACHE_KEY)
+        if snapshot is None:
+            snapshot = refresh_snapshot()
+    return snapshot
+
+
+def get_columnar_ships(snapshot: Dict, binary: bool) -> Dict:
+    """
+    Return the snapshot ships in the columnar layout, encoding them once per
+    snapshot version and process.
+    """
+    key = (snapshot['etag'], binary)
+    columns = _columnar_cache.get(key)
+    if columns is None:
+        columns = columnar_active_ships(snapshot['ships'], binary)
+        # Only keep encodings of the current snapshot
+        for stale_key in [k for k in list(_columnar_cache) if k[0] != snapshot['etag']]:
+            _columnar_cache.pop(stale_key, None)
+        _columnar_cache[key] = columns
+    return columns
+
+
+def _refresh_loop():
+    """
+    Background loop refreshing the snapshot on a fixed cadence.
+
+    With a shared cache backend the refresh lock makes sure only one worker
+    process runs the query per interval.
+    """
+    interval = settings.FLEET_SNAPSHOT_REFRESH_SECONDS
+
+    while True:
+        # The first snapshot is built by the request that started this thread
+        time.sleep(interval)
+
+        try:
+            close_old_connections()
+            if cache.add(REFRESH_LOCK_KEY, os.getpid(), timeout=max(interval - 1, 1)):
+                refresh_snapshot()
+        except Exception as e:
+            logger.error(f"Error refreshing fleet snapshot: {str(e)}", exc_info=True)
+        finally:
+            close_old_connections()
+
+
+def ensure_refresher_running() -> Optional[threading.Thread]:
+    """
+    Start the background refresh thread for this process if it is not running yet.
+    """
+    global _refresher_thread
+
+    if not settings.FLEET_SNAPSHOT_BACKGROUND_REFRESH:
+        return None
+
+    if _refresher_thread is not None and _refresher_thread.is_alive():
+        return _refresher_thread
+
+    with _refresher_lock:
+        if _refresher_thread is None or not _refresher_thread.is_alive():
+            _refresher_thread = threading.Thread(
+                target=_refresh_loop,
+                name='fleet-snapshot-refresher',
+                daemon=True
+            )
+            _refresher_thread.start()
+            logger.info("Started fleet snapshot refresher thread")
+
+    return _refresher_thread
@@ -0,0 +1,344 @@
+"""
+IP geolocation utilities.
+Looks up the location and network of visitor IP addresses through the
+providers in IP_GEO_PROVIDERS: a local MaxMind or DB-IP MMDB database and
+IP-API. IP-API responses are cached, in the shared cache for all worker
+processes and in a bounded in-process LRU, so returning visitors and
+crawlers do not query IP-API again and trip its rate limit. Failed lookups
+are cached for a shorter time.
+"""
+
+import ipaddress
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import maxminddb
+except ImportError:  # Optional dependency
+    maxminddb = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = 'ip_geo:'
+
+# IP-API response fields by UserTracking field
+IP_API_FIELD_MAP = {
+    'country': 'country',
+    'country_code': 'countryCode',
+    'region': 'region',
+    'region_name': 'regionName',
+    'city': 'city',
+    'zip_code': 'zip',
+    'latitude': 'lat',
+    'longitude': 'lon',
+    'timezone': 'timezone',
+    'isp': 'isp',
+    'org': 'org',
+    'as_number': 'as',
+}
+
+# Most recently used lookups of this process: cache key -> (expiry timestamp, IP-API response).
+# The shared cache holds the same tuples, so both expire at the same time
+_local_cache = OrderedDict()
+_local_cache_lock = threading.Lock()
+
+# Providers built from IP_GEO_PROVIDERS on first use
+_providers = None
+_providers_lock = threading.Lock()
+
+
+def build_api_url(ip_address: str) -> str:
+    """
+    Build the IP-API URL for an address, limited to IP_API_FIELDS when set.
+    """
+    api_url = settings.IP_API_URL.format(ip=ip_address)
+    if getattr(settings, 'IP_API_FIELDS', None):
+        api_url = f"{api_url}?fields={','.join(settings.IP_API_FIELDS)}"
+    return api_url
+
+
+def get_cache_key(ip_address: str) -> str:
+    """
+    Return the cache key of an address.
+
+    With IP_GEO_CACHE_GROUP_BY_PREFIX all addresses of an IPv4 /24 or IPv6 /48
+    network share one entry, as they almost always share a location and ISP.
+    """
+    key = ip_address
+    if settings.IP_GEO_CACHE_GROUP_BY_PREFIX:
+        try:
+            address = ipaddress.ip_address(ip_address)
+            prefix = 24 if address.version == 4 else 48
+            key = str(ipaddress.ip_network(f"{address}/{prefix}", strict=False))
+        except ValueError:
+            pass
+    return f"{CACHE_KEY_PREFIX}{key}"
+
+
+def _get_local(key: str, now: float) -> Optional[Tuple[float, Dict]]:
+    with _local_cache_lock:
+        entry = _local_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del _local_cache[key]
+            return None
+        _local_cache.move_to_end(key)
+        return entry
+
+
+def _set_local(key: str, entry: Tuple[float, Dict]) -> None:
+    with _local_cache_lock:
+        _local_cache[key] = entry
+        _local_cache.move_to_end(key)
+        while len(_local_cache) > settings.IP_GEO_CACHE_MAX_ENTRIES:
+            _local_cache.popitem(last=False)
+
+
+def get_cached_ip_data(ip_address: str) -> Optional[Dict]:
+    """
+    Return the cached IP-API response of an address without querying IP-API.
+
+    Returns:
+        The cached response, or None if the address is not cached
+    """
+    key = get_cache_key(ip_address)
+    now = time.time()
+    entry = _get_local(key, now)
+    if entry is None:
+        entry = cache.get(key)
+        if entry is None or entry[0] <= now:
+            return None
+        _set_local(key, entry)
+    return entry[1]
+
+
+def fetch_ip_data(ip_address: str) -> Dict:
+    """
+    Query IP-API for an address, bypassing the cache.
+
+    Returns:
+        The IP-API response; on request errors a failure response in the
+        same format, {'status': 'fail', 'message': ...}
+    """
+    try:
+        response = requests.get(build_api_url(ip_address), timeout=5)
+        if response.status_code != 200:
+            logger.warning(f"IP-API request failed with status {response.status_code}")
+            return {'status': 'fail', 'message': f"HTTP {response.status_code}"}
+        return response.json()
+    except requests.RequestException as e:
+        logger.warning(f"IP-API request failed: {str(e)}")
+        return {'status': 'fail', 'message': str(e)}
+    except ValueError as e:
+        logger.warning(f"IP-API returned invalid JSON: {str(e)}")
+        return {'status': 'fail', 'message': "Invalid response"}
+
+
+def get_ip_api_data(ip_address: str) -> Dict:
+    """
+    Return the IP-API response for an address, from the cache when possible.
+
+    Successful lookups are cached for IP_GEO_CACHE_SECONDS and failed ones,
+    including unreachable or rate limited IP-API requests, for
+    IP_GEO_NEGATIVE_CACHE_SECONDS.
+
+    Args:
+        ip_address: IPv4 or IPv6 address
+
+    Returns:
+        The IP-API response, whose 'status' is 'success' for located addresses
+    """
+    ip_data = get_cached_ip_data(ip_address)
+    if ip_data is not None:
+        return ip_data
+
+    ip_data = fetch_ip_data(ip_address)
+    if ip_data.get('status') == 'success':
+        timeout = settings.IP_GEO_CACHE_SECONDS
+    else:
+        timeout = settings.IP_GEO_NEGATIVE_CACHE_SECONDS
+
+    key = get_cache_key(ip_address)
+    entry = (time.time() + timeout, ip_data)
+    cache.set(key, entry, timeout)
+    _set_local(key, entry)
+    return ip_data
+
+
+def mmdb_record_to_ip_data(city: Dict, asn: Optional[Dict] = None) -> Dict:
+    """
+    Convert GeoIP2/GeoLite2 or DB-IP City and ASN database records to the
+    IP-API response format.
+    """
+    def name(record):
+        return (record or {}).get('names', {}).get('en')
+
+    subdivision = (city.get('subdivisions') or [{}])[0]
+    location = city.get('location', {})
+    ip_data = {
+        'status': 'success',
+        'country': name(city.get('country')),
+        'countryCode': city.get('country', {}).get('iso_code'),
+        'region': subdivision.get('iso_code'),
+        'regionName': name(subdivision),
+        'city': name(city.get('city')),
+        'zip': city.get('postal', {}).get('code'),
+        'lat': location.get('latitude'),
+        'lon': location.get('longitude'),
+        'timezone': location.get('time_zone'),
+        'isp': None,
+        'org': None,
+        'as': None,
+    }
+    if asn:
+        organization = asn.get('autonomous_system_organization')
+        ip_data['isp'] = organization
+        ip_data['org'] = organization
+        ip_data['as'] = f"AS{asn.get('autonomous_system_number')} {organization}"
+    return ip_data
+
+
+class GeolocationProvider:
+    """
+    Source of IP geolocation data.
+
+    Providers return data in the IP-API response format, so they all fill the
+    same UserTracking fields.
+    """
+    name = None
+
+    def lookup(self, ip_address: str) -> Optional[Dict]:
+        """
+        Look up an address.
+
+        Returns:
+            Data in the IP-API response format, or None if the provider has
+            no data for the address and the next provider should be asked
+        """
+        raise NotImplementedError
+
+
+class IPAPIProvider(GeolocationProvider):
+    """
+    Remote IP-API lookups, through the IP geolocation cache.
+    """
+    name = 'ip-api'
+
+    def lookup(self, ip_address: str) -> Optional[Dict]:
+        return get_ip_api_data(ip_address)
+
+
+class MMDBProvider(GeolocationProvider):
+    """
+    Local MaxMind GeoLite2/GeoIP2 or DB-IP database, memory mapped.
+
+    Reads the City database at IP_GEO_MMDB_CITY_PATH and, for the ISP and AS
+    fields, the ASN database at IP_GEO_MMDB_ASN_PATH when set. Lookups take
+    microseconds and need no network.
+    """
+    name = 'mmdb'
+
+    def __init__(self):
+        if maxminddb is None:
+            raise ImproperlyConfigured("The mmdb geolocation provider requires the maxminddb package.")
+        if not settings.IP_GEO_MMDB_CITY_PATH:
+            raise ImproperlyConfigured("The mmdb geolocation provider requires IP_GEO_MMDB_CITY_PATH.")
+
+        self.city_reader = maxminddb.open_database(settings.IP_GEO_MMDB_CITY_PATH, maxminddb.MODE_MMAP)
+        self.asn_reader = None
+        if settings.IP_GEO_MMDB_ASN_PATH:
+            self.asn_reader = maxminddb.open_database(settings.IP_GEO_MMDB_ASN_PATH, maxminddb.MODE_MMAP)
+
+    def lookup(self, ip_address: str) -> Optional[Dict]:
+        try:
+            city = self.city_reader.get(ip_address)
+            asn = self.asn_reader.get(ip_address) if self.asn_reader else None
+        except ValueError:
+            # Not an IP address
+            return None
+        if not city:
+            return None
+        return mmdb_record_to_ip_data(city, asn)
+
+
+PROVIDER_CLASSES = {
+    IPAPIProvider.name: IPAPIProvider,
+    MMDBProvider.name: MMDBProvider,
+}
+
+
+def get_providers() -> List[GeolocationProvider]:
+    """
+    Return the configured providers in IP_GEO_PROVIDERS order, creating them on first use.
+
+    Providers that are unknown or cannot be set up are logged and skipped,
+    so tracking falls back to the remaining ones.
+    """
+    global _providers
+
+    if _providers is not None:
+        return _providers
+
+    with _providers_lock:
+        if _providers is None:
+            providers = []
+            for provider_name in settings.IP_GEO_PROVIDERS:
+                try:
+                    if provider_name not in PROVIDER_CLASSES:
+                        raise ImproperlyConfigured(f"Unknown geolocation provider {provider_name}.")
+                    providers.append(PROVIDER_CLASSES[provider_name]())
+                except Exception as e:
+                    logger.error(f"Geolocation provider {provider_name} unavailable: {str(e)}")
+            logger.info(f"IP geolocation providers: {[provider.name for provider in providers]}")
+            _providers = providers
+    return _providers
+
+
+def get_ip_data(ip_address: str) -> Dict:
+    """
+    Look up an address with the configured providers, in order, until one locates it.
+
+    Args:
+        ip_address: IPv4 or IPv6 address
+
+    Returns:
+        Data in the IP-API response format, whose 'status' is 'success' for
+        located addresses, with the name of the answering 'provider'
+    """
+    ip_data = None
+    for provider in get_providers():
+        try:
+            ip_data = provider.lookup(ip_address)
+        except Exception as e:
+            logger.warning(f"Geolocation provider {provider.name} failed for {ip_address}: {str(e)}")
+            continue
+        if ip_data is not None and ip_data.get('status') == 'success':
+            return dict(ip_data, provider=provider.name)
+
+    if ip_data is None:
+        return {'status': 'fail', 'message': "No geolocation provider located the address"}
+    return ip_data
+
+
+def to_tracking_fields(ip_data: Dict) -> Dict:
+    """
+    Map a successful IP-API response to UserTracking geolocation fields.
+    """
+    return {field: ip_data.get(api_field) for field, api_field in IP_API_FIELD_MAP.items()}
+
+
+def clear_local_cache() -> None:
+    """
+    Empty the in-process cache of this worker process.
+    """
+    with _local_cache_lock:
+        _local_cache.clear()
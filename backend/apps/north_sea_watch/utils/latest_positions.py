@@ -0,0 +1,260 @@
+"""
+Latest position per vessel utilities.
+Maintains the ship_latest_position table in the ais_data database, which holds
+the most recent AIS fix of every ship and is refreshed incrementally from a
+high-water mark on ship_data.id instead of re-sorting ship_data on every request.
+
+Ids are assigned before commit, so an ingest transaction may commit rows below
+ids that were already processed. Each refresh therefore records the oldest
+transaction still running (pg_snapshot_xmin), and the next refresh re-reads the
+rows above the safe mark that were committed by transactions from then on. The
+safe mark only moves up once every writer of the rows below it has finished.
+"""
+
+import logging
+from typing import Dict, Optional
+
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+LATEST_POSITION_TABLE = 'ship_latest_position'
+LATEST_POSITION_STATE_TABLE = 'ship_latest_position_state'
+
+# Maximum number of ship_data ids processed per refresh batch
+DEFAULT_BATCH_SIZE = 500000
+
+POSITION_COLUMNS = [
+    'timestamp_ais',
+    'latitude',
+    'longitude',
+    'destination',
+    'navigational_status_code',
+    'navigational_status',
+    'true_heading',
+    'rate_of_turn',
+    'cog',
+    'sog',
+]
+
+
+def ensure_tables(cursor) -> None:
+    """
+    Create the latest position and state tables if they do not exist yet.
+
+    The latest position table copies its column types from ship_data so the
+    existing joins against ships keep working unchanged.
+    """
+    cursor.execute("SELECT to_regclass(%s)", [LATEST_POSITION_TABLE])
+    if cursor.fetchone()[0] is None:
+        logger.info(f"Creating {LATEST_POSITION_TABLE} table")
+        cursor.execute(f"""
+            CREATE TABLE {LATEST_POSITION_TABLE} AS
+            SELECT imo_number, id AS source_id, {', '.join(POSITION_COLUMNS)}
+            FROM ship_data
+            WITH NO DATA
+        """)
+        cursor.execute(f"ALTER TABLE {LATEST_POSITION_TABLE} ADD PRIMARY KEY (imo_number)")
+        cursor.execute(f"""
+            CREATE INDEX {LATEST_POSITION_TABLE}_timestamp_idx
+            ON {LATEST_POSITION_TABLE} (timestamp_ais)
+        """)
+
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {LATEST_POSITION_STATE_TABLE} (
+            id smallint PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+            last_ship_data_id bigint NOT NULL DEFAULT 0,
+            refreshed_at timestamptz
+        )
+    """)
+    # Tracking columns of the transaction-aware high-water mark
+    cursor.execute(f"""
+        ALTER TABLE {LATEST_POSITION_STATE_TABLE}
+        ADD COLUMN IF NOT EXISTS pending_ship_data_id bigint NOT NULL DEFAULT 0,
+        ADD COLUMN IF NOT EXISTS pending_xmax bigint,
+        ADD COLUMN IF NOT EXISTS reread_xmin bigint
+    """)
+    cursor.execute(f"""
+        INSERT INTO {LATEST_POSITION_STATE_TABLE} (id, last_ship_data_id)
+        VALUES (1, 0)
+        ON CONFLICT (id) DO NOTHING
+    """)
+
+
+def _batches(lower: int, upper: int, batch_size: int):
+    """
+    Split the id range (lower, upper] into ranges of at most batch_size ids.
+    """
+    while lower < upper:
+        yield lower, min(lower + batch_size, upper)
+        lower += batch_size
+
+
+def _upsert_positions(cursor, lower: int, upper: int, since_xid: Optional[int] = None) -> int:
+    """
+    Upsert the latest position per ship among the ship_data rows with ids in
+    (lower, upper], only taking rows written by transaction since_xid or later
+    when given.
+
+    Returns:
+        Number of ships upserted
+    """
+    update_columns = ['source_id'] + POSITION_COLUMNS
+    set_clause = ', '.join(f"{column} = EXCLUDED.{column}" for column in update_columns)
+    params = [lower, upper]
+
+    xid_filter = ''
+    if since_xid is not None:
+        # age() compares the 32-bit xmin of each row modulo wraparound
+        xid_filter = "AND age(xmin) <= age(xid(%s::text::xid8))"
+        params.append(since_xid)
+
+    cursor.execute(f"""
+        INSERT INTO {LATEST_POSITION_TABLE} (imo_number, {', '.join(update_columns)})
+        SELECT DISTINCT ON (imo_number)
+            imo_number, id, {', '.join(POSITION_COLUMNS)}
+        FROM ship_data
+        WHERE id > %s AND id <= %s
+        AND imo_number IS NOT NULL
+        AND timestamp_ais IS NOT NULL
+        {xid_filter}
+        ORDER BY imo_number, timestamp_ais DESC, id DESC
+        ON CONFLICT (imo_number) DO UPDATE SET {set_clause}
+        WHERE EXCLUDED.timestamp_ais >= {LATEST_POSITION_TABLE}.timestamp_ais
+    """, params)
+    return cursor.rowcount
+
+
+def refresh_latest_positions(batch_size: int = DEFAULT_BATCH_SIZE) -> Dict:
+    """
+    Upsert the latest position of every ship from ship_data rows added since the
+    last refresh.
+
+    Every batch commits on its own, so the first refresh backfilling the whole
+    of ship_data neither holds one long transaction nor loses its progress when
+    interrupted. A session advisory lock is held for the duration of the
+    refresh, so concurrent callers (several worker processes, cron) are
+    serialised.
+
+    Args:
+        batch_size: Maximum number of ship_data ids scanned per batch
+
+    Returns:
+        Dictionary with the number of batches, ships upserted and the new high-water mark
+    """
+    stats = {'batches': 0, 'ships_upserted': 0, 'high_water_mark': 0}
+
+    with connections['ais_data'].cursor() as cursor:
+        # Serialise refreshers, including the first one creating the tables
+        cursor.execute("SELECT pg_advisory_lock(hashtext(%s))", [LATEST_POSITION_TABLE])
+        try:
+            with transaction.atomic(using='ais_data'):
+                ensure_tables(cursor)
+
+            cursor.execute(f"""
+                SELECT last_ship_data_id, pending_ship_data_id, pending_xmax, reread_xmin
+                FROM {LATEST_POSITION_STATE_TABLE} WHERE id = 1
+            """)
+            safe_id, pending_id, pending_xmax, reread_xmin = cursor.fetchone()
+
+            # Read from one snapshot: every row up to max_id written by a
+            # transaction older than snapshot_xmin is visible from now on
+            cursor.execute("""
+                SELECT COALESCE(MAX(id), 0), pg_snapshot_xmin(pg_current_snapshot())::text::bigint
+                FROM ship_data
+            """)
+            max_id, snapshot_xmin = cursor.fetchone()
+
+            # Rows below the pending mark committed since the previous refresh read them
+            for lower, upper in _batches(safe_id, min(pending_id, max_id), batch_size):
+                with transaction.atomic(using='ais_data'):
+                    stats['ships_upserted'] += _upsert_positions(cursor, lower, upper, reread_xmin)
+                stats['batches'] += 1
+
+            # Writers of the ids up to the pending mark had their transaction ids by the
+            # time pending_xmax was taken, so once they all finished no more rows can appear
+            if pending_xmax is not None and snapshot_xmin >= pending_xmax:
+                safe_id = max(safe_id, pending_id)
+            with transaction.atomic(using='ais_data'):
+                cursor.execute(f"""
+                    UPDATE {LATEST_POSITION_STATE_TABLE}
+                    SET last_ship_data_id = %s, reread_xmin = %s
+                    WHERE id = 1
+                """, [safe_id, snapshot_xmin])
+
+            for lower, upper in _batches(max(safe_id, pending_id), max_id, batch_size):
+                with transaction.atomic(using='ais_data'):
+                    stats['ships_upserted'] += _upsert_positions(cursor, lower, upper)
+                    cursor.execute(f"""
+                        UPDATE {LATEST_POSITION_STATE_TABLE}
+                        SET pending_ship_data_id = %s,
+                            pending_xmax = pg_snapshot_xmax(pg_current_snapshot())::text::bigint
+                        WHERE id = 1
+                    """, [upper])
+                stats['batches'] += 1
+
+            with transaction.atomic(using='ais_data'):
+                cursor.execute(f"UPDATE {LATEST_POSITION_STATE_TABLE} SET refreshed_at = now() WHERE id = 1")
+        finally:
+            cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", [LATEST_POSITION_TABLE])
+
+    stats['high_water_mark'] = max(max_id, pending_id)
+    logger.info(
+        f"Refreshed latest positions: {stats['ships_upserted']} ships upserted "
+        f"in {stats['batches']} batches, high-water mark {stats['high_water_mark']} "
+        f"(safe up to {safe_id})"
+    )
+    return stats
+
+
+def is_populated() -> bool:
+    """
+    Check whether a refresh has completed since the table was created or reset,
+    so the table holds the latest position of every ship.
+    """
+    with connections['ais_data'].cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [LATEST_POSITION_STATE_TABLE])
+        if cursor.fetchone()[0] is None:
+            return False
+        cursor.execute(f"SELECT refreshed_at IS NOT NULL FROM {LATEST_POSITION_STATE_TABLE} WHERE id = 1")
+        row = cursor.fetchone()
+        return bool(row and row[0])
+
+
+def reset_latest_positions() -> None:
+    """
+    Empty the latest position table and reset the high-water mark, so the next
+    refresh rebuilds it from the whole of ship_data.
+    """
+    with transaction.atomic(using='ais_data'):
+        with connections['ais_data'].cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [LATEST_POSITION_TABLE])
+            ensure_tables(cursor)
+            cursor.execute(f"TRUNCATE {LATEST_POSITION_TABLE}")
+            cursor.execute(f"""
+                UPDATE {LATEST_POSITION_STATE_TABLE}
+                SET last_ship_data_id = 0, pending_ship_data_id = 0, pending_xmax = NULL,
+                    reread_xmin = NULL, refreshed_at = NULL
+                WHERE id = 1
+            """)
+
+
+def prune_latest_positions(cutoff_date) -> int:
+    """
+    Remove ships whose latest position is older than the given cutoff.
+
+    Args:
+        cutoff_date: Positions with timestamp_ais before this datetime are removed
+
+    Returns:
+        Number of rows deleted
+    """
+    with connections['ais_data'].cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [LATEST_POSITION_TABLE])
+        if cursor.fetchone()[0] is None:
+            return 0
+        cursor.execute(
+            f"DELETE FROM {LATEST_POSITION_TABLE} WHERE timestamp_ais < %s",
+            [cutoff_date]
+        )
+        return cursor.rowcount
@@ -0,0 +1,139 @@
+"""
+ais_data read replica utilities.
+Picks the database alias that read-only AIS queries should use: one of the
+configured replicas, round robin, as long as its replication lag is within
+AIS_DATA_REPLICA_MAX_LAG_SECONDS, and the ais_data primary otherwise.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY_ALIAS = 'ais_data'
+
+# Seconds the replica is behind the primary; zero when it has replayed all WAL it
+# received, so an idle primary does not make a caught up replica look lagged. A
+# replica whose WAL receiver is not streaming has also replayed all it received,
+# however far behind that is, so it reports NULL instead
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+_lag_lock = threading.Lock()
+# Last measured lag per replica alias, None when the replica was unreachable
+_lag_state = {}
+_round_robin = itertools.count()
+
+
+def measure_lag(alias: str) -> Optional[float]:
+    """
+    Query the replication lag of a replica.
+
+    Returns:
+        Lag in seconds, or None if the replica could not be queried or is not
+        streaming from the primary
+    """
+    connection = connections[alias]
+    try:
+        if connection.vendor != 'postgresql':
+            return 0.0
+        with connection.cursor() as cursor:
+            cursor.execute(REPLICA_LAG_QUERY)
+            lag = cursor.fetchone()[0]
+        if lag is None:
+            logger.warning(f"Read replica {alias} is not streaming from the primary")
+            return None
+        return float(lag)
+    except Exception as e:
+        logger.warning(f"Read replica {alias} unavailable: {str(e)}")
+        # Reconnect on the next check instead of reusing a broken connection
+        connection.close()
+        return None
+
+
+def _within_limit(lag: Optional[float]) -> bool:
+    return lag is not None and lag <= settings.AIS_DATA_REPLICA_MAX_LAG_SECONDS
+
+
+def _get_lag(alias: str, now: float) -> Optional[float]:
+    """
+    Return the lag of a replica, measuring it at most once every
+    AIS_DATA_REPLICA_LAG_CHECK_SECONDS per process.
+
+    A single thread measures the lag; the other threads use the previous lag
+    meanwhile, or leave a replica that was never measured out of the rotation.
+    """
+    with _lag_lock:
+        previous = _lag_state.get(alias)
+        if previous is not None and now - previous['checked_at'] < settings.AIS_DATA_REPLICA_LAG_CHECK_SECONDS:
+            return previous['lag']
+        # Claim this check window before measuring, so a replica that stops
+        # answering blocks only the measuring thread
+        _lag_state[alias] = {'lag': previous['lag'] if previous else None, 'checked_at': now}
+
+    lag = measure_lag(alias)
+    with _lag_lock:
+        _lag_state[alias] = {'lag': lag, 'checked_at': now}
+
+    # Log only when the replica enters or leaves the rotation
+    was_healthy = previous is None or _within_limit(previous['lag'])
+    if _within_limit(lag) and not was_healthy:
+        logger.info(f"Read replica {alias} is back within the lag limit")
+    elif not _within_limit(lag) and was_healthy:
+        logger.warning(f"Read replica {alias} taken out of rotation, lag: {lag}")
+    return lag
+
+
+def get_healthy_replicas() -> List[str]:
+    """
+    Return the aliases of the replicas whose lag is within the limit.
+    """
+    now = time.monotonic()
+    return [alias for alias in settings.AIS_DATA_REPLICAS if _within_limit(_get_lag(alias, now))]
+
+
+def get_read_alias() -> str:
+    """
+    Return the database alias for a read-only ais_data query.
+
+    Used by AisDataRouter for the AIS models and by the raw SQL views, so
+    both follow the same routing. Queries that must see their own writes
+    should keep using the ais_data primary.
+
+    Returns:
+        A healthy replica alias, or 'ais_data' when none is configured or healthy
+    """
+    if not settings.AIS_DATA_REPLICAS:
+        return PRIMARY_ALIAS
+
+    replicas = get_healthy_replicas()
+    if not replicas:
+        return PRIMARY_ALIAS
+    return replicas[next(_round_robin) % len(replicas)]
+
+
+def get_replica_status() -> Dict[str, Dict]:
+    """
+    Describe the last measured lag of every configured replica.
+    """
+    get_healthy_replicas()
+    with _lag_lock:
+        return {
+            alias: {
+                'lag_seconds': _lag_state[alias]['lag'],
+                'healthy': _within_limit(_lag_state[alias]['lag']),
+            }
+            for alias in settings.AIS_DATA_REPLICAS if alias in _lag_state
+        }
@@ -0,0 +1,176 @@
+"""
+Response cache utilities for the reference data endpoints.
+Keeps rendered responses of the ports, port contents and ICCT endpoints in the
+shared cache, keyed by endpoint, query parameters and a version per group of
+endpoints, and answers conditional requests with 304 through their ETag.
+A group version changes when its PortContent rows are saved, when a table
+it reads is reloaded, or when invalidate is called.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from functools import wraps
+from typing import Iterable, Optional
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+from apps.north_sea_watch.models import ICCTScrubberMarch2025, ICCTWFRCombined, Port
+from apps.north_sea_watch.utils.scrubber_vessels import get_table_fingerprint
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = 'response_cache:'
+
+PORTS = 'ports'
+PORT_CONTENTS = 'port_contents'
+ICCT_SCRUBBERS = 'icct_scrubbers'
+ICCT_ENGINES = 'icct_engines'
+
+GROUPS = (PORTS, PORT_CONTENTS, ICCT_SCRUBBERS, ICCT_ENGINES)
+
+# ais_data tables of the groups, loaded outside Django, whose fingerprints are
+# part of the group version so a reload invalidates the cached responses
+GROUP_TABLES = {
+    PORTS: Port._meta.db_table,
+    ICCT_SCRUBBERS: ICCTScrubberMarch2025._meta.db_table,
+    ICCT_ENGINES: ICCTWFRCombined._meta.db_table,
+}
+
+# Last fingerprint digest of each table in this process: table -> (digest, monotonic check time)
+_table_versions = {}
+_table_versions_lock = threading.Lock()
+
+
+def _version_key(group: str) -> str:
+    return f"{CACHE_KEY_PREFIX}version:{group}"
+
+
+def _get_table_version(table: str) -> str:
+    """
+    Return a digest of the fingerprint of an ais_data table, read again at most
+    every RESPONSE_CACHE_CHECK_SECONDS.
+    """
+    now = time.monotonic()
+    with _table_versions_lock:
+        cached = _table_versions.get(table)
+        if cached and now - cached[1] < settings.RESPONSE_CACHE_CHECK_SECONDS:
+            return cached[0]
+
+    with connections['ais_data'].cursor() as cursor:
+        fingerprint = get_table_fingerprint(cursor, table)
+    digest = hashlib.md5(repr(fingerprint).encode()).hexdigest()[:12]
+
+    with _table_versions_lock:
+        if cached and cached[0] != digest:
+            logger.info(f"Table {table} changed, invalidating its cached responses")
+        _table_versions[table] = (digest, now)
+    return digest
+
+
+def get_version(group: str) -> str:
+    """
+    Return the current version of a group of cached responses.
+
+    The counter of the group lives in the shared cache, so invalidations reach
+    every worker process. A missing counter, never set or evicted, starts from
+    the current time instead of 1, so responses cached under an earlier
+    counter are not served again.
+    """
+    key = _version_key(group)
+    counter = cache.get(key)
+    if counter is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        counter = cache.get(key)
+
+    table = GROUP_TABLES.get(group)
+    if table:
+        return f"{counter}.{_get_table_version(table)}"
+    return str(counter)
+
+
+def invalidate(groups: Optional[Iterable[str]] = None) -> None:
+    """
+    Invalidate the cached responses of groups of endpoints.
+
+    Args:
+        groups: Groups to invalidate, all groups if omitted
+    """
+    for group in groups or GROUPS:
+        key = _version_key(group)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+        if group in GROUP_TABLES:
+            # Read the table fingerprint again, a reload may not have changed it yet
+            with _table_versions_lock:
+                _table_versions.pop(GROUP_TABLES[group], None)
+        logger.info(f"Invalidated cached {group} responses")
+
+
+def get_cache_key(request, group: str) -> str:
+    """
+    Return the cache key of a request: its path, query parameters in any
+    order and Accept header, under the current version of its group.
+    """
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    accept = request.META.get('HTTP_ACCEPT', '')
+    digest = hashlib.md5(f"{request.path}?{query}|{accept}".encode()).hexdigest()
+    return f"{CACHE_KEY_PREFIX}{group}:{get_version(group)}:{digest}"
+
+
+def _finalize(request, response, etag: str):
+    response['ETag'] = etag
+    # Browsers and the nginx front reuse the response for a short while, then revalidate it
+    response['Cache-Control'] = f"public, max-age={settings.RESPONSE_CACHE_MAX_AGE}"
+    patch_vary_headers(response, ('Accept',))
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def cached_response(group: str):
+    """
+    Decorate a view to serve its GET responses from the response cache.
+
+    Only successful responses are cached, and not the HTML of the browsable
+    API, which differs per user.
+
+    Args:
+        group: Group of the endpoint, selecting the version that invalidates it
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not settings.RESPONSE_CACHE_ENABLED or request.method != 'GET':
+                return view(request, *args, **kwargs)
+
+            key = get_cache_key(request, group)
+            entry = cache.get(key)
+            if entry is not None:
+                response = HttpResponse(entry['content'], content_type=entry['content_type'])
+                return _finalize(request, response, entry['etag'])
+
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            # DRF responses are rendered lazily, the content is needed now
+            if hasattr(response, 'render'):
+                response.render()
+            if (getattr(response, 'accepted_media_type', None) or '').startswith('text/html'):
+                return response
+
+            entry = {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': f'"{hashlib.md5(response.content).hexdigest()}"',
+            }
+            cache.set(key, entry, settings.RESPONSE_CACHE_SECONDS)
+            return _finalize(request, response, entry['etag'])
+        return wrapper
+    return decorator
@@ -0,0 +1,166 @@
+"""
+Past scrubber distribution query utilities.
+Buckets scrubber vessel positions from ship_data by time interval in a single
+pass over the requested range, returning rows already ordered per bucket.
+"""
+
+import logging
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Interval units date_trunc accepts for the distribution buckets
+BUCKET_UNITS = ('hour', 'day', 'week', 'month')
+
+# One scan of the ship_data range, sorted on the computed bucket
+BUCKETED_POSITIONS_QUERY = """
+    SELECT date_trunc(%s, timestamp_ais) AS interval_start,
+           date_trunc(%s, timestamp_ais) + %s::interval AS interval_end,
+           imo_number,
+           latitude,
+           longitude
+    FROM ship_data
+    WHERE timestamp_ais >= %s
+    AND timestamp_ais < %s
+    AND imo_number = ANY(%s)
+    ORDER BY interval_start, imo_number
+"""
+
+
+def build_bucketed_query(interval_unit: str, start_time, end_time, imo_numbers: List[int]) -> Tuple[str, list]:
+    """
+    Build the query returning scrubber vessel positions bucketed by interval.
+
+    Every position in [start_time, end_time) is read once and assigned to its
+    bucket with date_trunc, instead of joining ship_data against a list of
+    generated intervals. Weeks start on Monday, as date_trunc('week') does.
+
+    Args:
+        interval_unit: Bucket size (hour, day, week or month)
+        start_time: Start of the requested range
+        end_time: Exclusive end of the requested range
+        imo_numbers: IMO numbers of the vessels to include
+
+    Returns:
+        Tuple of the SQL query and its parameters. Rows are (interval_start,
+        interval_end, imo_number, latitude, longitude) ordered by interval
+        and IMO number
+    """
+    if interval_unit not in BUCKET_UNITS:
+        raise ValueError(f"interval_unit must be one of {', '.join(BUCKET_UNITS)}")
+
+    params = [
+        interval_unit,
+        interval_unit,
+        f"1 {interval_unit}",
+        start_time,
+        end_time,
+        list(imo_numbers),
+    ]
+    return BUCKETED_POSITIONS_QUERY, params
+
+
+# Aggregates positions per bucket and grid cell. The GROUPING SETS add one row
+# per bucket (with NULL cell indexes, sorted first) carrying the bucket totals
+GRID_QUERY = """
+    SELECT interval_start,
+           interval_start + %s::interval AS interval_end,
+           lat_index,
+           lon_index,
+           COUNT(*) AS position_count,
+           COUNT(DISTINCT imo_number) AS vessel_count
+    FROM (
+        SELECT date_trunc(%s, timestamp_ais) AS interval_start,
+               floor(latitude / %s)::integer AS lat_index,
+               floor(longitude / %s)::integer AS lon_index,
+               imo_number
+        FROM ship_data
+        WHERE timestamp_ais >= %s
+        AND timestamp_ais < %s
+        AND imo_number = ANY(%s)
+        AND latitude IS NOT NULL
+        AND longitude IS NOT NULL
+    ) AS positions
+    GROUP BY GROUPING SETS ((interval_start, lat_index, lon_index), (interval_start))
+    ORDER BY interval_start, lat_index NULLS FIRST, lon_index
+"""
+
+
+def build_grid_query(interval_unit: str, start_time, end_time, imo_numbers: List[int],
+                     resolution: float) -> Tuple[str, list]:
+    """
+    Build the query counting scrubber vessel positions per bucket and grid cell.
+
+    Cell indexes are floor(coordinate / resolution), so the centre of a cell is
+    at (index + 0.5) * resolution degrees.
+
+    Args:
+        interval_unit: Bucket size (hour, day, week or month)
+        start_time: Start of the requested range
+        end_time: Exclusive end of the requested range
+        imo_numbers: IMO numbers of the vessels to include
+        resolution: Grid cell size in degrees
+
+    Returns:
+        Tuple of the SQL query and its parameters. Rows are (interval_start,
+        interval_end, lat_index, lon_index, position_count, vessel_count), see
+        group_grid_rows
+    """
+    if interval_unit not in BUCKET_UNITS:
+        raise ValueError(f"interval_unit must be one of {', '.join(BUCKET_UNITS)}")
+
+    params = [
+        f"1 {interval_unit}",
+        interval_unit,
+        resolution,
+        resolution,
+        start_time,
+        end_time,
+        list(imo_numbers),
+    ]
+    return GRID_QUERY, params
+
+
+def group_grid_rows(rows, grouping_format: str) -> List[Dict]:
+    """
+    Convert grid query rows into compact time groups.
+
+    Each time group holds parallel lat_index, lon_index and counts arrays of
+    its non-empty cells, so the payload grows with the number of occupied
+    cells rather than with the number of AIS positions.
+
+    Args:
+        rows: Rows ordered by interval, where the row with NULL cell indexes
+              holds the totals of its interval
+        grouping_format: strftime format of the interval boundaries
+
+    Returns:
+        List of time group dictionaries
+    """
+    time_groups = []
+    current_group = None
+
+    for interval_start, interval_end, lat_index, lon_index, position_count, vessel_count in rows:
+        interval_start_str = interval_start.strftime(grouping_format)
+
+        if current_group is None or current_group['interval_start'] != interval_start_str:
+            current_group = {
+                'interval_start': interval_start_str,
+                'interval_end': interval_end.strftime(grouping_format),
+                'vessel_count': 0,
+                'position_count': 0,
+                'lat_index': [],
+                'lon_index': [],
+                'counts': [],
+            }
+            time_groups.append(current_group)
+
+        if lat_index is None:
+            current_group['vessel_count'] = vessel_count
+            current_group['position_count'] = int(position_count)
+        else:
+            current_group['lat_index'].append(lat_index)
+            current_group['lon_index'].append(lon_index)
+            current_group['counts'].append(int(position_count))
+
+    return time_groups
@@ -0,0 +1,463 @@
+"""
+Scrubber vessel position rollup utilities.
+Maintains hourly, daily and monthly rollup tables in the ais_data database that
+hold one representative position per scrubber vessel, grid cell and time bucket,
+so the past scrubber distribution endpoint does not have to scan raw ship_data.
+The hourly and daily rollups expire along with the raw ship_data.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.db import connections, transaction
+
+from .scrubber_vessels import get_scrubber_imo_numbers
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_STATE_TABLE = 'scrubber_rollup_state'
+
+# Rollup table per granularity, in the order they are built: hourly rollups
+# are aggregated from ship_data, every coarser one from the previous granularity
+ROLLUP_TABLES = {
+    'hour': 'scrubber_rollup_hourly',
+    'day': 'scrubber_rollup_daily',
+    'month': 'scrubber_rollup_monthly',
+}
+ROLLUP_SOURCES = {
+    'day': 'hour',
+    'month': 'day',
+}
+
+# Rollup used for each bucket size of the past scrubber distribution endpoint
+ROLLUP_FOR_INTERVAL = {
+    'hour': 'hour',
+    'day': 'day',
+    'week': 'day',
+    'month': 'month',
+}
+
+# Grid cell size in degrees, the same grid the frontend heatmap bins positions on
+CELL_DEGREES = 0.05
+
+# Completed hours re-aggregated on every update to pick up late AIS messages
+DEFAULT_LOOKBACK_HOURS = 2
+
+# Width of the ship_data time range aggregated per transaction
+RAW_CHUNK = timedelta(days=1)
+
+ROLLUP_LOCK_NAME = 'scrubber_rollup'
+
+# Rollups pruned along with the raw ship_data, the monthly rollup keeps the long-term history
+PRUNED_GRANULARITIES = ['hour', 'day']
+
+
+def ensure_tables(cursor) -> None:
+    """
+    Create the rollup tables and their state table if they do not exist yet.
+
+    The rollup tables copy their imo_number, timestamp and coordinate column
+    types from ship_data so rollup rows can be served exactly like raw rows.
+    """
+    for table in ROLLUP_TABLES.values():
+        cursor.execute("SELECT to_regclass(%s)", [table])
+        if cursor.fetchone()[0] is not None:
+            continue
+
+        logger.info(f"Creating {table} table")
+        cursor.execute(f"""
+            CREATE TABLE {table} AS
+            SELECT timestamp_ais AS bucket_start,
+                   imo_number,
+                   0::integer AS cell_lat,
+                   0::integer AS cell_lon,
+                   latitude,
+                   longitude,
+                   0::integer AS position_count
+            FROM ship_data
+            WITH NO DATA
+        """)
+        cursor.execute(f"""
+            ALTER TABLE {table}
+            ADD PRIMARY KEY (bucket_start, imo_number, cell_lat, cell_lon)
+        """)
+
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ROLLUP_STATE_TABLE} (
+            granularity varchar(10) PRIMARY KEY,
+            covered_from timestamptz NOT NULL,
+            rolled_up_until timestamptz NOT NULL,
+            updated_at timestamptz
+        )
+    """)
+
+
+def _get_state(cursor) -> Dict[str, Dict]:
+    cursor.execute(f"SELECT granularity, covered_from, rolled_up_until FROM {ROLLUP_STATE_TABLE}")
+    return {
+        row[0]: {'covered_from': row[1], 'rolled_up_until': row[2]}
+        for row in cursor.fetchall()
+    }
+
+
+def _set_state(cursor, granularity: str, covered_from, rolled_up_until) -> None:
+    cursor.execute(f"""
+        INSERT INTO {ROLLUP_STATE_TABLE} (granularity, covered_from, rolled_up_until, updated_at)
+        VALUES (%s, %s, %s, now())
+        ON CONFLICT (granularity) DO UPDATE SET
+            covered_from = LEAST({ROLLUP_STATE_TABLE}.covered_from, EXCLUDED.covered_from),
+            rolled_up_until = EXCLUDED.rolled_up_until,
+            updated_at = now()
+    """, [granularity, covered_from, rolled_up_until])
+
+
+def _truncate(cursor, granularity: str, value):
+    cursor.execute("SELECT date_trunc(%s, %s::timestamptz)", [granularity, value])
+    return cursor.fetchone()[0]
+
+
+def _rollup_raw_range(cursor, range_start, range_end, imo_numbers: List[int]) -> int:
+    """
+    Aggregate ship_data positions in [range_start, range_end) into hourly rollups.
+    """
+    table = ROLLUP_TABLES['hour']
+    cursor.execute(
+        f"DELETE FROM {table} WHERE bucket_start >= %s AND bucket_start < %s",
+        [range_start, range_end]
+    )
+    cursor.execute(f"""
+        INSERT INTO {table}
+            (bucket_start, imo_number, cell_lat, cell_lon, latitude, longitude, position_count)
+        SELECT date_trunc('hour', timestamp_ais),
+               imo_number,
+               floor(latitude / %s)::integer,
+               floor(longitude / %s)::integer,
+               AVG(latitude),
+               AVG(longitude),
+               COUNT(*)
+        FROM ship_data
+        WHERE timestamp_ais >= %s
+        AND timestamp_ais < %s
+        AND imo_number = ANY(%s)
+        AND latitude IS NOT NULL
+        AND longitude IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+    """, [CELL_DEGREES, CELL_DEGREES, range_start, range_end, imo_numbers])
+    return cursor.rowcount
+
+
+def _rollup_derived_range(cursor, granularity: str, range_start, range_end) -> int:
+    """
+    Re-aggregate the finer rollup into the given granularity for [range_start, range_end).
+
+    Means are weighted by position count, so a derived rollup row is identical
+    to aggregating the underlying raw positions directly.
+    """
+    table = ROLLUP_TABLES[granularity]
+    source_table = ROLLUP_TABLES[ROLLUP_SOURCES[granularity]]
+    cursor.execute(
+        f"DELETE FROM {table} WHERE bucket_start >= %s AND bucket_start < %s",
+        [range_start, range_end]
+    )
+    cursor.execute(f"""
+        INSERT INTO {table}
+            (bucket_start, imo_number, cell_lat, cell_lon, latitude, longitude, position_count)
+        SELECT date_trunc(%s, bucket_start),
+               imo_number,
+               cell_lat,
+               cell_lon,
+               SUM(latitude * position_count) / SUM(position_count),
+               SUM(longitude * position_count) / SUM(position_count),
+               SUM(position_count)
+        FROM {source_table}
+        WHERE bucket_start >= %s
+        AND bucket_start < %s
+        GROUP BY 1, 2, 3, 4
+    """, [granularity, range_start, range_end])
+    return cursor.rowcount
+
+
+def update_rollups(since=None, lookback_hours: int = DEFAULT_LOOKBACK_HOURS) -> Dict:
+    """
+    Bring the hourly, daily and monthly rollups up to date.
+
+    Only completed buckets are rolled up: the hour containing the newest AIS
+    message is left for the next run. Without an existing state the rollups
+    are backfilled from the earliest ship_data record, or from `since`.
+
+    Args:
+        since: Optional datetime to rebuild the rollups from
+        lookback_hours: Number of completed hours re-aggregated to include late messages
+
+    Returns:
+        Dictionary with the number of rows written and the new watermark per granularity
+    """
+    stats = {granularity: {'rows': 0, 'rolled_up_until': None} for granularity in ROLLUP_TABLES}
+
+    with connections['ais_data'].cursor() as cursor:
+        # Session level lock, as every chunk is committed in its own transaction
+        cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s))", [ROLLUP_LOCK_NAME])
+        if not cursor.fetchone()[0]:
+            logger.info("Scrubber rollup update already running, skipping")
+            return stats
+
+        try:
+            with transaction.atomic(using='ais_data'):
+                ensure_tables(cursor)
+
+            state = _get_state(cursor)
+
+            cursor.execute("SELECT MIN(timestamp_ais), MAX(timestamp_ais) FROM ship_data")
+            earliest, latest = cursor.fetchone()
+            if latest is None:
+                logger.info("No ship_data to roll up")
+                return stats
+
+            imo_numbers = get_scrubber_imo_numbers(cursor)
+
+            # Hourly rollups from raw ship_data
+            hour_until = _truncate(cursor, 'hour', latest)
+            if since is not None:
+                hour_from = _truncate(cursor, 'hour', since)
+            elif 'hour' in state:
+                hour_from = state['hour']['rolled_up_until'] - timedelta(hours=lookback_hours)
+            else:
+                hour_from = _truncate(cursor, 'hour', earliest)
+            covered_from = state.get('hour', {}).get('covered_from', hour_from)
+
+            chunk_start = hour_from
+            while chunk_start < hour_until:
+                chunk_end = min(chunk_start + RAW_CHUNK, hour_until)
+                with transaction.atomic(using='ais_data'):
+                    stats['hour']['rows'] += _rollup_raw_range(cursor, chunk_start, chunk_end, imo_numbers)
+                    _set_state(cursor, 'hour', min(covered_from, hour_from), chunk_end)
+                chunk_start = chunk_end
+            stats['hour']['rolled_up_until'] = max(hour_until, state.get('hour', {}).get('rolled_up_until', hour_until))
+
+            # Daily and monthly rollups from the next finer rollup
+            for granularity, source in ROLLUP_SOURCES.items():
+                source_until = stats[source]['rolled_up_until']
+                until = _truncate(cursor, granularity, source_until)
+                # Rebuild the buckets touched by this run's hourly range, plus any
+                # complete buckets a previous failed run did not get to
+                if granularity in state:
+                    start = min(
+                        _truncate(cursor, granularity, hour_from),
+                        state[granularity]['rolled_up_until']
+                    )
+                else:
+                    start = _truncate(cursor, granularity, covered_from)
+
+                if start < until:
+                    with transaction.atomic(using='ais_data'):
+                        stats[granularity]['rows'] = _rollup_derived_range(cursor, granularity, start, until)
+                        _set_state(cursor, granularity, min(covered_from, start), until)
+                stats[granularity]['rolled_up_until'] = until
+        finally:
+            cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", [ROLLUP_LOCK_NAME])
+
+    logger.info(
+        "Updated scrubber rollups: " + ', '.join(
+            f"{granularity} {values['rows']} rows until {values['rolled_up_until']}"
+            for granularity, values in stats.items()
+        )
+    )
+    return stats
+
+
+def prune_rollups(cutoff_date) -> Dict[str, int]:
+    """
+    Remove the hourly and daily rollup buckets that end before the cutoff, as
+    their raw ship_data is deleted at the same cutoff, and move the covered
+    range of those rollups up accordingly.
+
+    Args:
+        cutoff_date: Buckets ending on or before this datetime are removed
+
+    Returns:
+        Dictionary with the number of rows deleted per granularity
+    """
+    deleted = {}
+
+    with connections['ais_data'].cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [ROLLUP_STATE_TABLE])
+        if cursor.fetchone()[0] is None:
+            return deleted
+
+        # The update would restore the covered range it read before the prune
+        cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s))", [ROLLUP_LOCK_NAME])
+        if not cursor.fetchone()[0]:
+            logger.info("Scrubber rollup update running, pruning the rollups on the next cleanup")
+            return deleted
+
+        try:
+            for granularity in PRUNED_GRANULARITIES:
+                # Only whole buckets, the one the cutoff falls in keeps its counts
+                bucket_cutoff = _truncate(cursor, granularity, cutoff_date)
+                with transaction.atomic(using='ais_data'):
+                    cursor.execute(
+                        f"DELETE FROM {ROLLUP_TABLES[granularity]} WHERE bucket_start < %s",
+                        [bucket_cutoff]
+                    )
+                    deleted[granularity] = cursor.rowcount
+                    cursor.execute(f"""
+                        UPDATE {ROLLUP_STATE_TABLE}
+                        SET covered_from = GREATEST(covered_from, %s), updated_at = now()
+                        WHERE granularity = %s
+                    """, [bucket_cutoff, granularity])
+        finally:
+            cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", [ROLLUP_LOCK_NAME])
+
+    logger.info(
+        "Pruned scrubber rollups: " + ', '.join(
+            f"{granularity} {rows} rows" for granularity, rows in deleted.items()
+        )
+    )
+    return deleted
+
+
+def _rollup_covers(cursor, granularity: str, start_time, end_time) -> bool:
+    """
+    Check whether the rollup of the given granularity covers [start_time, end_time).
+    """
+    cursor.execute("SELECT to_regclass(%s)", [ROLLUP_STATE_TABLE])
+    if cursor.fetchone()[0] is None:
+        return False
+
+    cursor.execute(
+        f"SELECT covered_from, rolled_up_until FROM {ROLLUP_STATE_TABLE} WHERE granularity = %s",
+        [granularity]
+    )
+    coverage = cursor.fetchone()
+    if coverage is None or coverage[0] > start_time or coverage[1] < end_time:
+        logger.info(f"Scrubber {granularity} rollup does not cover {start_time} to {end_time}")
+        return False
+    return True
+
+
+def build_rollup_positions_query(interval_unit: str, start_time, end_time) -> Optional[Tuple[str, list]]:
+    """
+    Build the query reading scrubber vessel positions for [start_time, end_time)
+    from the rollups.
+
+    Rows are re-bucketed to the requested interval unit, so weekly buckets
+    are served from the daily rollup.
+
+    Args:
+        interval_unit: Bucket size of the result (hour, day, week or month)
+        start_time: Start of the requested range
+        end_time: Exclusive end of the requested range
+
+    Returns:
+        Tuple of the SQL query and its parameters, returning (interval_start,
+        interval_end, imo_number, latitude, longitude, position_count) rows
+        ordered by interval and IMO number, or None when the rollups do not
+        cover the requested range
+    """
+    granularity = ROLLUP_FOR_INTERVAL.get(interval_unit)
+    if granularity is None:
+        return None
+
+    try:
+        with connections['ais_data'].cursor() as cursor:
+            if not _rollup_covers(cursor, granularity, start_time, end_time):
+                return None
+    except Exception as e:
+        logger.warning(f"Scrubber rollups unavailable, using raw ship_data: {str(e)}")
+        return None
+
+    query = f"""
+        SELECT date_trunc(%s, bucket_start) AS interval_start,
+               date_trunc(%s, bucket_start) + %s::interval AS interval_end,
+               imo_number,
+               SUM(latitude * position_count) / SUM(position_count),
+               SUM(longitude * position_count) / SUM(position_count),
+               SUM(position_count)
+        FROM {ROLLUP_TABLES[granularity]}
+        WHERE bucket_start >= %s
+        AND bucket_start < %s
+        GROUP BY 1, 2, 3, cell_lat, cell_lon
+        ORDER BY 1, 3, cell_lat, cell_lon
+    """
+    return query, [interval_unit, interval_unit, f"1 {interval_unit}", start_time, end_time]
+
+
+def fetch_rollup_positions(interval_unit: str, start_time, end_time) -> Optional[List[tuple]]:
+    """
+    Read scrubber vessel positions for [start_time, end_time) from the rollups.
+
+    Returns:
+        Rows as described in build_rollup_positions_query, or None when the
+        rollups do not cover the requested range
+    """
+    rollup_query = build_rollup_positions_query(interval_unit, start_time, end_time)
+    if rollup_query is None:
+        return None
+
+    try:
+        with connections['ais_data'].cursor() as cursor:
+            cursor.execute(*rollup_query)
+            return cursor.fetchall()
+    except Exception as e:
+        logger.warning(f"Scrubber rollups unavailable, using raw ship_data: {str(e)}")
+        return None
+
+
+def fetch_rollup_grid(interval_unit: str, start_time, end_time, resolution: float) -> Optional[List[tuple]]:
+    """
+    Count scrubber vessel positions per interval and grid cell from the rollups.
+
+    Only resolutions that are a whole multiple of the rollup cell size can be
+    served, since every rollup cell then falls entirely within one grid cell.
+
+    Args:
+        interval_unit: Bucket size of the result (hour, day, week or month)
+        start_time: Start of the requested range
+        end_time: Exclusive end of the requested range
+        resolution: Grid cell size in degrees
+
+    Returns:
+        Rows in the format of scrubber_distribution.GRID_QUERY, or None when
+        the rollups cannot serve the request
+    """
+    granularity = ROLLUP_FOR_INTERVAL.get(interval_unit)
+    cells_per_grid_cell = round(resolution / CELL_DEGREES)
+    if granularity is None or cells_per_grid_cell < 1 or abs(cells_per_grid_cell * CELL_DEGREES - resolution) > 1e-9:
+        return None
+
+    try:
+        with connections['ais_data'].cursor() as cursor:
+            if not _rollup_covers(cursor, granularity, start_time, end_time):
+                return None
+
+            # Grid cells are derived from the rollup cell indexes rather than the
+            # mean positions, so no position can drift across a cell border
+            cursor.execute(f"""
+                SELECT interval_start,
+                       interval_start + %s::interval AS interval_end,
+                       lat_index,
+                       lon_index,
+                       SUM(position_count) AS position_count,
+                       COUNT(DISTINCT imo_number) AS vessel_count
+                FROM (
+                    SELECT date_trunc(%s, bucket_start) AS interval_start,
+                           floor(cell_lat::numeric / %s)::integer AS lat_index,
+                           floor(cell_lon::numeric / %s)::integer AS lon_index,
+                           imo_number,
+                           position_count
+                    FROM {ROLLUP_TABLES[granularity]}
+                    WHERE bucket_start >= %s
+                    AND bucket_start < %s
+                ) AS cells
+                GROUP BY GROUPING SETS ((interval_start, lat_index, lon_index), (interval_start))
+                ORDER BY interval_start, lat_index NULLS FIRST, lon_index
+            """, [
+                f"1 {interval_unit}", interval_unit,
+                cells_per_grid_cell, cells_per_grid_cell,
+                start_time, end_time,
+            ])
+            return cursor.fetchall()
+    except Exception as e:
+        logger.warning(f"Scrubber rollups unavailable, using raw ship_data: {str(e)}")
+        return None
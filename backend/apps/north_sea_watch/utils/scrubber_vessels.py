@@ -0,0 +1,131 @@
+"""
+Scrubber vessel reference data utilities.
+Keeps the IMO numbers of vessels with a scrubber installed in a process-wide
+cache, reloaded only when the ICCT reference table changes, instead of
+querying the table on every request.
+"""
+
+import logging
+import threading
+import time
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+SCRUBBER_TABLE = 'icct_scrubber_march_2025'
+
+SCRUBBER_IMO_QUERY = f"""
+    SELECT DISTINCT imo_number
+    FROM {SCRUBBER_TABLE}
+    WHERE imo_number IS NOT NULL
+    AND sox_scrubber_status IS NOT NULL
+    AND sox_scrubber_status != 'Not installed'
+"""
+
+# Identifies the current contents of the table: the oid and file node change
+# when it is recreated or truncated, the tuple counters on every write (once the
+# writing session has published its statistics, within seconds)
+POSTGRES_FINGERPRINT_QUERY = """
+    SELECT c.oid, c.relfilenode,
+           COALESCE(s.n_tup_ins, 0), COALESCE(s.n_tup_upd, 0), COALESCE(s.n_tup_del, 0)
+    FROM pg_class c
+    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    WHERE c.oid = to_regclass(%s)
+"""
+
+_cache_lock = threading.Lock()
+_cache = {
+    'imo_numbers': None,
+    'fingerprint': None,
+    'checked_at': 0.0,
+}
+
+
+def load_scrubber_imo_numbers(cursor) -> List[int]:
+    """
+    Query the IMO numbers of all vessels with a scrubber installed.
+
+    IMO numbers are returned as integers, matching the numeric imo_number
+    column of ship_data.
+    """
+    cursor.execute(SCRUBBER_IMO_QUERY)
+    return [int(row[0]) for row in cursor.fetchall() if str(row[0]).isdigit()]
+
+
+def get_table_fingerprint(cursor, table: str = SCRUBBER_TABLE) -> Optional[tuple]:
+    """
+    Return a value that changes whenever a reference table changes.
+
+    PostgreSQL uses the table statistics, which is a single catalog lookup;
+    other databases fall back to the row count.
+
+    Args:
+        cursor: Cursor of the database holding the table
+        table: Name of the table, the scrubber reference table by default
+    """
+    if cursor.db.vendor == 'postgresql':
+        cursor.execute(POSTGRES_FINGERPRINT_QUERY, [table])
+        return cursor.fetchone()
+
+    cursor.execute(f"SELECT COUNT(*) FROM {table}")
+    return cursor.fetchone()
+
+
+def get_scrubber_imo_numbers(cursor=None) -> List[int]:
+    """
+    Return the IMO numbers of all vessels with a scrubber installed.
+
+    The set is cached for the lifetime of the process. At most once every
+    SCRUBBER_IMO_CACHE_CHECK_SECONDS the table fingerprint is compared with
+    the cached one and the set is reloaded if the table has changed.
+
+    Args:
+        cursor: Cursor of the ais_data database, a new one is opened if omitted
+
+    Returns:
+        List of IMO numbers as integers, safe for the caller to modify
+    """
+    now = time.monotonic()
+    with _cache_lock:
+        if (_cache['imo_numbers'] is not None
+                and now - _cache['checked_at'] < settings.SCRUBBER_IMO_CACHE_CHECK_SECONDS):
+            return list(_cache['imo_numbers'])
+
+    if cursor is None:
+        with connections['ais_data'].cursor() as cursor:
+            return _revalidate(cursor, now)
+    return _revalidate(cursor, now)
+
+
+def _revalidate(cursor, now: float) -> List[int]:
+    """
+    Reload the cached IMO numbers if the reference table fingerprint changed.
+    """
+    fingerprint = get_table_fingerprint(cursor)
+    with _cache_lock:
+        if (_cache['imo_numbers'] is not None and fingerprint is not None
+                and fingerprint == _cache['fingerprint']):
+            _cache['checked_at'] = now
+            return list(_cache['imo_numbers'])
+
+    imo_numbers = load_scrubber_imo_numbers(cursor)
+    with _cache_lock:
+        _cache['imo_numbers'] = imo_numbers
+        _cache['fingerprint'] = fingerprint
+        _cache['checked_at'] = now
+
+    logger.info(f"Loaded {len(imo_numbers)} scrubber vessel IMO numbers from {SCRUBBER_TABLE}")
+    return list(imo_numbers)
+
+
+def clear_cache() -> None:
+    """
+    Drop the cached IMO numbers so the next call reloads them.
+    """
+    with _cache_lock:
+        _cache['imo_numbers'] = None
+        _cache['fingerprint'] = None
+        _cache['checked_at'] = 0.0
@@ -0,0 +1,162 @@
+"""
+ship_data index management utilities.
+Audits the indexes of the unmanaged ship_data table against the composite and
+covering indexes its hot queries need, and builds missing ones without
+blocking AIS ingestion, on plain and partitioned tables alike.
+"""
+
+import logging
+import re
+from typing import Dict, List
+
+from .ship_data_partitions import SHIP_DATA_TABLE, is_partitioned
+
+logger = logging.getLogger(__name__)
+
+# Index definitions in the form pg_get_indexdef() reports them, after the table name.
+# The covering index answers the per-vessel time range queries (ship path, batch
+# ship paths, scrubber distribution) from the index alone; the BRIN index serves
+# the time range scans across all vessels at a fraction of the size of a btree.
+RECOMMENDED_INDEXES = {
+    'ship_data_imo_timestamp_covering_idx': (
+        'USING btree (imo_number, timestamp_ais DESC) INCLUDE (latitude, longitude, destination, '
+        'navigational_status_code, navigational_status, true_heading, rate_of_turn, cog, sog)'
+    ),
+    'ship_data_timestamp_brin_idx': 'USING brin (timestamp_ais)',
+}
+
+# Key columns of the covering index; btree indexes on a prefix of them become redundant
+COVERING_KEY_COLUMNS = ['imo_number', 'timestamp_ais']
+
+INDEX_DEFINITION_PATTERN = re.compile(r'^CREATE (?:UNIQUE )?INDEX \S+ ON (?:ONLY )?\S+ (.*)$')
+BTREE_KEYS_PATTERN = re.compile(r'^USING btree \(([^)]*)\)')
+
+
+def _definition(indexdef: str) -> str:
+    match = INDEX_DEFINITION_PATTERN.match(indexdef)
+    return match.group(1) if match else indexdef
+
+
+def _btree_key_columns(definition: str) -> List[str]:
+    match = BTREE_KEYS_PATTERN.match(definition)
+    if not match:
+        return []
+    return [column.strip().split(' ')[0] for column in match.group(1).split(',')]
+
+
+def _is_covering_prefix(definition: str) -> bool:
+    columns = _btree_key_columns(definition)
+    return bool(columns) and columns == COVERING_KEY_COLUMNS[:len(columns)]
+
+
+def list_indexes(cursor) -> List[Dict]:
+    """
+    Return the indexes of ship_data with their definition, size (including the
+    indexes of all partitions) and state.
+    """
+    cursor.execute("""
+        SELECT c.relname, pg_get_indexdef(i.indexrelid), i.indisvalid, i.indisunique,
+               COALESCE(
+                   (SELECT SUM(pg_relation_size(relid)) FROM pg_partition_tree(i.indexrelid)),
+                   pg_relation_size(i.indexrelid)
+               )
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = to_regclass(%s)
+        ORDER BY c.relname
+    """, [SHIP_DATA_TABLE])
+    return [
+        {
+            'name': row[0],
+            'definition': _definition(row[1]),
+            'valid': row[2],
+            'unique': row[3],
+            'size': row[4],
+        }
+        for row in cursor.fetchall()
+    ]
+
+
+def audit_indexes(cursor) -> Dict:
+    """
+    Compare the indexes of ship_data with the recommended ones.
+
+    Returns:
+        Dictionary with the existing indexes, the names of the recommended
+        indexes that are missing, the invalid indexes (left by an interrupted
+        concurrent build) and the btree indexes made redundant by the
+        covering index
+    """
+    indexes = list_indexes(cursor)
+    valid_definitions = {index['definition'] for index in indexes if index['valid']}
+
+    missing = [
+        name for name, definition in RECOMMENDED_INDEXES.items()
+        if definition not in valid_definitions
+    ]
+    redundant = [
+        index['name'] for index in indexes
+        if not index['unique'] and index['name'] not in RECOMMENDED_INDEXES
+        and _is_covering_prefix(index['definition'])
+    ]
+
+    return {
+        'indexes': indexes,
+        'missing': missing,
+        'invalid': [index['name'] for index in indexes if not index['valid']],
+        'redundant': redundant,
+    }
+
+
+def _partitions(cursor) -> List[str]:
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        ORDER BY c.relname
+    """, [SHIP_DATA_TABLE])
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _drop_invalid(cursor, name: str) -> None:
+    cursor.execute("""
+        SELECT NOT i.indisvalid
+        FROM pg_index i
+        WHERE i.indexrelid = to_regclass(%s)
+    """, [name])
+    row = cursor.fetchone()
+    if row and row[0]:
+        logger.info(f"Dropping invalid index {name} left by an interrupted build")
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def create_index(cursor, name: str) -> None:
+    """
+    Build a recommended index with CREATE INDEX CONCURRENTLY.
+
+    Must run outside a transaction. Partitioned tables do not support
+    concurrent builds, so the index is created on the parent only and every
+    partition's index is built concurrently and attached, after which the
+    parent index becomes valid. Partitions attached later get it automatically.
+
+    Args:
+        cursor: Cursor of the ais_data database in autocommit mode
+        name: Name of an index in RECOMMENDED_INDEXES
+    """
+    definition = RECOMMENDED_INDEXES[name]
+
+    if not is_partitioned(cursor):
+        _drop_invalid(cursor, name)
+        logger.info(f"Creating index {name}")
+        cursor.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {SHIP_DATA_TABLE} {definition}")
+        return
+
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {SHIP_DATA_TABLE} {definition}")
+    suffix = name[len(f"{SHIP_DATA_TABLE}_"):]
+    for partition in _partitions(cursor):
+        partition_index = f"{partition}_{suffix}"
+        _drop_invalid(cursor, partition_index)
+        logger.info(f"Creating index {partition_index}")
+        cursor.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition_index} ON {partition} {definition}")
+        cursor.execute(f"ALTER INDEX {name} ATTACH PARTITION {partition_index}")
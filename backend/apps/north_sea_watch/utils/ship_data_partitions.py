@@ -0,0 +1,268 @@
+"""
+ship_data partition management utilities.
+Converts ship_data into a table range partitioned by day on timestamp_ais,
+pre-creates upcoming partitions and enforces retention by detaching and
+dropping whole expired partitions instead of deleting rows in batches.
+"""
+
+import logging
+import re
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SHIP_DATA_TABLE = 'ship_data'
+
+# Daily partitions are named ship_data_pYYYYMMDD and hold [day, day + 1)
+PARTITION_PREFIX = 'ship_data_p'
+PARTITION_NAME_PATTERN = re.compile(r'^ship_data_p(\d{8})$')
+
+# Catches rows outside every daily partition, such as a missing timestamp
+DEFAULT_PARTITION = 'ship_data_default'
+
+# Names used while converting: the new partitioned table is built next to
+# ship_data and swapped in, the original table is kept under LEGACY_TABLE
+CONVERSION_TABLE = 'ship_data_partitioned'
+LEGACY_TABLE = 'ship_data_unpartitioned'
+
+# Days of partitions kept ready ahead of the current day
+DEFAULT_DAYS_AHEAD = 7
+
+# Partition maintenance gives up instead of queueing behind long running readers
+PARTITION_LOCK_TIMEOUT = '5s'
+
+# Indexes of the partitioned table, created on every partition. id serves the
+# incremental latest position refresh, the others the time-windowed endpoints.
+PARTITION_INDEXES = {
+    'ship_data_part_id_idx': '(id)',
+    'ship_data_part_imo_timestamp_idx': '(imo_number, timestamp_ais)',
+    'ship_data_part_timestamp_idx': '(timestamp_ais)',
+}
+
+
+def partition_name(day: date) -> str:
+    """
+    Return the name of the partition holding the given day.
+    """
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def is_partitioned(cursor) -> bool:
+    """
+    Check whether ship_data is a partitioned table.
+    """
+    cursor.execute("""
+        SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)
+    """, [SHIP_DATA_TABLE])
+    row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def list_partitions(cursor) -> List[Tuple[str, date]]:
+    """
+    Return the daily partitions attached to ship_data, ordered by day.
+    """
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+    """, [SHIP_DATA_TABLE])
+
+    partitions = []
+    for (name,) in cursor.fetchall():
+        match = PARTITION_NAME_PATTERN.match(name)
+        if match:
+            day = date(int(match.group(1)[:4]), int(match.group(1)[4:6]), int(match.group(1)[6:]))
+            partitions.append((name, day))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def _bounds(day: date) -> List[str]:
+    # Untyped literals, coerced to the type of timestamp_ais
+    return [day.isoformat(), (day + timedelta(days=1)).isoformat()]
+
+
+def create_partition(cursor, day: date) -> bool:
+    """
+    Create and attach the partition of a day if it does not exist yet.
+
+    The partition is created as a plain table and attached afterwards, which
+    only needs a SHARE UPDATE EXCLUSIVE lock on ship_data. Rows of the day
+    that already landed in the default partition are moved into it first.
+
+    Returns:
+        True if the partition was created
+    """
+    name = partition_name(day)
+    cursor.execute("SELECT to_regclass(%s)", [name])
+    if cursor.fetchone()[0] is not None:
+        return False
+
+    with transaction.atomic(using='ais_data'):
+        cursor.execute(f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT}'")
+        cursor.execute(f"CREATE TABLE {name} (LIKE {SHIP_DATA_TABLE} INCLUDING DEFAULTS)")
+
+        cursor.execute("SELECT to_regclass(%s)", [DEFAULT_PARTITION])
+        if cursor.fetchone()[0] is not None:
+            cursor.execute(f"""
+                WITH moved AS (
+                    DELETE FROM {DEFAULT_PARTITION}
+                    WHERE timestamp_ais >= %s AND timestamp_ais < %s
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+            """, _bounds(day))
+            if cursor.rowcount:
+                logger.info(f"Moved {cursor.rowcount} rows from {DEFAULT_PARTITION} into {name}")
+
+        cursor.execute(
+            f"ALTER TABLE {SHIP_DATA_TABLE} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)",
+            _bounds(day)
+        )
+
+    logger.info(f"Created partition {name}")
+    return True
+
+
+def ensure_partitions(cursor, days_ahead: int = DEFAULT_DAYS_AHEAD) -> List[str]:
+    """
+    Create the partitions of the current day and the next `days_ahead` days.
+
+    Returns:
+        Names of the partitions created
+    """
+    today = timezone.now().date()
+    created = []
+    for offset in range(days_ahead + 1):
+        day = today + timedelta(days=offset)
+        if create_partition(cursor, day):
+            created.append(partition_name(day))
+    return created
+
+
+def drop_expired_partitions(cursor, cutoff) -> List[str]:
+    """
+    Detach and drop every partition whose days all lie before the cutoff.
+
+    Rows before the cutoff in the partition the cutoff falls on are left for
+    the caller to delete.
+
+    Args:
+        cursor: Cursor of the ais_data database
+        cutoff: Datetime before which data expires
+
+    Returns:
+        Names of the partitions dropped
+    """
+    cutoff_day = cutoff.date()
+    dropped = []
+    for name, day in list_partitions(cursor):
+        if day + timedelta(days=1) > cutoff_day:
+            break
+        with transaction.atomic(using='ais_data'):
+            cursor.execute(f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT}'")
+            cursor.execute(f"ALTER TABLE {SHIP_DATA_TABLE} DETACH PARTITION {name}")
+            cursor.execute(f"DROP TABLE {name}")
+        logger.info(f"Dropped expired partition {name}")
+        dropped.append(name)
+    return dropped
+
+
+def convert_to_partitioned(cursor, days_ahead: int = DEFAULT_DAYS_AHEAD) -> Dict:
+    """
+    Replace ship_data by a copy partitioned by day on timestamp_ais.
+
+    Runs in one transaction that blocks writers (readers are not blocked) for
+    the duration of the copy, so it belongs in a maintenance window. The id
+    sequence carries over so ids keep increasing for the latest position
+    refresh. The original table is kept as ship_data_unpartitioned.
+
+    Returns:
+        Dictionary with the number of rows copied and partitions created
+    """
+    if is_partitioned(cursor):
+        raise ValueError("ship_data is already partitioned")
+
+    with transaction.atomic(using='ais_data'):
+        cursor.execute(f"LOCK TABLE {SHIP_DATA_TABLE} IN EXCLUSIVE MODE")
+
+        cursor.execute("""
+            SELECT attidentity FROM pg_attribute
+            WHERE attrelid = to_regclass(%s) AND attname = 'id'
+        """, [SHIP_DATA_TABLE])
+        row = cursor.fetchone()
+        identity = bool(row and row[0])
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [SHIP_DATA_TABLE])
+        sequence = cursor.fetchone()[0]
+
+        cursor.execute(f"""
+            CREATE TABLE {CONVERSION_TABLE}
+            (LIKE {SHIP_DATA_TABLE} INCLUDING DEFAULTS {'INCLUDING IDENTITY' if identity else ''})
+            PARTITION BY RANGE (timestamp_ais)
+        """)
+        for index_name, columns in PARTITION_INDEXES.items():
+            cursor.execute(f"CREATE INDEX {index_name} ON {CONVERSION_TABLE} {columns}")
+        cursor.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {CONVERSION_TABLE} DEFAULT")
+
+        cursor.execute(f"SELECT MIN(timestamp_ais)::date FROM {SHIP_DATA_TABLE}")
+        first_day = cursor.fetchone()[0] or timezone.now().date()
+        last_day = timezone.now().date() + timedelta(days=days_ahead)
+        cursor.execute(f"SELECT MAX(timestamp_ais)::date FROM {SHIP_DATA_TABLE}")
+        last_day = max(last_day, cursor.fetchone()[0] or last_day)
+
+        partitions = 0
+        day = first_day
+        while day <= last_day:
+            cursor.execute(
+                f"CREATE TABLE {partition_name(day)} PARTITION OF {CONVERSION_TABLE} "
+                f"FOR VALUES FROM (%s) TO (%s)",
+                _bounds(day)
+            )
+            partitions += 1
+            day += timedelta(days=1)
+
+        cursor.execute(f"INSERT INTO {CONVERSION_TABLE} SELECT * FROM {SHIP_DATA_TABLE}")
+        rows = cursor.rowcount
+
+        cursor.execute(f"ALTER TABLE {SHIP_DATA_TABLE} RENAME TO {LEGACY_TABLE}")
+        cursor.execute(f"ALTER TABLE {CONVERSION_TABLE} RENAME TO {SHIP_DATA_TABLE}")
+
+        if identity:
+            # The copied identity has its own sequence, continue after the copied ids
+            cursor.execute(f"""
+                SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 0) + 1, false)
+                FROM {SHIP_DATA_TABLE}
+            """, [SHIP_DATA_TABLE])
+        elif sequence:
+            # The copied default still uses the original sequence, move its ownership
+            cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {SHIP_DATA_TABLE}.id")
+
+    logger.info(f"Converted {SHIP_DATA_TABLE} into {partitions} daily partitions, copied {rows} rows")
+    return {'rows': rows, 'partitions': partitions}
+
+
+def get_partition_summary(cursor) -> Optional[Dict]:
+    """
+    Describe the partitions of ship_data, or return None if it is not partitioned.
+    """
+    if not is_partitioned(cursor):
+        return None
+
+    partitions = list_partitions(cursor)
+    cursor.execute("SELECT to_regclass(%s)", [DEFAULT_PARTITION])
+    default_rows = 0
+    if cursor.fetchone()[0] is not None:
+        cursor.execute(f"SELECT COUNT(*) FROM {DEFAULT_PARTITION}")
+        default_rows = cursor.fetchone()[0]
+
+    return {
+        'partitions': len(partitions),
+        'first_day': partitions[0][1] if partitions else None,
+        'last_day': partitions[-1][1] if partitions else None,
+        'default_partition_rows': default_rows,
+    }
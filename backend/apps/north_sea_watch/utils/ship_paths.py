@@ -0,0 +1,25 @@
+"""
+Ship path queries.
+Shared by the ship path endpoints and audit_ship_data_indexes, which explains
+them, without importing the API views.
+"""
+
+# Positions of one ship since a given time, oldest first
+SHIP_PATH_QUERY = """
+    SELECT imo_number, timestamp_ais, latitude, longitude, destination,
+           navigational_status_code, navigational_status, true_heading,
+           rate_of_turn, cog, sog
+    FROM ship_data
+    WHERE imo_number = %s AND timestamp_ais >= %s
+    ORDER BY timestamp_ais
+"""
+
+# Positions of a list of ships within a time window, grouped per ship
+SHIP_PATHS_QUERY = """
+    SELECT imo_number, timestamp_ais, latitude, longitude, destination,
+           navigational_status_code, navigational_status, true_heading,
+           rate_of_turn, cog, sog
+    FROM ship_data
+    WHERE imo_number = ANY(%s) AND timestamp_ais >= %s AND timestamp_ais < %s
+    ORDER BY imo_number, timestamp_ais
+"""
@@ -0,0 +1,276 @@
+"""
+Streaming response utilities.
+Reads large query results through a server-side cursor and writes them out as
+JSON incrementally, so the memory used by a response no longer grows with the
+number of rows it returns.
+"""
+
+import json
+import logging
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, Tuple
+
+from django.db import connections, transaction
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched from the server-side cursor per round trip
+STREAM_CHUNK_ROWS = 5000
+
+# Output is collected into chunks of about this many characters before being sent
+STREAM_BUFFER_SIZE = 64 * 1024
+
+
+def dumps(value) -> str:
+    """
+    Serialise a value the way the REST framework JSON renderer does, so
+    streamed responses match the buffered ones, down to datetime precision.
+    """
+    text = json.dumps(
+        value, cls=JSONEncoder, ensure_ascii=JSONRenderer.ensure_ascii,
+        allow_nan=not JSONRenderer.strict, separators=(',', ':')
+    )
+    return text.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+
+
+def iter_server_side_rows(query: str, params, using: str = 'ais_data',
+                          chunk_size: int = STREAM_CHUNK_ROWS) -> Iterator[tuple]:
+    """
+    Yield the rows of a query, fetched through a named server-side cursor.
+
+    The cursor lives in a transaction for as long as the generator is being
+    consumed, so PostgreSQL produces rows on demand instead of materialising
+    the whole result set.
+
+    Args:
+        query: SQL query to run
+        params: Query parameters
+        using: Database alias
+        chunk_size: Number of rows fetched per round trip
+    """
+    with transaction.atomic(using=using):
+        cursor = connections[using].chunked_cursor()
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+
+def buffered(pieces: Iterable[str], buffer_size: int = STREAM_BUFFER_SIZE) -> Iterator[str]:
+    """
+    Join small JSON fragments into larger chunks before they are written out.
+
+    Errors raised while producing the fragments end the stream; they are
+    logged here because the response status has already been sent.
+    """
+    buffer = []
+    size = 0
+    try:
+        for piece in pieces:
+            buffer.append(piece)
+            size += len(piece)
+            if size >= buffer_size:
+                yield ''.join(buffer)
+                buffer = []
+                size = 0
+    except Exception as e:
+        logger.error(f"Error while streaming response: {str(e)}", exc_info=True)
+        raise
+    if buffer:
+        yield ''.join(buffer)
+
+
+def json_array(items: Iterable) -> Iterator[str]:
+    """
+    Yield the JSON fragments of an array of the given items.
+    """
+    yield '['
+    for index, item in enumerate(items):
+        if index:
+            yield ','
+        yield dumps(item)
+    yield ']'
+
+
+def json_tracks(tracks: Iterable[Tuple[object, Iterable[Dict]]]) -> Iterator[str]:
+    """
+    Yield the JSON fragments of an array of ship tracks.
+
+    Every track is written as an object with its IMO number, positions and
+    position count. Positions are written as they are produced, so only the
+    position being written is held in memory.
+
+    Args:
+        tracks: (imo_number, positions) pairs
+    """
+    yield '['
+    for index, (imo_number, positions) in enumerate(tracks):
+        if index:
+            yield ','
+        yield f'{{"imo_number":{dumps(imo_number)},"positions":['
+        count = 0
+        for position in positions:
+            if count:
+                yield ','
+            yield dumps(position)
+            count += 1
+        yield f'],"count":{count}}}'
+    yield ']'
+
+
+def json_document(key: str, fragments: Iterable[str], extra: Dict) -> Iterator[str]:
+    """
+    Yield the JSON fragments of an object whose `key` member is written from
+    the given fragments, followed by the members of `extra`.
+    """
+    yield f'{{{dumps(key)}:'
+    yield from fragments
+    for extra_key, value in extra.items():
+        yield f',{dumps(extra_key)}:{dumps(value)}'
+    yield '}'
+
+
+class _TimeGroupsWriter:
+    """
+    Writes the time groups of a past scrubber distribution response one row at
+    a time, so the sync and async streams produce the same output.
+    """
+
+    def __init__(self, grouping_format: str):
+        self.grouping_format = grouping_format
+        self.current_interval = None
+        self.vessels = set()
+
+    def write_row(self, row: tuple) -> Iterator[str]:
+        interval_start, interval_end, imo_number, latitude, longitude = row[:5]
+        if imo_number is None:
+            return
+
+        interval_start_str = interval_start.strftime(self.grouping_format)
+        if interval_start_str != self.current_interval:
+            if self.current_interval is not None:
+                yield f'],"vessel_count":{len(self.vessels)}}},'
+            yield (
+                f'{{"interval_start":{dumps(interval_start_str)},'
+                f'"interval_end":{dumps(interval_end.strftime(self.grouping_format))},'
+                f'"positions":['
+            )
+            self.current_interval = interval_start_str
+            self.vessels = set()
+        else:
+            yield ','
+
+        position = {
+            'imo_number': imo_number,
+            'latitude': latitude,
+            'longitude': longitude
+        }
+        if len(row) > 5:
+            position['position_count'] = row[5]
+        self.vessels.add(imo_number)
+        yield dumps(position)
+
+    def finish(self, extra: Dict) -> Iterator[str]:
+        if self.current_interval is not None:
+            yield f'],"vessel_count":{len(self.vessels)}}}'
+        yield ']'
+
+        for key, value in extra.items():
+            yield f',{dumps(key)}:{dumps(value)}'
+        yield '}'
+
+
+def json_time_groups(rows: Iterable[tuple], grouping_format: str, extra: Dict) -> Iterator[str]:
+    """
+    Yield the JSON fragments of a past scrubber distribution response.
+
+    The output matches the non-streaming response: a time_groups array with
+    the positions and vessel count of every interval, followed by the
+    members of `extra` (such as query_params). Only the IMO numbers of the
+    interval being written are held in memory.
+
+    Args:
+        rows: (interval_start, interval_end, imo_number, latitude, longitude)
+              rows ordered by interval, optionally followed by a position count
+        grouping_format: strftime format of the interval boundaries
+        extra: Top-level members written after time_groups
+    """
+    writer = _TimeGroupsWriter(grouping_format)
+    yield '{"time_groups":['
+    for row in rows:
+        yield from writer.write_row(row)
+    yield from writer.finish(extra)
+
+
+async def async_json_array(items: AsyncIterable) -> AsyncIterator[str]:
+    """
+    Async variant of json_array, for items produced by an async iterator.
+    """
+    yield '['
+    index = 0
+    async for item in items:
+        if index:
+            yield ','
+        yield dumps(item)
+        index += 1
+    yield ']'
+
+
+async def async_json_time_groups(rows: AsyncIterable[tuple], grouping_format: str,
+                                 extra: Dict) -> AsyncIterator[str]:
+    """
+    Async variant of json_time_groups, for rows produced by an async iterator.
+    """
+    writer = _TimeGroupsWriter(grouping_format)
+    yield '{"time_groups":['
+    async for row in rows:
+        for piece in writer.write_row(row):
+            yield piece
+    for piece in writer.finish(extra):
+        yield piece
+
+
+async def async_buffered(pieces: AsyncIterable[str], buffer_size: int = STREAM_BUFFER_SIZE) -> AsyncIterator[str]:
+    """
+    Async variant of buffered, for fragments produced by an async iterator.
+    """
+    buffer = []
+    size = 0
+    try:
+        async for piece in pieces:
+            buffer.append(piece)
+            size += len(piece)
+            if size >= buffer_size:
+                yield ''.join(buffer)
+                buffer = []
+                size = 0
+    except Exception as e:
+        logger.error(f"Error while streaming response: {str(e)}", exc_info=True)
+        raise
+    if buffer:
+        yield ''.join(buffer)
+
+
+def streaming_json_response(pieces: Iterable[str]) -> StreamingHttpResponse:
+    """
+    Wrap JSON fragments in a streaming response.
+    """
+    return StreamingHttpResponse(buffered(pieces), content_type='application/json')
+
+
+def async_streaming_json_response(pieces: AsyncIterable[str]) -> StreamingHttpResponse:
+    """
+    Wrap JSON fragments produced by an async iterator in a streaming response.
+
+    The ASGI handler reads async iterators chunk by chunk; a sync iterator
+    would be read into memory in full before anything is sent.
+    """
+    return StreamingHttpResponse(async_buffered(pieces), content_type='application/json')
+
@@ -0,0 +1,131 @@
+"""
+Ship track simplification utilities.
+Reduces AIS tracks with the Douglas-Peucker algorithm and encodes them as
+Google encoded polylines, so moored or chatty transponders no longer produce
+thousands of near-identical points.
+"""
+
+import math
+from typing import Dict, List, Sequence, Tuple
+
+# Mean earth radius in metres
+EARTH_RADIUS_M = 6371008.8
+
+# Decimal places kept by the encoded polyline format (about 1 m)
+POLYLINE_PRECISION = 5
+
+
+def _project(coordinates: Sequence[Tuple[float, float]]) -> Tuple[List[float], List[float]]:
+    """
+    Project (latitude, longitude) pairs onto a local equirectangular plane in metres.
+
+    The distortion over the extent of a single day's track is far below any
+    useful tolerance.
+    """
+    mean_latitude = math.radians(sum(lat for lat, _ in coordinates) / len(coordinates))
+    x_scale = EARTH_RADIUS_M * math.cos(mean_latitude)
+    xs = [math.radians(lon) * x_scale for _, lon in coordinates]
+    ys = [math.radians(lat) * EARTH_RADIUS_M for lat, _ in coordinates]
+    return xs, ys
+
+
+def _segment_distance(px: float, py: float, ax: float, ay: float, bx: float, by: float) -> float:
+    """
+    Distance from point P to the segment AB.
+    """
+    dx = bx - ax
+    dy = by - ay
+    length_squared = dx * dx + dy * dy
+    if length_squared == 0:
+        return math.hypot(px - ax, py - ay)
+
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_squared))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def simplify_indices(coordinates: Sequence[Tuple[float, float]], tolerance_m: float) -> List[int]:
+    """
+    Select the points of a track to keep with the Douglas-Peucker algorithm.
+
+    Args:
+        coordinates: Sequence of (latitude, longitude) pairs in track order
+        tolerance_m: Maximum distance in metres between the simplified and
+                     the original track
+
+    Returns:
+        Sorted indexes of the points to keep, always including the first and last point
+    """
+    count = len(coordinates)
+    if count < 3 or tolerance_m <= 0:
+        return list(range(count))
+
+    xs, ys = _project(coordinates)
+    keep = [False] * count
+    keep[0] = keep[-1] = True
+
+    # Iterative rather than recursive, long tracks would exceed the recursion limit
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        max_distance = 0.0
+        max_index = None
+        for index in range(first + 1, last):
+            distance = _segment_distance(xs[index], ys[index], xs[first], ys[first], xs[last], ys[last])
+            if distance > max_distance:
+                max_distance = distance
+                max_index = index
+
+        if max_index is not None and max_distance > tolerance_m:
+            keep[max_index] = True
+            stack.append((first, max_index))
+            stack.append((max_index, last))
+
+    return [index for index, kept in enumerate(keep) if kept]
+
+
+def _encode_value(value: int) -> str:
+    value = ~(value << 1) if value < 0 else value << 1
+    chunks = []
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+    return ''.join(chunks)
+
+
+def encode_polyline(coordinates: Sequence[Tuple[float, float]], precision: int = POLYLINE_PRECISION) -> str:
+    """
+    Encode (latitude, longitude) pairs in the Google encoded polyline format.
+    """
+    factor = 10 ** precision
+    encoded = []
+    previous_lat = previous_lon = 0
+    for lat, lon in coordinates:
+        scaled_lat = int(round(lat * factor))
+        scaled_lon = int(round(lon * factor))
+        encoded.append(_encode_value(scaled_lat - previous_lat))
+        encoded.append(_encode_value(scaled_lon - previous_lon))
+        previous_lat = scaled_lat
+        previous_lon = scaled_lon
+    return ''.join(encoded)
+
+
+def encode_track(coordinates: Sequence[Tuple[float, float]], timestamps: Sequence) -> Dict:
+    """
+    Encode a track as a polyline with delta encoded timestamps.
+
+    Args:
+        coordinates: Sequence of (latitude, longitude) pairs in track order
+        timestamps: Datetimes of the points
+
+    Returns:
+        Dictionary with the point count, the encoded polyline, the epoch
+        seconds of the first point and the seconds between consecutive points
+    """
+    epochs = [int(timestamp.timestamp()) for timestamp in timestamps]
+    return {
+        'count': len(coordinates),
+        'polyline': encode_polyline(coordinates),
+        'start_time': epochs[0] if epochs else None,
+        'time_deltas': [current - previous for previous, current in zip(epochs, epochs[1:])],
+    }
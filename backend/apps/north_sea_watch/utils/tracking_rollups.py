@@ -0,0 +1,256 @@
+"""
+Daily visit rollup utilities.
+Maintains the user_tracking_daily_rollup table, which counts tracked visits per
+day, country, device type and bot flag, incrementally as visits are saved, so
+visit statistics do not scan user_tracking. Rollups are recounted from the raw
+visits for backfills and before old raw visits are pruned.
+"""
+
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from django.db import connections, router, transaction
+from django.db.models import Count, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce, NullIf, TruncDate
+from django.utils import timezone
+
+from apps.north_sea_watch.models import UserTracking, UserTrackingDailyRollup
+
+logger = logging.getLogger(__name__)
+
+# Country and device type stored for visits without one, as rollup keys cannot be NULL
+UNKNOWN = 'Unknown'
+
+# Countries listed in a summary, the remaining visits are counted as other countries
+SUMMARY_TOP_COUNTRIES = 20
+
+
+def _get_db() -> str:
+    return router.db_for_write(UserTrackingDailyRollup)
+
+
+def _day_start(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def get_rollup_day(timestamp: datetime) -> date:
+    """
+    Return the day a visit timestamp is counted on, in the server timezone.
+
+    Naive timestamps are taken to be in the server timezone, as they are when saved.
+    """
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    return timezone.localtime(timestamp).date()
+
+
+def count_visits(records: Iterable[UserTracking]) -> Dict[Tuple, List[int]]:
+    """
+    Count visits per rollup key.
+
+    Args:
+        records: UserTracking records; records without a timestamp are not counted
+
+    Returns:
+        Dictionary of (day, country, device_type, is_bot) keys to the number of
+        visits and the number of visits with IP geolocation data
+    """
+    counts = {}
+    for record in records:
+        if record.timestamp is None:
+            continue
+        key = (
+            get_rollup_day(record.timestamp),
+            record.country or UNKNOWN,
+            record.device_type or UNKNOWN,
+            bool(record.is_bot),
+        )
+        visit_counts = counts.setdefault(key, [0, 0])
+        visit_counts[0] += 1
+        visit_counts[1] += bool(record.country or record.city or record.isp)
+    return counts
+
+
+def add_visits(records: Iterable[UserTracking]) -> int:
+    """
+    Add saved visits to their daily rollups with a single upsert.
+
+    Called in the transaction inserting the visits, so the rollups and the raw
+    visits are committed together.
+
+    Returns:
+        Number of rollup rows written
+    """
+    counts = count_visits(records)
+    if not counts:
+        return 0
+
+    table = UserTrackingDailyRollup._meta.db_table
+    # Sorted keys lock the rollup rows in the same order in every writer, avoiding deadlocks
+    params = []
+    for key, (visits, visits_with_ip_data) in sorted(counts.items()):
+        params.extend([*key, visits, visits_with_ip_data])
+
+    with connections[_get_db()].cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO {table} (day, country, device_type, is_bot, visits, visits_with_ip_data)
+            VALUES {', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(counts))}
+            ON CONFLICT (day, country, device_type, is_bot) DO UPDATE SET
+                visits = {table}.visits + EXCLUDED.visits,
+                visits_with_ip_data = {table}.visits_with_ip_data + EXCLUDED.visits_with_ip_data
+        """, params)
+    return len(counts)
+
+
+def rebuild_rollups(start_day: date, end_day: date) -> int:
+    """
+    Recount the rollups of the days in [start_day, end_day) from user_tracking.
+
+    Args:
+        start_day: First day to recount
+        end_day: Day after the last day to recount
+
+    Returns:
+        Number of rollup rows written
+    """
+    db = _get_db()
+    with transaction.atomic(using=db):
+        with connections[db].cursor() as cursor:
+            # Visits saved meanwhile wait with their rollup upsert until the recount
+            # is committed, so they are neither lost nor counted twice
+            cursor.execute(f"LOCK TABLE {UserTrackingDailyRollup._meta.db_table} IN EXCLUSIVE MODE")
+
+        UserTrackingDailyRollup.objects.using(db).filter(day__gte=start_day, day__lt=end_day).delete()
+
+        rows = (
+            UserTracking.objects.using(db)
+            .filter(timestamp__gte=_day_start(start_day), timestamp__lt=_day_start(end_day))
+            .annotate(
+                day=TruncDate('timestamp'),
+                country_key=Coalesce(NullIf('country', Value('')), Value(UNKNOWN)),
+                device_type_key=Coalesce(NullIf('device_type', Value('')), Value(UNKNOWN)),
+            )
+            # Without the default ordering, which would be added to the GROUP BY
+            .order_by()
+            .values('day', 'country_key', 'device_type_key', 'is_bot')
+            .annotate(
+                visits=Count('id'),
+                visits_with_ip_data=Count('id', filter=Q(country__gt='') | Q(city__gt='') | Q(isp__gt='')),
+            )
+        )
+        rollups = [
+            UserTrackingDailyRollup(
+                day=row['day'],
+                country=row['country_key'],
+                device_type=row['device_type_key'],
+                is_bot=row['is_bot'],
+                visits=row['visits'],
+                visits_with_ip_data=row['visits_with_ip_data'],
+            )
+            for row in rows
+        ]
+        UserTrackingDailyRollup.objects.using(db).bulk_create(rollups, batch_size=1000)
+
+    logger.debug(f"Rebuilt {len(rollups)} visit rollups from {start_day} until {end_day}")
+    return len(rollups)
+
+
+def get_oldest_visit_day():
+    """
+    Return the day of the oldest tracked visit, or None if there are none.
+    """
+    oldest = UserTracking.objects.using(_get_db()).aggregate(oldest=Min('timestamp'))['oldest']
+    return get_rollup_day(oldest) if oldest else None
+
+
+def prune_raw_visits(retention_days: int, dry_run: bool = False) -> Dict:
+    """
+    Delete the raw visits of the days before the last retention_days days.
+
+    Every day is recounted into its rollups and deleted in one transaction, so
+    the rollups keep the counts of the deleted visits.
+
+    Args:
+        retention_days: Whole days of raw visits to keep, including today
+        dry_run: Count the visits that would be deleted without deleting them
+
+    Returns:
+        Dictionary with the cutoff day, the days pruned and the visits deleted
+    """
+    db = _get_db()
+    cutoff_day = timezone.localdate() - timedelta(days=retention_days - 1)
+    stats = {'cutoff_day': cutoff_day, 'days': 0, 'visits_deleted': 0}
+
+    day = get_oldest_visit_day()
+    while day is not None and day < cutoff_day:
+        next_day = day + timedelta(days=1)
+        visits = UserTracking.objects.using(db).filter(
+            timestamp__gte=_day_start(day), timestamp__lt=_day_start(next_day)
+        )
+        if dry_run:
+            deleted = visits.count()
+        else:
+            with transaction.atomic(using=db):
+                # A day without raw visits keeps the rollups it was pruned with
+                if not visits.exists():
+                    deleted = 0
+                else:
+                    rebuild_rollups(day, next_day)
+                    deleted, _ = visits.delete()
+
+        if deleted:
+            stats['days'] += 1
+            stats['visits_deleted'] += deleted
+            logger.info(f"{'Would delete' if dry_run else 'Deleted'} {deleted} raw visits of {day}")
+        day = next_day
+
+    return stats
+
+
+def get_visit_summary(start_day: date, end_day: date, include_bots: bool = True) -> Dict:
+    """
+    Summarise the visits of the days in [start_day, end_day) from the rollups.
+
+    Args:
+        start_day: First day of the summary
+        end_day: Day after the last day of the summary
+        include_bots: Count bot visits in the per day, country and device type totals
+
+    Returns:
+        Dictionary with the totals and the visits per day, top country and device type
+    """
+    rollups = UserTrackingDailyRollup.objects.using(_get_db()).filter(day__gte=start_day, day__lt=end_day)
+    # Aggregate aliases must not shadow the visits field
+    sums = rollups.aggregate(
+        total=Coalesce(Sum('visits'), 0),
+        with_ip_data=Coalesce(Sum('visits_with_ip_data'), 0),
+        bots=Coalesce(Sum('visits', filter=Q(is_bot=True)), 0),
+    )
+    totals = {
+        'visits': sums['total'],
+        'visits_with_ip_data': sums['with_ip_data'],
+        'bot_visits': sums['bots'],
+        'human_visits': sums['total'] - sums['bots'],
+    }
+
+    if not include_bots:
+        rollups = rollups.filter(is_bot=False)
+
+    def visits_by(field, order_by):
+        rows = rollups.order_by().values(field).annotate(total=Sum('visits')).order_by(*order_by)
+        return [{field: row[field], 'visits': row['total']} for row in rows]
+
+    countries = visits_by('country', ['-total', 'country'])
+    other_countries = sum(row['visits'] for row in countries[SUMMARY_TOP_COUNTRIES:])
+
+    return {
+        'start_day': start_day,
+        'end_day': end_day - timedelta(days=1),
+        'include_bots': include_bots,
+        'totals': totals,
+        'by_day': visits_by('day', ['day']),
+        'by_country': countries[:SUMMARY_TOP_COUNTRIES],
+        'other_countries_visits': other_countries,
+        'by_device_type': visits_by('device_type', ['-total', 'device_type']),
+    }
@@ -0,0 +1,94 @@
+"""
+User agent classification utilities.
+Detects bots with one compiled pattern of all bot identifiers and derives the
+device type with the user-agents parser, memoizing the result per user agent
+string, as the same few strings make up most tracked visits.
+"""
+
+import logging
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+import user_agents
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Common bot identifiers in user agent strings
+BOT_IDENTIFIERS = [
+    'bot', 'crawl', 'spider', 'slurp', 'search', 'fetch', 'monitor',
+    'scrape', 'archive', 'indexer', 'validator', 'facebook', 'whatsapp',
+    'telegram', 'slack', 'discord', 'googlebot', 'bingbot', 'yandexbot'
+]
+
+# Matches a lowercased user agent containing any of the identifiers, in one scan
+BOT_PATTERN = re.compile('|'.join(re.escape(bot_id) for bot_id in BOT_IDENTIFIERS))
+
+# Longer user agent strings are classified without being memoized, so
+# junk headers cannot fill the cache with large keys
+MAX_CACHED_LENGTH = 1024
+
+UserAgentClassification = namedtuple('UserAgentClassification', ['device_type', 'is_bot', 'bot_agent'])
+
+UNKNOWN_USER_AGENT = UserAgentClassification("Unknown", False, "")
+
+
+def get_device_type(user_agent: str) -> str:
+    """
+    Classify a user agent string as a mobile or desktop device.
+
+    Tablets count as mobile devices.
+    """
+    device_type = "Unknown"
+    try:
+        ua = user_agents.parse(user_agent)
+        if ua.is_mobile:
+            device_type = "mobile"
+        elif ua.is_pc:
+            device_type = "desktop"
+        elif ua.is_tablet:
+            device_type = "mobile"
+    except Exception as e:
+        logger.warning(f"Error parsing user agent: {e}")
+    return device_type
+
+
+def _classify(user_agent: str) -> UserAgentClassification:
+    is_bot = BOT_PATTERN.search(user_agent.lower()) is not None
+    return UserAgentClassification(get_device_type(user_agent), is_bot, user_agent if is_bot else "")
+
+
+_classify_cached = lru_cache(maxsize=settings.USER_AGENT_CACHE_SIZE)(_classify)
+
+
+def classify_user_agent(user_agent: str) -> UserAgentClassification:
+    """
+    Classify a user agent string, from the per-process cache when possible.
+
+    Args:
+        user_agent: User-Agent header value, may be empty
+
+    Returns:
+        UserAgentClassification with the device type, the bot flag and the
+        bot user agent, empty for other clients
+    """
+    if not user_agent:
+        return UNKNOWN_USER_AGENT
+    if len(user_agent) > MAX_CACHED_LENGTH:
+        return _classify(user_agent)
+    return _classify_cached(user_agent)
+
+
+def get_cache_stats() -> dict:
+    """
+    Return the hits, misses and size of the classification cache of this process.
+    """
+    return _classify_cached.cache_info()._asdict()
+
+
+def clear_cache() -> None:
+    """
+    Empty the classification cache of this process.
+    """
+    _classify_cached.cache_clear()
@@ -0,0 +1,201 @@
+"""
+Visit tracking utilities.
+Enriches tracked visits with IP geolocation, device type and bot detection
+in a background worker, which hands them to a bulk write buffer, so the
+tracking endpoint can answer without waiting for IP-API or the database.
+Queued and buffered visits are saved when the process exits.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from apps.common.write_buffer import BulkWriteBuffer
+from apps.north_sea_watch.models import UserTracking
+
+from . import ip_geolocation, tracking_rollups, user_agent_classifier
+
+logger = logging.getLogger(__name__)
+
+# Visits waiting for the worker; bounded by TRACKING_QUEUE_MAX_SIZE in enqueue_visit
+_visit_queue = queue.Queue()
+_worker_thread = None
+_worker_lock = threading.Lock()
+# Set on shutdown, the worker stops and shutdown() drains the queue
+_stopping = threading.Event()
+
+# Enriched visits waiting to be inserted, counted into the daily rollups as they are
+write_buffer = BulkWriteBuffer(
+    UserTracking,
+    batch_size=settings.TRACKING_BATCH_SIZE,
+    flush_interval=settings.TRACKING_FLUSH_SECONDS,
+    max_size=settings.TRACKING_QUEUE_MAX_SIZE,
+    name='user_tracking',
+    after_write=tracking_rollups.add_visits
+)
+
+
+def lookup_ip(ip_address: str) -> Dict:
+    """
+    Look up the location and network of an IP address with the ip_geolocation providers.
+
+    Returns:
+        Dictionary of UserTracking geolocation fields, empty if the lookup failed
+    """
+    ip_data = ip_geolocation.get_ip_data(ip_address)
+    if ip_data.get('status') != 'success':
+        logger.warning(f"IP lookup returned non-success status for {ip_address}: {ip_data}")
+        return {}
+    return ip_geolocation.to_tracking_fields(ip_data)
+
+
+def enrich_visit(visit: Dict, geolocate: bool = True) -> Dict:
+    """
+    Add bot detection, device type and IP geolocation to a visit.
+
+    Args:
+        visit: Validated tracking data with the client ip_address and the timestamp
+        geolocate: Whether to look up the location of the client IP
+
+    Returns:
+        The UserTracking field values of the visit
+    """
+    tracking_data = dict(visit)
+    user_agent = tracking_data.get('user_agent') or ''
+
+    classification = user_agent_classifier.classify_user_agent(user_agent)
+    tracking_data['is_bot'] = classification.is_bot
+    tracking_data['bot_agent'] = classification.bot_agent
+    if not tracking_data.get('device_type'):
+        tracking_data['device_type'] = classification.device_type
+
+    ip_address = tracking_data.get('ip_address')
+    if not geolocate:
+        pass
+    elif ip_address and ip_address != "Unknown":
+        tracking_data.update(lookup_ip(ip_address))
+    else:
+        logger.warning(f"IP address is missing or unknown, skipping geolocation: {ip_address}")
+
+    model_fields = [f.name for f in UserTracking._meta.get_fields()]
+    unknown_fields = [k for k in tracking_data if k not in model_fields]
+    if unknown_fields:
+        logger.warning(f"Unknown fields being removed from tracking data: {unknown_fields}")
+        for field in unknown_fields:
+            tracking_data.pop(field)
+    return tracking_data
+
+
+def save_visits(visits: List[Dict]) -> int:
+    """
+    Insert enriched visits as UserTracking records right away, in one batch.
+
+    Returns:
+        Number of records saved
+    """
+    return write_buffer.write([UserTracking(**visit) for visit in visits])
+
+
+def _worker_loop():
+    """
+    Background loop enriching the queued visits and passing them to the write buffer,
+    which inserts them every TRACKING_BATCH_SIZE visits or TRACKING_FLUSH_SECONDS.
+    """
+    while not _stopping.is_set():
+        try:
+            visit = _visit_queue.get(timeout=1)
+        except queue.Empty:
+            continue
+
+        try:
+            write_buffer.add(UserTracking(**enrich_visit(visit)))
+        except Exception as e:
+            logger.error(f"Error recording tracked visit: {str(e)}", exc_info=True)
+
+
+def ensure_worker_running() -> Optional[threading.Thread]:
+    """
+    Start the background tracking worker for this process if it is not running yet.
+    """
+    global _worker_thread
+
+    if _worker_thread is not None and _worker_thread.is_alive():
+        return _worker_thread
+
+    with _worker_lock:
+        if _worker_thread is None or not _worker_thread.is_alive():
+            _worker_thread = threading.Thread(
+                target=_worker_loop,
+                name='visit-tracking-worker',
+                daemon=True
+            )
+            _worker_thread.start()
+            logger.info("Started visit tracking worker thread")
+
+    return _worker_thread
+
+
+def enqueue_visit(visit: Dict) -> bool:
+    """
+    Queue a validated visit for enrichment and saving by the background worker.
+
+    Args:
+        visit: Validated tracking data with the client ip_address and the timestamp
+
+    Returns:
+        False if the queue is full and the visit was dropped
+    """
+    if _stopping.is_set() or _visit_queue.qsize() >= settings.TRACKING_QUEUE_MAX_SIZE:
+        logger.warning(f"Tracking queue is full, dropping visit from {visit.get('ip_address')}")
+        return False
+
+    ensure_worker_running()
+    _visit_queue.put(visit)
+    return True
+
+
+def get_queue_depth() -> int:
+    """
+    Return the number of visits waiting for the background worker.
+    """
+    return _visit_queue.qsize()
+
+
+def shutdown() -> int:
+    """
+    Stop the worker and save the queued and buffered visits.
+
+    Queued visits are still geolocated until TRACKING_SHUTDOWN_TIMEOUT has
+    passed; the rest are saved without location, rather than lost.
+
+    Returns:
+        Number of visits saved
+    """
+    _stopping.set()
+    deadline = time.monotonic() + settings.TRACKING_SHUTDOWN_TIMEOUT
+    if _worker_thread is not None:
+        _worker_thread.join(settings.TRACKING_SHUTDOWN_TIMEOUT)
+
+    visits = []
+    while True:
+        try:
+            visits.append(_visit_queue.get_nowait())
+        except queue.Empty:
+            break
+
+    records = [
+        UserTracking(**enrich_visit(visit, geolocate=time.monotonic() < deadline))
+        for visit in visits
+    ]
+    for record in records:
+        write_buffer.add(record)
+    return write_buffer.close(max(deadline - time.monotonic(), 1))
+
+
+# Registered after the write buffer's own exit handler, so it runs first
+atexit.register(shutdown)
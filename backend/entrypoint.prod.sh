@@ -104,6 +104,13 @@ fi
 PORT="${PORT:-8000}"
 echo "Starting server on port $PORT"
 
+# Serve the async views from the ASGI application on a uvicorn worker when enabled;
+# the other views run on its pool of ASYNC_AIS_SYNC_THREADS threads, like --threads below
+if [ "$(echo "$ASYNC_AIS_VIEWS_ENABLED" | tr '[:upper:]' '[:lower:]')" = "true" ]; then
+  echo "Starting with gunicorn and a uvicorn worker (ASGI, ${ASYNC_AIS_SYNC_THREADS:-8} threads for sync views)..."
+  exec gunicorn apps.config.asgi:application --bind 0.0.0.0:$PORT --workers 1 --worker-class uvicorn.workers.UvicornWorker --timeout 0 --log-level debug
+fi
+
 # Try different server options
 echo "Starting with gunicorn..."
 exec gunicorn apps.config.wsgi:application --bind 0.0.0.0:$PORT --workers 1 --threads 8 --timeout 0 --log-level debug